@@ -1,6 +1,8 @@
 from .core import (Intel, Atheros, Nexmon, AtherosPull10, NexmonPull46,
 				   NexmonPull256, ESP32, Picoscenes)
 from .utils import scidx, calib, phy_ifft, phy_fft
+from .stream import (CSIProtocol, create_receiver, MMsgReceiver,
+					 NetlinkReader)
 
 
 __version__ = "1.4.1"
@@ -1,10 +1,24 @@
-from libc.stdio cimport FILE
+from libc.stdint cimport uint8_t
 cimport numpy as np
 
 
+cdef class MappedFile:
+    cdef const uint8_t *data
+    cdef Py_ssize_t size
+    cdef Py_buffer view
+    cdef object mm
+    cdef object obj
+
+    cdef close(self)
+
 cdef class Intel:
     cdef readonly str file
     cdef readonly int count
+    cdef readonly Py_ssize_t last_pos
+    cdef readonly long head
+    cdef readonly long head_0xc1
+    cdef readonly object csi_dtype
+    cdef readonly str output
 
     cdef public np.ndarray timestamp_low
     cdef public np.ndarray bfee_count
@@ -52,48 +66,80 @@ cdef class Intel:
     cdef np.ndarray buf_payload
 
     cdef np.uint32_t[:] buf_timestamp_low_mem
-    cdef np.intp_t[:] buf_bfee_count_mem
-    cdef np.intp_t[:] buf_Nrx_mem
-    cdef np.intp_t[:] buf_Ntx_mem
-    cdef np.intp_t[:] buf_rssi_a_mem
-    cdef np.intp_t[:] buf_rssi_b_mem
-    cdef np.intp_t[:] buf_rssi_c_mem
-    cdef np.intp_t[:] buf_noise_mem
-    cdef np.intp_t[:] buf_agc_mem
-    cdef np.intp_t[:, :] buf_perm_mem
-    cdef np.intp_t[:] buf_rate_mem
+    cdef np.uint16_t[:] buf_bfee_count_mem
+    cdef np.uint8_t[:] buf_Nrx_mem
+    cdef np.uint8_t[:] buf_Ntx_mem
+    cdef np.uint8_t[:] buf_rssi_a_mem
+    cdef np.uint8_t[:] buf_rssi_b_mem
+    cdef np.uint8_t[:] buf_rssi_c_mem
+    cdef np.int8_t[:] buf_noise_mem
+    cdef np.uint8_t[:] buf_agc_mem
+    cdef np.uint8_t[:, :] buf_perm_mem
+    cdef np.uint16_t[:] buf_rate_mem
     cdef np.complex128_t[:, :, :, :] buf_csi_mem
+    cdef np.complex64_t[:, :, :, :] buf_csi64_mem
+    cdef np.int16_t[:, :, :, :, :] buf_csi16_mem
+    cdef np.int8_t[:, :, :, :, :] buf_csi8_mem
     cdef np.float64_t[:] buf_total_rss_mem
 
-    cdef np.intp_t[:] buf_fc_mem
-    cdef np.intp_t[:] buf_dur_mem
-    cdef np.intp_t[:, :] buf_addr_des_mem
-    cdef np.intp_t[:, :] buf_addr_src_mem
-    cdef np.intp_t[:, :] buf_addr_bssid_mem
-    cdef np.intp_t[:] buf_seq_mem
+    cdef np.uint16_t[:] buf_fc_mem
+    cdef np.uint16_t[:] buf_dur_mem
+    cdef np.uint8_t[:, :] buf_addr_des_mem
+    cdef np.uint8_t[:, :] buf_addr_src_mem
+    cdef np.uint8_t[:, :] buf_addr_bssid_mem
+    cdef np.uint16_t[:] buf_seq_mem
     cdef np.uint8_t[:, :] buf_payload_mem
 
     cdef np.complex128_t[:, :] sm_2_20_mem
     cdef np.complex128_t[:, :] sm_2_40_mem
     cdef np.complex128_t[:, :] sm_3_20_mem
     cdef np.complex128_t[:, :] sm_3_40_mem
+    cdef np.ndarray sm_table
+    cdef np.complex128_t[:, :, :] sm_table_mem
 
+    cdef int csi_code
     cdef int nrxnum
     cdef int ntxnum
     cdef int pl_size
     cdef bint if_report
+    cdef bint grow
+    cdef bint ring
+    cdef long capacity
+    cdef int scale
 
-    cpdef read(self)
-    cpdef seek(self, file, long pos, long num)
+    cpdef read(self, int workers=?, bint resume=?)
+    cpdef seek(self, file, long pos, long num, bint append=?)
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows)
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, int start_0xbb=?,
+                                int start_0xc1=?) except -1
+    cdef read_parallel(self, int workers)
+    cdef index_fields(self, MappedFile mf)
     cpdef pmsg(self, unsigned char *data)
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets)
+    cdef int decode_0xbb(self, const uint8_t *field, int count) noexcept nogil
     cpdef get_total_rss(self)
-    cpdef get_scaled_csi(self, inplace=?)
+    cpdef get_scaled_csi(self, inplace=?, dtype=?, int workers=?)
+    cdef scale_csi(self, inplace, dtype, int workers, bint sm)
     cdef __remove_sm(self, scaled_csi, inplace=?)
+    cdef int parse_0xbb(self, const uint8_t *buf, int count) noexcept nogil
+    cdef void parse_0xc1(self, const uint8_t *buf, int length,
+                         int count) noexcept nogil
+    cdef void clear_0xbb(self, int count) noexcept nogil
+    cdef void clear_0xc1(self, int count) noexcept nogil
+    cdef check_0xbb(self, int ret, int count)
+    cdef set_views(self, long count_0xbb, long count_0xc1, long start_0xbb=?,
+                   long start_0xc1=?)
+    cdef get_count(self)
+    cdef resize_0xbb(self, long pk_num)
+    cdef resize_0xc1(self, long pk_num)
 
 
 cdef class Atheros:
     cdef readonly str file
     cdef readonly int count
+    cdef readonly Py_ssize_t last_pos
+    cdef readonly object csi_dtype
 
     cdef public np.ndarray timestamp
     cdef public np.ndarray csi_len
@@ -132,37 +178,53 @@ cdef class Atheros:
     cdef np.ndarray buf_payload
 
     cdef np.uint64_t[:] buf_timestamp_mem
-    cdef np.intp_t[:] buf_csi_len_mem
-    cdef np.intp_t[:] buf_tx_channel_mem
-    cdef np.intp_t[:] buf_err_info_mem
-    cdef np.intp_t[:] buf_noise_floor_mem
-    cdef np.intp_t[:] buf_Rate_mem
-    cdef np.intp_t[:] buf_bandWidth_mem
-    cdef np.intp_t[:] buf_num_tones_mem
-    cdef np.intp_t[:] buf_nr_mem
-    cdef np.intp_t[:] buf_nc_mem
-    cdef np.intp_t[:] buf_rssi_mem
-    cdef np.intp_t[:] buf_rssi_1_mem
-    cdef np.intp_t[:] buf_rssi_2_mem
-    cdef np.intp_t[:] buf_rssi_3_mem
-    cdef np.intp_t[:] buf_payload_len_mem
+    cdef np.uint16_t[:] buf_csi_len_mem
+    cdef np.uint16_t[:] buf_tx_channel_mem
+    cdef np.uint8_t[:] buf_err_info_mem
+    cdef np.uint8_t[:] buf_noise_floor_mem
+    cdef np.uint8_t[:] buf_Rate_mem
+    cdef np.uint8_t[:] buf_bandWidth_mem
+    cdef np.uint8_t[:] buf_num_tones_mem
+    cdef np.uint8_t[:] buf_nr_mem
+    cdef np.uint8_t[:] buf_nc_mem
+    cdef np.uint8_t[:] buf_rssi_mem
+    cdef np.uint8_t[:] buf_rssi_1_mem
+    cdef np.uint8_t[:] buf_rssi_2_mem
+    cdef np.uint8_t[:] buf_rssi_3_mem
+    cdef np.uint16_t[:] buf_payload_len_mem
     cdef np.complex128_t[:, :, :, :] buf_csi_mem
+    cdef np.complex64_t[:, :, :, :] buf_csi64_mem
+    cdef np.int16_t[:, :, :, :, :] buf_csi16_mem
     cdef np.uint8_t[:, :] buf_payload_mem
 
+    cdef int csi_code
     cdef int nrxnum
     cdef int ntxnum
     cdef int tones
     cdef int pl_size
     cdef bint if_report
 
-    cpdef read(self, endian=?)
-    cpdef seek(self, file, long pos, long num, endian=?)
+    cpdef read(self, endian=?, bint resume=?)
+    cpdef seek(self, file, long pos, long num, endian=?, bint append=?)
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows,
+                    endian=?)
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, bint big, int start=?,
+                                bint grow=?) except -1
     cpdef pmsg(self, unsigned char *data, endian=?)
+    cdef int parse(self, const uint8_t *buf, int count,
+                   bint big) noexcept nogil
+    cdef check(self, int ret)
+    cdef set_views(self, long count)
+    cdef resize(self, long pk_num)
 
 
 cdef class Nexmon:
     cdef readonly str file
     cdef readonly int count
+    cdef readonly Py_ssize_t last_pos
+    cdef readonly long head
+    cdef readonly object csi_dtype
     cdef readonly str chip
     cdef readonly int bw
     cdef readonly bint nano
@@ -195,25 +257,46 @@ cdef class Nexmon:
 
     cdef np.uint32_t[:] buf_sec_mem
     cdef np.uint32_t[:] buf_usec_mem
-    cdef np.intp_t[:] buf_caplen_mem
-    cdef np.intp_t[:] buf_wirelen_mem
-    cdef np.intp_t[:] buf_magic_mem
-    cdef np.intp_t[:, :] buf_src_addr_mem
-    cdef np.intp_t[:] buf_seq_mem
-    cdef np.intp_t[:] buf_core_mem
-    cdef np.intp_t[:] buf_spatial_mem
-    cdef np.intp_t[:] buf_chan_spec_mem
-    cdef np.intp_t[:] buf_chip_version_mem
+    cdef np.uint32_t[:] buf_caplen_mem
+    cdef np.uint32_t[:] buf_wirelen_mem
+    cdef np.uint32_t[:] buf_magic_mem
+    cdef np.uint8_t[:, :] buf_src_addr_mem
+    cdef np.uint16_t[:] buf_seq_mem
+    cdef np.uint8_t[:] buf_core_mem
+    cdef np.uint8_t[:] buf_spatial_mem
+    cdef np.uint16_t[:] buf_chan_spec_mem
+    cdef np.uint16_t[:] buf_chip_version_mem
     cdef np.complex128_t[:, :] buf_csi_mem
+    cdef np.complex64_t[:, :] buf_csi64_mem
+    cdef np.int16_t[:, :, :] buf_csi16_mem
 
     cdef bint if_report
+    cdef bint ring
+    cdef bint grow
+    cdef long capacity
     cdef public int _autoscale
+    cdef int chip_code
+    cdef int csi_code
 
-    cpdef read(self)
-    cpdef seek(self, file, long pos, long num)
+    cpdef read(self, bint resume=?)
+    cpdef seek(self, file, long pos, long num, bint append=?)
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows)
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, bint big, int start=?,
+                                bint grow=?) except -1
     cpdef pmsg(self, unsigned char *data, endian=?)
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets)
+    cdef store_msg(self, const uint8_t *data)
+    cdef int parse_msg(self, const uint8_t *data, Py_ssize_t length,
+                       int count) noexcept nogil
+    cdef void parse_record(self, const uint8_t *hdr, bint big,
+                           int count) noexcept nogil
+    cdef void parse_header(self, const uint8_t *buf, int count) noexcept nogil
+    cdef void parse_csi(self, const uint8_t *buf, int count) noexcept nogil
+    cdef set_views(self, long count, long start=?)
+    cdef resize(self, long pk_num)
     cdef get_count(self)
-    cdef pcapheader(self, FILE *f)
+    cdef pcapheader(self, const uint8_t *data, Py_ssize_t lens)
 
 
 cdef class NexmonPull46(Nexmon):
@@ -223,8 +306,12 @@ cdef class NexmonPull46(Nexmon):
     cdef np.ndarray buf_rssi
     cdef np.ndarray buf_fc
 
-    cdef np.intp_t[:] buf_rssi_mem 
-    cdef np.intp_t[:] buf_fc_mem
+    cdef np.int8_t[:] buf_rssi_mem
+    cdef np.uint8_t[:] buf_fc_mem
 
-    cpdef seek(self, file, long pos, long num)
     cpdef pmsg(self, unsigned char *data, endian=?)
+    cdef int parse_msg(self, const uint8_t *data, Py_ssize_t length,
+                       int count) noexcept nogil
+    cdef void parse_header(self, const uint8_t *buf, int count) noexcept nogil
+    cdef set_views(self, long count, long start=?)
+    cdef resize(self, long pk_num)
@@ -1,82 +1,191 @@
-from libc.stdio cimport (fopen, fread, fclose, fseek, ftell, printf, FILE,
-                         SEEK_END, SEEK_SET, SEEK_CUR)
+from libc.stdio cimport printf
 from libc.stdint cimport (uint16_t, int16_t, uint32_t, int32_t, uint8_t,
                           int8_t, uint64_t)
 from libc.math cimport pi, log10, pow, sqrt
-from libc.stdlib cimport exit
+from libc.string cimport memcmp, memchr
+from cpython.buffer cimport (PyObject_GetBuffer, PyBuffer_Release,
+                             PyBUF_SIMPLE)
+from cpython.conversion cimport PyOS_string_to_double
+import mmap
 import os
-import struct
+from concurrent.futures import ThreadPoolExecutor
+import stat
+import time
 
 import numpy as np
 cimport numpy as np
 cimport cython
 
 
+# Index of the highest set bit of a non-zero word
+cdef extern from *:
+    """
+    #if defined(_MSC_VER)
+    #include <intrin.h>
+    static __inline int csiread_msb(unsigned int x) {
+        unsigned long i;
+        _BitScanReverse(&i, x);
+        return (int)i;
+    }
+    #else
+    static inline int csiread_msb(unsigned int x) {
+        return 31 - __builtin_clz(x);
+    }
+    #endif
+    """
+    int csiread_msb(unsigned int x) noexcept nogil
+
+
+# Nexmon CSI formats, resolved from ``chip`` once so that decoding loops don't
+# compare strings.
+cdef enum:
+    CHIP_UNKNOWN = 0
+    CHIP_INT16 = 1          # 4339, 43455c0
+    CHIP_FLOAT_9_5 = 2      # 4358
+    CHIP_FLOAT_12_6 = 3     # 4366c0
+
+
+# Record formats walked by ``build_index``
+cdef enum:
+    INDEX_INTEL = 0
+    INDEX_ATHEROS = 1
+    INDEX_NEXMON = 2
+    INDEX_PICOSCENES = 3
+    INDEX_ESP32 = 4
+
+
+# Layouts of ``csi`` selected by ``csi_dtype``, integer layouts store the real
+# and imaginary parts in the last axis.
+cdef enum:
+    CSI_COMPLEX128 = 0
+    CSI_COMPLEX64 = 1
+    CSI_INT16 = 2
+    CSI_INT8 = 3
+
+CSI_DTYPES = ('complex128', 'complex64', 'int16', 'int8')
+
+
+# 10 ** (x / 10) of the integer dB ``x`` in [-256, 256) at ``x + 256``, rssi,
+# noise and agc of Intel packets are all integers.
+cdef double DB_POWER[512]
+for _x in range(512):
+    DB_POWER[_x] = pow(10, (_x - 256) / 10)
+
+ctypedef fused complex_t:
+    np.complex64_t
+    np.complex128_t
+
+ctypedef fused sample_t:
+    double
+    float
+    np.int16_t
+
+ctypedef fused csi_t:
+    double
+    float
+    np.int16_t
+    np.int8_t
+
+ctypedef fused real_t:
+    double
+    float
+
+
+cdef class MappedFile:
+    """Read-only view of a whole file as a single ``const uint8_t*``
+
+    Regular files are memory mapped, so records are decoded straight from the
+    page cache without ``fread`` calls or stack copies. Other inputs (pipes,
+    character devices, empty files) are read into memory at once.
+    """
+    def __cinit__(self, file):
+        self.data = NULL
+        self.size = 0
+        self.mm = None
+        self.obj = None
+        with open(file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if stat.S_ISREG(st.st_mode) and st.st_size > 0:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self.obj = self.mm
+            else:
+                self.obj = f.read()
+        PyObject_GetBuffer(self.obj, &self.view, PyBUF_SIMPLE)
+        self.data = <const uint8_t *>self.view.buf
+        self.size = self.view.len
+
+    cdef close(self):
+        if self.obj is not None:
+            PyBuffer_Release(&self.view)
+            self.obj = None
+            self.data = NULL
+            self.size = 0
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def __dealloc__(self):
+        if self.obj is not None:
+            PyBuffer_Release(&self.view)
+
+
 cdef class Intel:
     def __cinit__(self, file, nrxnum=3, ntxnum=2, pl_size=0, if_report=True,
-                  bufsize=0, *argv, **kw):
+                  bufsize=0, alloc='estimate', csi_dtype=np.complex128,
+                  ring=False, output='raw', *argv, **kw):
         self.file = file
         self.nrxnum = nrxnum
         self.ntxnum = ntxnum
         self.pl_size = pl_size
         self.if_report = if_report
 
+        if output not in ['raw', 'scaled', 'scaled_sm']:
+            raise ValueError("output can only take 'raw', 'scaled' and "
+                             "'scaled_sm'!\n")
+        self.output = output
+        self.scale = 0 if output == 'raw' else 1 if output == 'scaled' else 2
+        # scaled csi is complex
+        self.csi_code = csi_code_of(csi_dtype,
+                                    CSI_DTYPES[:2] if self.scale else
+                                    CSI_DTYPES)
+        self.csi_dtype = np.dtype(csi_dtype)
+
+        if alloc not in ['estimate', 'exact', 'grow']:
+            raise ValueError("alloc can only take 'estimate', 'exact' and "
+                             "'grow'!\n")
+        self.grow = alloc == 'grow'
+
+        if ring and bufsize < 1:
+            raise ValueError("ring requires bufsize > 0!\n")
+        self.ring = ring
+        self.capacity = bufsize
+
         if bufsize == 0:
             if file is None:
                 self.count = 1
                 pk_num = 1
+                c1_num = 1
+            elif alloc == 'exact':
+                pk_num, c1_num = self.get_count()
+            elif alloc == 'grow':
+                lens = os.path.getsize(file)
+                pk_num = lens // (35 + 60 * self.nrxnum * self.ntxnum)
+                pk_num = max(pk_num, 1)
+                c1_num = pk_num
             else:
                 lens = os.path.getsize(file)
                 pk_num = lens // (35 + 60 * 1 * 1)
+                c1_num = pk_num
         else:
             pk_num = bufsize
+            c1_num = bufsize
+        if ring:
+            # every slot is mirrored, so the last packets are contiguous
+            pk_num = 2 * bufsize
+            c1_num = 2 * bufsize
 
-        btype = np.intp
-
-        self.buf_timestamp_low = np.zeros([pk_num], dtype=np.uint32)
-        self.buf_bfee_count = np.zeros([pk_num], dtype=btype)
-        self.buf_Nrx = np.zeros([pk_num], dtype=btype)
-        self.buf_Ntx = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_a = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_b = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_c = np.zeros([pk_num], dtype=btype)
-        self.buf_noise = np.zeros([pk_num], dtype=btype)
-        self.buf_agc = np.zeros([pk_num], dtype=btype)
-        self.buf_perm = np.zeros([pk_num, 3], dtype=btype)
-        self.buf_rate = np.zeros([pk_num], dtype=btype)
-        self.buf_csi = np.zeros([pk_num, 30, self.nrxnum, self.ntxnum],
-                                dtype=np.complex128)
-        self.buf_total_rss = np.zeros([pk_num], dtype=np.float64)
-
-        self.buf_fc = np.zeros([pk_num], dtype=btype)
-        self.buf_dur = np.zeros([pk_num], dtype=btype)
-        self.buf_addr_des = np.zeros([pk_num, 6], dtype=btype)
-        self.buf_addr_src = np.zeros([pk_num, 6], dtype=btype)
-        self.buf_addr_bssid = np.zeros([pk_num, 6], dtype=btype)
-        self.buf_seq = np.zeros([pk_num], dtype=btype)
-        self.buf_payload = np.zeros([pk_num, self.pl_size], dtype=np.uint8)
-
-        self.buf_timestamp_low_mem = self.buf_timestamp_low
-        self.buf_bfee_count_mem = self.buf_bfee_count
-        self.buf_Nrx_mem = self.buf_Nrx
-        self.buf_Ntx_mem = self.buf_Ntx
-        self.buf_rssi_a_mem = self.buf_rssi_a
-        self.buf_rssi_b_mem = self.buf_rssi_b
-        self.buf_rssi_c_mem = self.buf_rssi_c
-        self.buf_noise_mem = self.buf_noise
-        self.buf_agc_mem = self.buf_agc
-        self.buf_perm_mem = self.buf_perm
-        self.buf_rate_mem = self.buf_rate
-        self.buf_csi_mem = self.buf_csi
-        self.buf_total_rss_mem = self.buf_total_rss
-
-        self.buf_fc_mem = self.buf_fc
-        self.buf_dur_mem = self.buf_dur
-        self.buf_addr_des_mem = self.buf_addr_des
-        self.buf_addr_src_mem = self.buf_addr_src
-        self.buf_addr_bssid_mem = self.buf_addr_bssid
-        self.buf_seq_mem = self.buf_seq
-        self.buf_payload_mem = self.buf_payload
+        self.resize_0xbb(pk_num)
+        self.resize_0xc1(c1_num)
 
         #  Conjugate Transpose
         sm_2_20 = np.array([[1,  1],
@@ -101,316 +210,696 @@ cdef class Intel:
         self.sm_3_20_mem = sm_3_20
         self.sm_3_40_mem = sm_3_40
 
+        # steering matrices indexed by ``2 * (Ntx - 2) + is_40MHz``
+        self.sm_table = np.zeros([4, 3, 3], dtype=np.complex128)
+        self.sm_table[0, :2, :2] = sm_2_20
+        self.sm_table[1, :2, :2] = sm_2_40
+        self.sm_table[2] = sm_3_20
+        self.sm_table[3] = sm_3_40
+        self.sm_table_mem = self.sm_table
+
     def __init__(self, file, nrxnum=3, ntxnum=2, pl_size=0, if_report=True,
-                 bufsize=0):
+                 bufsize=0, alloc='estimate', csi_dtype=np.complex128,
+                 ring=False, output='raw'):
         pass
 
-    cpdef read(self):
-        self.seek(self.file, 0, 0)
-
-    cpdef seek(self, file, long pos, long num):
-        tempfile = file.encode(encoding="utf-8")
-        cdef char *datafile = tempfile
-        cdef FILE *f = fopen(datafile, "rb")
-        if f is NULL:
-            printf("Open failed!\n")
-            exit(-1)
-
-        fseek(f, 0, SEEK_END)
-        cdef long lens = ftell(f)
-        fseek(f, pos, SEEK_SET)
-
-        cdef int count_0xbb = 0
-        cdef int count_0xc1 = 0
-        cdef unsigned short field_len
-        cdef unsigned char code
-        cdef unsigned char buf[1024]
-        cdef unsigned char *payload
-        cdef int l
+    cpdef read(self, int workers=1, bint resume=False):
+        if resume:
+            self.seek(self.file, self.last_pos, 0, True)
+        elif workers > 1:
+            self.read_parallel(workers)
+        else:
+            self.seek(self.file, 0, 0)
 
-        cdef int index, index_step
-        cdef int i, j, k, g, perm_j
-        cdef uint8_t remainder = 0
-        cdef double a, b
+    cpdef seek(self, file, long pos, long num, bint append=False):
+        cdef MappedFile mf = MappedFile(file)
+        cdef bint grow = self.grow
 
         if num == 0:
-            num = lens
+            num = <long>mf.size
 
-        while pos < (lens-3):
-            l = <int>fread(&buf, sizeof(unsigned char), 3, f)
-            field_len = buf[1] + (buf[0] << 8)
-            code = buf[2]
+        try:
+            if append:
+                # rows after the views, the buffers grow if they are full
+                self.grow = True
+                self.decode_from(mf, pos, num, self.count, self.fc.shape[0])
+            else:
+                self.decode_from(mf, pos, num)
+        finally:
+            self.grow = grow
+            mf.close()
 
-            if code == 0xbb:
-                l = <int>fread(buf, sizeof(unsigned char), field_len - 1, f)
-                if l != (field_len - 1):
-                    break  # finished
+        if self.if_report:
+            self.__report(self.count, self.fc.shape[0])
+
+    def iter_chunks(self, long chunk_size, file=None):
+        """Yield ``self`` with the views of up to ``chunk_size`` 0xbb packets
+        at a time. ``file`` stays mapped and the buffers are reused, so views
+        of a chunk are overwritten by the next one."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        self.resize_0xbb(chunk_size)
+        self.resize_0xc1(chunk_size)
+        grow = self.grow
+        self.grow = False
+        mf = MappedFile(file)
+        cur = 0
+        used = chunk_size
+        try:
+            while True:
+                # clear what a smaller matrix or payload wouldn't overwrite
+                self.buf_csi[:used] = 0
+                self.buf_payload[:used] = 0
+                cur = self.decode_from(mf, cur, chunk_size)
+                if self.count == 0:
+                    break
+                used = self.count
+                yield self
+        finally:
+            self.grow = grow
+            mf.close()
+
+    def follow(self, long chunk_size=1, file=None, double interval=0.1,
+               timeout=None):
+        """Yield ``self`` with the views of up to ``chunk_size`` 0xbb packets
+        at a time, then wait for packets appended to ``file`` and yield them.
+        It stops if ``file`` doesn't grow in ``timeout`` seconds."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        self.resize_0xbb(chunk_size)
+        self.resize_0xc1(chunk_size)
+        grow = self.grow
+        self.grow = False
+        cur = 0
+        used = chunk_size
+        try:
+            while True:
+                mf = MappedFile(file)
+                size = mf.size
+                if size < cur:
+                    cur = 0     # truncated, start over
+                try:
+                    while True:
+                        self.buf_csi[:used] = 0
+                        self.buf_payload[:used] = 0
+                        cur = self.decode_from(mf, cur, chunk_size)
+                        if self.count == 0:
+                            break
+                        used = self.count
+                        yield self
+                finally:
+                    mf.close()
+                if not wait_growth(file, size, interval, timeout):
+                    break
+        finally:
+            self.grow = grow
+
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, int start_0xbb=0,
+                                int start_0xc1=0) except -1:
+        """Decode fields from ``cur`` into the rows from ``start_0xbb`` and
+        ``start_0xc1`` until ``num`` 0xbb packets are parsed or the buffer is
+        full, then set the views of all rows. Returns the offset of the first
+        field left, it is kept as ``last_pos``."""
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+        cdef int count_0xbb = start_0xbb
+        cdef int count_0xc1 = start_0xc1
+        cdef unsigned short field_len
+        cdef unsigned char code
+        cdef int ret = 0
 
-                self.buf_timestamp_low_mem[count_0xbb] = cu32l(buf[0], buf[1],
-                                                               buf[2], buf[3])
-                self.buf_bfee_count_mem[count_0xbb] = cu16l(buf[4], buf[5])
-                self.buf_Nrx_mem[count_0xbb] = buf[8]
-                self.buf_Ntx_mem[count_0xbb] = buf[9]
-                self.buf_rssi_a_mem[count_0xbb] = buf[10]
-                self.buf_rssi_b_mem[count_0xbb] = buf[11]
-                self.buf_rssi_c_mem[count_0xbb] = buf[12]
-                self.buf_noise_mem[count_0xbb] = <int8_t>buf[13]
-                self.buf_agc_mem[count_0xbb] = buf[14]
-                self.buf_rate_mem[count_0xbb] = cu16l(buf[18], buf[19])
-
-                self.buf_perm_mem[count_0xbb, 0] = (buf[15] & 0x3)
-                self.buf_perm_mem[count_0xbb, 1] = ((buf[15] >> 2) & 0x3)
-                self.buf_perm_mem[count_0xbb, 2] = ((buf[15] >> 4) & 0x3)
-
-                if buf[8] > self.nrxnum:
-                    fclose(f)
-                    raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
-                if buf[9] > self.ntxnum:
-                    fclose(f)
-                    raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
-                if buf[16] | (buf[17] << 8) != 60 * buf[8] * buf[9] + 12:
-                    fclose(f)
-                    raise Exception("Wrong beamforming matrix size"
-                                    ", %dth packet is broken!" % count_0xbb)
-
-                payload = &buf[20]
-                index = 0
-                for i in range(30):
-                    index = index + 3
-                    remainder = index & 0x7
-                    for j in range(buf[8]):
-                        with cython.boundscheck(False):
-                            perm_j = <int>self.buf_perm_mem[count_0xbb, j]
-                        for k in range(buf[9]):
-                            index_step = index >> 3
-                            a = ccsi(payload[index_step + 0],
-                                     payload[index_step + 1], remainder)
-                            b = ccsi(payload[index_step + 1],
-                                     payload[index_step + 2], remainder)
-
-                            set_csi_mem(self.buf_csi_mem, count_0xbb,
-                                        i, perm_j, k, a, b)
-                            index += 16
-                count_0xbb += 1
-
-            elif code == 0xc1:
-                l = <int>fread(buf, sizeof(unsigned char), field_len - 1, f)
-                if l != (field_len - 1):
+        with nogil:
+            while cur < (lens-3):
+                field_len = data[cur+1] + (data[cur] << 8)
+                code = data[cur+2]
+                if field_len == 0 or cur + 2 + field_len > lens:
                     break  # finished
 
-                self.buf_fc_mem[count_0xc1] = cu16l(buf[0], buf[1])
-                self.buf_dur_mem[count_0xc1] = cu16l(buf[2], buf[3])
-
-                for g in range(6):
-                    self.buf_addr_des_mem[count_0xc1, g] = buf[4+g]
-                    self.buf_addr_src_mem[count_0xc1, g] = buf[10+g]
-                    self.buf_addr_bssid_mem[count_0xc1, g] = buf[16+g]
-
-                self.buf_seq_mem[count_0xc1] = cu16l(buf[22], buf[23])
-
-                for g in range(min(self.pl_size, field_len - 1)):
-                    self.buf_payload_mem[count_0xc1, g] = buf[g]
+                if code == 0xbb:
+                    if count_0xbb >= self.buf_csi.shape[0]:
+                        if not self.grow:
+                            break  # buffer is full
+                        with gil:
+                            self.resize_0xbb(2 * count_0xbb + 1)
+
+                    ret = self.decode_0xbb(data + cur, count_0xbb)
+                    if ret:
+                        break
+                    count_0xbb += 1
+
+                elif code == 0xc1:
+                    if count_0xc1 >= self.buf_fc_mem.shape[0] and self.grow:
+                        with gil:
+                            self.resize_0xc1(2 * count_0xc1 + 1)
+
+                    # skip it if the buffer is full
+                    if count_0xc1 < self.buf_fc_mem.shape[0]:
+                        self.parse_0xc1(data + cur + 3, field_len - 1,
+                                        count_0xc1)
+                        count_0xc1 += 1
+
+                cur += (field_len + 2)
+                if count_0xbb - start_0xbb >= num:
+                    break
+
+        self.check_0xbb(ret, count_0xbb)
+        self.set_views(count_0xbb, count_0xc1)
+        self.count = count_0xbb
+        self.last_pos = cur
+        return cur
 
-                count_0xc1 += 1
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows):
+        """Decode the packets at ``offsets`` into ``rows`` in one pass
 
-            else:
-                fseek(f, field_len - 1, SEEK_CUR)
-            pos += (field_len + 2)
-            if count_0xbb >= num:
-                break
-
-        fclose(f)
+        ``offsets`` should be ascending, so the file is walked forward once.
+        ``rows`` is a permutation of ``range(len(offsets))``. A 0xc1 field at
+        an offset is decoded into the same row as the 0xbb field after it.
+        """
+        cdef Py_ssize_t n = offsets.shape[0]
+        cdef Py_ssize_t k = 0
+        cdef Py_ssize_t cur
+        cdef int row = 0
+        cdef int count_0xc1 = 0
+        cdef unsigned short field_len
+        cdef int ret = 0
+
+        if rows.shape[0] != n:
+            raise ValueError("offsets and rows must have the same length")
+        if n and (np.min(rows) < 0 or np.max(rows) >= n):
+            raise ValueError("rows must be in range(len(offsets))")
+        if n > self.buf_csi.shape[0]:
+            self.resize_0xbb(n)
+        if n > self.buf_fc_mem.shape[0]:
+            self.resize_0xc1(n)
+
+        cdef MappedFile mf = MappedFile(file)
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+
+        with nogil:
+            for k in range(n):
+                cur = offsets[k]
+                row = <int>rows[k]
+                if cur < 0 or cur + 3 > lens:
+                    ret = 4
+                    break
+                field_len = cu16b(data[cur], data[cur+1])
+                if data[cur+2] == 0xc1:
+                    if field_len < 25 or cur + 2 + field_len + 3 > lens:
+                        ret = 4
+                        break
+                    self.parse_0xc1(data + cur + 3, field_len - 1, row)
+                    count_0xc1 += 1
+                    cur += (field_len + 2)
+                    field_len = cu16b(data[cur], data[cur+1])
+                if data[cur+2] != 0xbb or cur + 2 + field_len > lens:
+                    ret = 4
+                    break
+                ret = self.decode_0xbb(data + cur, row)
+                if ret:
+                    break
+
+        mf.close()
+        if ret == 4:
+            raise ValueError("No 0xbb packet at offset %d" % offsets[k])
+        self.check_0xbb(ret, row)
+
+        count_0xc1 = <int>n if count_0xc1 == n else 0
+        if self.if_report:
+            self.__report(n, count_0xc1)
+
+        self.set_views(n, count_0xc1)
+        self.count = n
+
+    cdef read_parallel(self, int workers):
+        """Index the fields of ``self.file`` first, then decode 0xbb fields
+        in ``workers`` threads, each of them fills a disjoint range of rows."""
+        cdef MappedFile mf = MappedFile(self.file)
+        cdef np.int64_t[:] offsets_0xc1_mem
+        cdef Py_ssize_t i, count_0xc1
+        cdef const uint8_t *field
+
+        offset, length, rtype = index_records(mf, INDEX_INTEL, 0, False)
+        offsets_0xbb = offset[rtype == 0xbb]
+        offsets_0xc1 = offset[rtype == 0xc1]
+
+        # keep the same rows as ``seek``: stop at the first 0xbb packet that
+        # doesn't fit, and skip 0xc1 packets that don't fit.
+        if self.grow:
+            if offsets_0xbb.shape[0] > self.buf_csi.shape[0]:
+                self.resize_0xbb(offsets_0xbb.shape[0])
+            if offsets_0xc1.shape[0] > self.buf_fc.shape[0]:
+                self.resize_0xc1(offsets_0xc1.shape[0])
+        if offsets_0xbb.shape[0] > self.buf_csi.shape[0]:
+            # ``seek`` stops at the first 0xbb packet that doesn't fit
+            last_pos = offsets_0xbb[self.buf_csi.shape[0]]
+            offsets_0xc1 = offsets_0xc1[offsets_0xc1 < last_pos]
+        elif offset.shape[0]:
+            last_pos = offset[-1] + length[-1]
+        else:
+            last_pos = 0
+        offsets_0xbb = offsets_0xbb[:self.buf_csi.shape[0]]
+        offsets_0xc1 = offsets_0xc1[:self.buf_fc.shape[0]]
+
+        bounds = np.linspace(0, offsets_0xbb.shape[0], workers + 1)
+        bounds = bounds.astype(np.intp)
+        with ThreadPoolExecutor(workers) as executor:
+            results = list(executor.map(
+                _intel_decode_range, [self] * workers, [mf] * workers,
+                [offsets_0xbb] * workers, bounds[:-1], bounds[1:]))
+
+        # the first broken packet is what ``seek`` would have raised
+        for count, ret in results:
+            if ret:
+                mf.close()
+                self.check_0xbb(ret, count)
+
+        offsets_0xc1_mem = offsets_0xc1
+        count_0xc1 = offsets_0xc1.shape[0]
+        with nogil:
+            for i in range(count_0xc1):
+                field = mf.data + offsets_0xc1_mem[i]
+                self.parse_0xc1(field + 3, cu16b(field[0], field[1]) - 1, i)
+        mf.close()
 
         if self.if_report:
-            self.__report(count_0xbb, count_0xc1)
-
-        self.timestamp_low = self.buf_timestamp_low[:count_0xbb]
-        self.bfee_count = self.buf_bfee_count[:count_0xbb]
-        self.Nrx = self.buf_Nrx[:count_0xbb]
-        self.Ntx = self.buf_Ntx[:count_0xbb]
-        self.rssi_a = self.buf_rssi_a[:count_0xbb]
-        self.rssi_b = self.buf_rssi_b[:count_0xbb]
-        self.rssi_c = self.buf_rssi_c[:count_0xbb]
-        self.noise = self.buf_noise[:count_0xbb]
-        self.agc = self.buf_agc[:count_0xbb]
-        self.perm = self.buf_perm[:count_0xbb, :]
-        self.rate = self.buf_rate[:count_0xbb]
-        self.csi = self.buf_csi[:count_0xbb, :, :, :]
-        self.count = count_0xbb
+            self.__report(offsets_0xbb.shape[0], count_0xc1)
 
-        self.fc = self.buf_fc[:count_0xc1]
-        self.dur = self.buf_dur[:count_0xc1]
-        self.addr_des = self.buf_addr_des[:count_0xc1]
-        self.addr_src = self.buf_addr_src[:count_0xc1]
-        self.addr_bssid = self.buf_addr_bssid[:count_0xc1]
-        self.seq = self.buf_seq[:count_0xc1]
-        self.payload = self.buf_payload[:count_0xc1]
+        self.set_views(offsets_0xbb.shape[0], count_0xc1)
+        self.count = offsets_0xbb.shape[0]
+        self.last_pos = last_pos
+
+    cdef index_fields(self, MappedFile mf):
+        """Return the offsets of 0xbb and 0xc1 fields by their 3-byte
+        length/code prefix, like ``getPosIntel`` in ``examples/csiseek.py``"""
+        offset, length, rtype = index_records(mf, INDEX_INTEL, 0, False)
+        return offset[rtype == 0xbb], offset[rtype == 0xc1]
 
     cpdef pmsg(self, unsigned char *data):
         cdef unsigned char code
-        cdef unsigned char *buf
-        cdef unsigned char *payload
-
-        cdef int index, index_step
-        cdef int i, j, k, g, perm_j
-        cdef uint8_t remainder = 0
-        cdef double a, b
+        cdef int ret
+        cdef int row = 0
 
         code = data[0]
-        buf = data
-        buf += 1
 
         if code == 0xbb:
-            self.buf_timestamp_low_mem[0] = cu32l(buf[0], buf[1],
-                                                  buf[2], buf[3])
-            self.buf_bfee_count_mem[0] = cu16l(buf[4], buf[5])
-            self.buf_Nrx_mem[0] = buf[8]
-            self.buf_Ntx_mem[0] = buf[9]
-            self.buf_rssi_a_mem[0] = buf[10]
-            self.buf_rssi_b_mem[0] = buf[11]
-            self.buf_rssi_c_mem[0] = buf[12]
-            self.buf_noise_mem[0] = <int8_t>buf[13]
-            self.buf_agc_mem[0] = buf[14]
-            self.buf_rate_mem[0] = cu16l(buf[18], buf[19])
-
-            self.buf_perm_mem[0, 0] = (buf[15] & 0x3)
-            self.buf_perm_mem[0, 1] = ((buf[15] >> 2) & 0x3)
-            self.buf_perm_mem[0, 2] = ((buf[15] >> 4) & 0x3)
-
-            if buf[8] > self.nrxnum:
-                raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
-            if buf[9] > self.ntxnum:
-                raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
-            if buf[16] | (buf[17] << 8) != 60 * buf[8] * buf[9] + 12:
+            if self.ring:
+                row = self.head % self.capacity
+                # the mirror isn't in any view until ``head`` moves on, so a
+                # broken packet can't clobber the history
+                self.clear_0xbb(row + <int>self.capacity)
+                ret = self.parse_0xbb(data + 1, row + <int>self.capacity)
+                if ret == 0:
+                    self.clear_0xbb(row)
+                    self.parse_0xbb(data + 1, row)
+            else:
+                self.clear_0xbb(row)
+                ret = self.parse_0xbb(data + 1, row)
+            if ret == 3:
                 printf("Wrong beamforming matrix size, the packet is broken!\n")
                 return code
-
-            payload = &buf[20]
-            index = 0
-            for i in range(30):
-                index = index + 3
-                remainder = index & 0x7
-                for j in range(buf[8]):
-                    with cython.boundscheck(False):
-                        perm_j = <int>self.buf_perm_mem[0, j]
-                    for k in range(buf[9]):
-                        index_step = index >> 3
-                        a = ccsi(payload[index_step + 0],
-                                 payload[index_step + 1], remainder)
-                        b = ccsi(payload[index_step + 1],
-                                 payload[index_step + 2], remainder)
-
-                        set_csi_mem(self.buf_csi_mem, 0, i, perm_j, k, a, b)
-                        index += 16
+            self.check_0xbb(ret, row)
+            if self.ring:
+                self.head += 1
         if code == 0xc1:
-            self.buf_fc_mem[0] = cu16l(buf[0], buf[1])
-            self.buf_dur_mem[0] = cu16l(buf[2], buf[3])
-
-            for g in range(6):
-                self.buf_addr_des_mem[0, g] = buf[4+g]
-                self.buf_addr_src_mem[0, g] = buf[10+g]
-                self.buf_addr_bssid_mem[0, g] = buf[16+g]
-
-            self.buf_seq_mem[0] = cu16l(buf[22], buf[23])
-
-            for g in range(min(self.pl_size, len(data) - 1)):
-                self.buf_payload_mem[0, g] = buf[g]
-
-        self.timestamp_low = self.buf_timestamp_low
-        self.bfee_count = self.buf_bfee_count
-        self.Nrx = self.buf_Nrx
-        self.Ntx = self.buf_Ntx
-        self.rssi_a = self.buf_rssi_a
-        self.rssi_b = self.buf_rssi_b
-        self.rssi_c = self.buf_rssi_c
-        self.noise = self.buf_noise
-        self.agc = self.buf_agc
-        self.perm = self.buf_perm
-        self.rate = self.buf_rate
-        self.csi = self.buf_csi
-
-        self.fc = self.buf_fc
-        self.dur = self.buf_dur
-        self.addr_des = self.buf_addr_des
-        self.addr_src = self.buf_addr_src
-        self.addr_bssid = self.buf_addr_bssid
-        self.seq = self.buf_seq
-        self.payload = self.buf_payload
+            if self.ring:
+                row = self.head_0xc1 % self.capacity
+                self.clear_0xc1(row + <int>self.capacity)
+                self.parse_0xc1(data + 1, len(data) - 1,
+                                row + <int>self.capacity)
+                self.clear_0xc1(row)
+                self.head_0xc1 += 1
+            self.parse_0xc1(data + 1, len(data) - 1, row)
+
+        if not self.ring:
+            self.set_views(self.buf_csi.shape[0], self.buf_fc_mem.shape[0])
 
         return code
 
-    def readstp(self, endian='little'):
-        self.stp = read_stpfile(self.file + "stp", endian)
-        return self.stp[0]
+    def last(self, long n):
+        """Set the views to the last ``n`` packets received by ``pmsg`` in
+        ring mode, oldest first, without copying. Returns the count of 0xbb
+        packets in the views."""
+        if not self.ring:
+            raise ValueError("last() requires ring=True!\n")
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        cdef long count_0xbb = min(n, self.head, self.capacity)
+        cdef long count_0xc1 = min(n, self.head_0xc1, self.capacity)
+        self.set_views(count_0xbb, count_0xc1,
+                       self.head % self.capacity + self.capacity - count_0xbb,
+                       self.head_0xc1 % self.capacity + self.capacity -
+                       count_0xc1)
+        self.count = count_0xbb
+        return count_0xbb
 
-    cpdef get_total_rss(self):
-        cdef int i
-        cdef double temp
-        for i in range(self.count):
-            if self.buf_rssi_a_mem[i]:
-                temp = pow(10, self.buf_rssi_a_mem[i] / 10)
-                self.buf_total_rss_mem[i] += temp
-            if self.buf_rssi_b_mem[i]:
-                temp = pow(10, self.buf_rssi_b_mem[i] / 10)
-                self.buf_total_rss_mem[i] += temp
-            if self.buf_rssi_c_mem[i]:
-                temp = pow(10, self.buf_rssi_c_mem[i] / 10)
-                self.buf_total_rss_mem[i] += temp
-            if self.buf_total_rss_mem[i]:
-                temp = 10 * log10(self.buf_total_rss_mem[i]) - 44
-                temp -= self.buf_agc_mem[i]
-                self.buf_total_rss_mem[i] = temp
-        return self.buf_total_rss[:self.count]
-
-    cpdef get_scaled_csi(self, inplace=False):
-        cdef int i, j, k, g
-        cdef double constant2 = 2
-        cdef double constant4_5 = pow(10, 0.45)
-        cdef double temp, quant_error_pwr, thermal_noise_pwr
-        cdef double total_noise_pwr, scale
-
-        self.get_total_rss()
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets):
+        """Parse messages ``buffer[offsets[i]:offsets[i+1]]`` into consecutive
+        rows, 0xbb and 0xc1 packets fill their own rows like ``seek``. In
+        ring mode, they are appended to the ring and the views are left.
 
-        if inplace:
-            scaled_csi = self.csi
-        else:
-            scaled_csi = np.zeros_like(self.csi)
-        cdef np.complex128_t[:, :, :, :] scaled_csi_mem = scaled_csi
+        Returns:
+            tuple: The count of messages parsed and the status code of each
+                message, ``0`` if it is not a CSI packet or it is broken.
+        """
+        cdef Py_ssize_t n = max(offsets.shape[0] - 1, 0)
+        cdef const uint8_t *base = NULL
+        cdef const uint8_t *data
+        cdef Py_ssize_t k, length
+        cdef int count_0xbb = 0
+        cdef int count_0xc1 = 0
+        cdef int row = 0
+        cdef int ret = 0
+
+        check_offsets(offsets, buffer.shape[0])
+        if not self.ring:
+            if n > self.buf_csi.shape[0]:
+                self.resize_0xbb(n)
+            if n > self.buf_fc_mem.shape[0]:
+                self.resize_0xc1(n)
+        if buffer.shape[0]:
+            base = &buffer[0]
+
+        status = np.zeros([n], dtype=np.int32)
+        cdef np.int32_t[:] status_mem = status
+
+        with nogil:
+            for k in range(n):
+                data = base + offsets[k]
+                length = offsets[k+1] - offsets[k]
+                if length < 1:
+                    continue
+                if data[0] == 0xbb:
+                    # the beamforming matrix must lie inside the message
+                    if length < 21 or cu16l(data[17], data[18]) + 21 > length:
+                        continue
+                    if self.ring:
+                        row = (self.head + count_0xbb) % self.capacity
+                        self.clear_0xbb(row + <int>self.capacity)
+                        ret = self.parse_0xbb(data + 1,
+                                              row + <int>self.capacity)
+                        if ret == 0:
+                            self.clear_0xbb(row)
+                            self.parse_0xbb(data + 1, row)
+                    else:
+                        row = count_0xbb
+                        self.clear_0xbb(row)
+                        ret = self.parse_0xbb(data + 1, row)
+                    if ret == 3:
+                        ret = 0
+                        continue
+                    if ret:
+                        break
+                    status_mem[k] = 0xbb
+                    count_0xbb += 1
+                elif data[0] == 0xc1:
+                    if length < 25:
+                        continue
+                    if self.ring:
+                        row = (self.head_0xc1 + count_0xc1) % self.capacity
+                        self.clear_0xc1(row + <int>self.capacity)
+                        self.parse_0xc1(data + 1, <int>length - 1,
+                                        row + <int>self.capacity)
+                    else:
+                        row = count_0xc1
+                    self.clear_0xc1(row)
+                    self.parse_0xc1(data + 1, <int>length - 1, row)
+                    status_mem[k] = 0xc1
+                    count_0xc1 += 1
+
+        if self.ring:
+            self.head += count_0xbb
+            self.head_0xc1 += count_0xc1
+        self.check_0xbb(ret, row)
+        if not self.ring:
+            self.set_views(count_0xbb, count_0xc1)
+            self.count = count_0xbb
+        return count_0xbb + count_0xc1, status
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int decode_0xbb(self, const uint8_t *field, int count) noexcept nogil:
+        """Parse a whole 0xbb field (with the 3-byte prefix) into ``count``"""
+        cdef unsigned short field_len = cu16b(field[0], field[1])
+
+        # the beamforming matrix must lie inside the field
+        if field_len < 21 or cu16l(field[19], field[20]) + 21 > field_len:
+            return 3
+        return self.parse_0xbb(field + 3, count)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int parse_0xbb(self, const uint8_t *buf, int count) noexcept nogil:
+        """Parse a 0xbb field (without the length/code prefix) into ``count``
 
-        for i in range(self.count):
-            temp = 0
-            for j in range(30):
-                for k in range(self.nrxnum):
-                    for g in range(self.ntxnum):
-                        with cython.boundscheck(False):
-                            temp += (self.buf_csi_mem[i, j, k, g].real * \
-                                     self.buf_csi_mem[i, j, k, g].real + \
-                                     self.buf_csi_mem[i, j, k, g].imag * \
-                                     self.buf_csi_mem[i, j, k, g].imag)
-            scale = pow(10, self.buf_total_rss_mem[i] / 10) / (temp / 30)
-            if self.buf_noise_mem[i] == -127:
-                thermal_noise_pwr = pow(10, -9.2)
+        Returns:
+            int: ``0`` on success, ``1``: nrxnum is too small, ``2``: ntxnum
+                is too small, ``3``: wrong beamforming matrix size.
+        """
+        cdef int8_t scratch[30 * 3 * 3 * 2]
+        cdef int dst[3 * 3]
+        cdef int nrx = buf[8]
+        cdef int ntx = buf[9]
+        cdef int n = nrx * ntx
+        cdef int m = self.nrxnum * self.ntxnum
+        cdef int i, j, k, e
+        cdef double *out128 = NULL
+        cdef float *out64 = NULL
+        cdef int16_t *out16
+        cdef int8_t *out8
+        cdef double power[2]
+        cdef const double *sm
+
+        self.buf_timestamp_low_mem[count] = cu32l(buf[0], buf[1], buf[2], buf[3])
+        self.buf_bfee_count_mem[count] = cu16l(buf[4], buf[5])
+        self.buf_Nrx_mem[count] = buf[8]
+        self.buf_Ntx_mem[count] = buf[9]
+        self.buf_rssi_a_mem[count] = buf[10]
+        self.buf_rssi_b_mem[count] = buf[11]
+        self.buf_rssi_c_mem[count] = buf[12]
+        self.buf_noise_mem[count] = <int8_t>buf[13]
+        self.buf_agc_mem[count] = buf[14]
+        self.buf_rate_mem[count] = cu16l(buf[18], buf[19])
+
+        self.buf_perm_mem[count, 0] = (buf[15] & 0x3)
+        self.buf_perm_mem[count, 1] = ((buf[15] >> 2) & 0x3)
+        self.buf_perm_mem[count, 2] = ((buf[15] >> 4) & 0x3)
+
+        if buf[8] > self.nrxnum:
+            return 1
+        if buf[9] > self.ntxnum:
+            return 2
+        if buf[16] | (buf[17] << 8) != 60 * buf[8] * buf[9] + 12:
+            return 3
+
+        # the element of rx j and tx k goes to rx perm[j] of the row
+        for j in range(nrx):
+            if self.buf_perm_mem[count, j] >= self.nrxnum:
+                return 1
+            for k in range(ntx):
+                dst[j * ntx + k] = 2 * (self.buf_perm_mem[count, j] *
+                                        self.ntxnum + k)
+
+        intel_unpack(&buf[20], n, scratch)
+
+        # rows are C-contiguous, ``resize_buf`` allocates them
+        if self.csi_code == CSI_COMPLEX128:
+            out128 = <double *>&self.buf_csi_mem[count, 0, 0, 0]
+            for i in range(30):
+                for e in range(n):
+                    out128[2*m*i + dst[e]] = scratch[2*(n*i + e)]
+                    out128[2*m*i + dst[e] + 1] = scratch[2*(n*i + e) + 1]
+        elif self.csi_code == CSI_COMPLEX64:
+            out64 = <float *>&self.buf_csi64_mem[count, 0, 0, 0]
+            for i in range(30):
+                for e in range(n):
+                    out64[2*m*i + dst[e]] = scratch[2*(n*i + e)]
+                    out64[2*m*i + dst[e] + 1] = scratch[2*(n*i + e) + 1]
+        elif self.csi_code == CSI_INT16:
+            out16 = &self.buf_csi16_mem[count, 0, 0, 0, 0]
+            for i in range(30):
+                for e in range(n):
+                    out16[2*m*i + dst[e]] = scratch[2*(n*i + e)]
+                    out16[2*m*i + dst[e] + 1] = scratch[2*(n*i + e) + 1]
+        else:
+            out8 = &self.buf_csi8_mem[count, 0, 0, 0, 0]
+            for i in range(30):
+                for e in range(n):
+                    out8[2*m*i + dst[e]] = scratch[2*(n*i + e)]
+                    out8[2*m*i + dst[e] + 1] = scratch[2*(n*i + e) + 1]
+
+        # scale the packet while it is in cache, csi of all zeros is kept
+        if self.scale:
+            intel_power(buf[10], buf[11], buf[12], buf[14], <int8_t>buf[13],
+                        power)
+            sm = NULL
+            if self.scale == 2 and (ntx == 2 or ntx == 3):
+                sm = <const double *>&self.sm_table_mem[
+                    2 * (ntx - 2) + ((self.buf_rate_mem[count] & 0x800) != 0),
+                    0, 0]
+            if self.csi_code == CSI_COMPLEX128:
+                intel_scale_row(out128, out128, power[0], power[1], nrx, ntx,
+                                sm, self.nrxnum, self.ntxnum)
             else:
-                thermal_noise_pwr = pow(10, self.buf_noise_mem[i] / 10)
-            quant_error_pwr = scale * (self.buf_Nrx_mem[i] * self.buf_Ntx_mem[i])
-            total_noise_pwr = thermal_noise_pwr + quant_error_pwr
-            if self.buf_Ntx_mem[i] == 2:
-                total_noise_pwr /= constant2
-            if self.buf_Ntx_mem[i] == 3:
-                total_noise_pwr /= constant4_5
-            scale = sqrt(scale / total_noise_pwr)
-            for j in range(30):
-                for k in range(self.nrxnum):
-                    for g in range(self.ntxnum):
-                        with cython.boundscheck(False):
-                            scaled_csi_mem[i, j, k, g].real = \
-                                self.buf_csi_mem[i, j, k, g].real * scale
-                            scaled_csi_mem[i, j, k, g].imag = \
-                                self.buf_csi_mem[i, j, k, g].imag * scale
-        return scaled_csi
+                intel_scale_row(out64, out64, power[0], power[1], nrx, ntx,
+                                sm, self.nrxnum, self.ntxnum)
+        return 0
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void parse_0xc1(self, const uint8_t *buf, int length,
+                         int count) noexcept nogil:
+        """Parse a 0xc1 field (without the length/code prefix) into ``count``"""
+        cdef int g
+
+        self.buf_fc_mem[count] = cu16l(buf[0], buf[1])
+        self.buf_dur_mem[count] = cu16l(buf[2], buf[3])
+
+        for g in range(6):
+            self.buf_addr_des_mem[count, g] = buf[4+g]
+            self.buf_addr_src_mem[count, g] = buf[10+g]
+            self.buf_addr_bssid_mem[count, g] = buf[16+g]
+
+        self.buf_seq_mem[count] = cu16l(buf[22], buf[23])
+
+        for g in range(min(self.pl_size, length)):
+            self.buf_payload_mem[count, g] = buf[g]
+
+    cdef void clear_0xbb(self, int count) noexcept nogil:
+        """Zero the csi of ``count``, a reused row may hold antennas of an
+        older packet which the next one doesn't have"""
+        if self.csi_code == CSI_COMPLEX128:
+            self.buf_csi_mem[count, :, :, :] = 0
+        elif self.csi_code == CSI_COMPLEX64:
+            self.buf_csi64_mem[count, :, :, :] = 0
+        elif self.csi_code == CSI_INT16:
+            self.buf_csi16_mem[count, :, :, :, :] = 0
+        else:
+            self.buf_csi8_mem[count, :, :, :, :] = 0
+
+    cdef void clear_0xc1(self, int count) noexcept nogil:
+        """Zero the payload of ``count``"""
+        self.buf_payload_mem[count, :] = 0
+
+    cdef check_0xbb(self, int ret, int count):
+        """Raise the error returned by ``parse_0xbb``"""
+        if ret == 1:
+            raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
+        if ret == 2:
+            raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
+        if ret == 3:
+            raise Exception("Wrong beamforming matrix size"
+                            ", %dth packet is broken!" % count)
+
+    cdef set_views(self, long count_0xbb, long count_0xc1, long start_0xbb=0,
+                   long start_0xc1=0):
+        cdef long stop_0xbb = start_0xbb + count_0xbb
+        cdef long stop_0xc1 = start_0xc1 + count_0xc1
+
+        self.timestamp_low = self.buf_timestamp_low[start_0xbb:stop_0xbb]
+        self.bfee_count = self.buf_bfee_count[start_0xbb:stop_0xbb]
+        self.Nrx = self.buf_Nrx[start_0xbb:stop_0xbb]
+        self.Ntx = self.buf_Ntx[start_0xbb:stop_0xbb]
+        self.rssi_a = self.buf_rssi_a[start_0xbb:stop_0xbb]
+        self.rssi_b = self.buf_rssi_b[start_0xbb:stop_0xbb]
+        self.rssi_c = self.buf_rssi_c[start_0xbb:stop_0xbb]
+        self.noise = self.buf_noise[start_0xbb:stop_0xbb]
+        self.agc = self.buf_agc[start_0xbb:stop_0xbb]
+        self.perm = self.buf_perm[start_0xbb:stop_0xbb, :]
+        self.rate = self.buf_rate[start_0xbb:stop_0xbb]
+        self.csi = self.buf_csi[start_0xbb:stop_0xbb]
+
+        self.fc = self.buf_fc[start_0xc1:stop_0xc1]
+        self.dur = self.buf_dur[start_0xc1:stop_0xc1]
+        self.addr_des = self.buf_addr_des[start_0xc1:stop_0xc1]
+        self.addr_src = self.buf_addr_src[start_0xc1:stop_0xc1]
+        self.addr_bssid = self.buf_addr_bssid[start_0xc1:stop_0xc1]
+        self.seq = self.buf_seq[start_0xc1:stop_0xc1]
+        self.payload = self.buf_payload[start_0xc1:stop_0xc1]
+
+    def readstp(self, endian='little', unit='s', long start=0, long num=0):
+        self.stp = read_stpfile(self.file + "stp", endian, unit, start, num)
+        return self.stp[0] if self.stp.shape[0] else None
 
-    def get_scaled_csi_sm(self, inplace=False):
-        return self.__remove_sm(self.get_scaled_csi(inplace), True)
+    cpdef get_total_rss(self):
+        cdef const np.uint8_t[:] rssi_a = self.rssi_a
+        cdef const np.uint8_t[:] rssi_b = self.rssi_b
+        cdef const np.uint8_t[:] rssi_c = self.rssi_c
+        cdef const np.uint8_t[:] agc = self.agc
+        cdef Py_ssize_t i, n = min(self.count, rssi_a.shape[0])
+        cdef double rss
+        for i in range(n):
+            rss = intel_rss_power(rssi_a[i], rssi_b[i], rssi_c[i])
+            if rss:
+                rss = 10 * log10(rss) - 44
+                rss -= agc[i]
+            self.buf_total_rss_mem[i] = rss
+        return self.buf_total_rss[:n]
+
+    cpdef get_scaled_csi(self, inplace=False, dtype=np.complex128,
+                         int workers=1):
+        return self.scale_csi(inplace, dtype, workers, False)
+
+    def get_scaled_csi_sm(self, inplace=False, dtype=np.complex128,
+                          int workers=1):
+        return self.scale_csi(inplace, dtype, workers, True)
+
+    cdef scale_csi(self, inplace, dtype, int workers, bint sm):
+        """Scale ``csi`` by the SNR of every packet, and undo the spatial
+        mapping in the same pass if ``sm``"""
+        cdef int code = csi_code_of(dtype, CSI_DTYPES[:2])
+        cdef Py_ssize_t i, n
+
+        # ``csi`` is scaled by ``parse_0xbb`` already
+        if self.scale:
+            if sm != (self.scale == 2):
+                raise ValueError("csi is decoded with output='%s'!\n"
+                                 % self.output)
+            if inplace and code == self.csi_code:
+                return self.csi
+            return self.csi.astype(CSI_DTYPES[code])
+
+        csi = np.ascontiguousarray(self.csi)
+        n = min(self.count, csi.shape[0])
+        if inplace and code == self.csi_code:
+            scaled_csi = csi
+        else:
+            scaled_csi = np.zeros(csi.shape[:4], dtype=CSI_DTYPES[code])
+
+        # linear rss and thermal noise power of every packet
+        power = np.empty([n, 2])
+        cdef double[:, :] power_mem = power
+        cdef const np.uint8_t[:] rssi_a = self.rssi_a
+        cdef const np.uint8_t[:] rssi_b = self.rssi_b
+        cdef const np.uint8_t[:] rssi_c = self.rssi_c
+        cdef const np.uint8_t[:] agc = self.agc
+        cdef const np.int8_t[:] noise = self.noise
+        for i in range(n):
+            intel_power(rssi_a[i], rssi_b[i], rssi_c[i], agc[i], noise[i],
+                        &power_mem[i, 0])
+
+        sm_table = self.sm_table if sm else None
+
+        if workers > 1:
+            bounds = np.linspace(0, n, workers + 1).astype(np.intp)
+            with ThreadPoolExecutor(workers) as executor:
+                rows = list(executor.map(
+                    _intel_scale_range, [self] * workers, [csi] * workers,
+                    [scaled_csi] * workers, [power] * workers,
+                    [sm_table] * workers, bounds[:-1], bounds[1:]))
+        else:
+            bounds = [0, n]
+            rows = [_intel_scale_range(self, csi, scaled_csi, power, sm_table,
+                                       0, n)]
+        for row, stop in zip(rows, bounds[1:]):
+            if row < stop:
+                raise ZeroDivisionError("csi of packet %d is all zeros" % row)
+        return scaled_csi
 
     def apply_sm(self, scaled_csi):
         return self.__remove_sm(scaled_csi)
@@ -429,7 +918,7 @@ cdef class Intel:
         if inplace:
             ret = scaled_csi
         else:
-            ret = np.zeros_like(self.csi)
+            ret = np.zeros_like(scaled_csi)
 
         cdef int i, N, M, B
         cdef np.complex128_t[:, :, :, :] scaled_csi_mem = scaled_csi
@@ -464,6 +953,93 @@ cdef class Intel:
 
         return ret
 
+    cdef get_count(self):
+        cdef MappedFile mf = MappedFile(self.file)
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+        cdef Py_ssize_t cur = 0
+        cdef int count_0xbb = 0
+        cdef int count_0xc1 = 0
+        cdef unsigned short field_len
+
+        # count: only the 3-byte length/code prefix of each field is read
+        with nogil:
+            while cur < (lens-3):
+                field_len = data[cur+1] + (data[cur] << 8)
+                if field_len == 0 or cur + 2 + field_len > lens:
+                    break
+                if data[cur+2] == 0xbb:
+                    count_0xbb += 1
+                elif data[cur+2] == 0xc1:
+                    count_0xc1 += 1
+                cur += (field_len + 2)
+        mf.close()
+        return count_0xbb, count_0xc1
+
+    cdef resize_0xbb(self, long pk_num):
+        self.buf_timestamp_low = resize_buf(self.buf_timestamp_low, [pk_num],
+                                            np.uint32)
+        self.buf_bfee_count = resize_buf(self.buf_bfee_count, [pk_num],
+                                         np.uint16)
+        self.buf_Nrx = resize_buf(self.buf_Nrx, [pk_num], np.uint8)
+        self.buf_Ntx = resize_buf(self.buf_Ntx, [pk_num], np.uint8)
+        self.buf_rssi_a = resize_buf(self.buf_rssi_a, [pk_num], np.uint8)
+        self.buf_rssi_b = resize_buf(self.buf_rssi_b, [pk_num], np.uint8)
+        self.buf_rssi_c = resize_buf(self.buf_rssi_c, [pk_num], np.uint8)
+        self.buf_noise = resize_buf(self.buf_noise, [pk_num], np.int8)
+        self.buf_agc = resize_buf(self.buf_agc, [pk_num], np.uint8)
+        self.buf_perm = resize_buf(self.buf_perm, [pk_num, 3], np.uint8)
+        self.buf_rate = resize_buf(self.buf_rate, [pk_num], np.uint16)
+        self.buf_csi = resize_buf(self.buf_csi,
+                                  csi_shape(self.csi_code,
+                                            [pk_num, 30, self.nrxnum,
+                                             self.ntxnum]),
+                                  self.csi_dtype)
+        self.buf_total_rss = resize_buf(self.buf_total_rss, [pk_num],
+                                        np.float64)
+
+        self.buf_timestamp_low_mem = self.buf_timestamp_low
+        self.buf_bfee_count_mem = self.buf_bfee_count
+        self.buf_Nrx_mem = self.buf_Nrx
+        self.buf_Ntx_mem = self.buf_Ntx
+        self.buf_rssi_a_mem = self.buf_rssi_a
+        self.buf_rssi_b_mem = self.buf_rssi_b
+        self.buf_rssi_c_mem = self.buf_rssi_c
+        self.buf_noise_mem = self.buf_noise
+        self.buf_agc_mem = self.buf_agc
+        self.buf_perm_mem = self.buf_perm
+        self.buf_rate_mem = self.buf_rate
+        if self.csi_code == CSI_COMPLEX128:
+            self.buf_csi_mem = self.buf_csi
+        elif self.csi_code == CSI_COMPLEX64:
+            self.buf_csi64_mem = self.buf_csi
+        elif self.csi_code == CSI_INT16:
+            self.buf_csi16_mem = self.buf_csi
+        else:
+            self.buf_csi8_mem = self.buf_csi
+        self.buf_total_rss_mem = self.buf_total_rss
+
+    cdef resize_0xc1(self, long pk_num):
+        self.buf_fc = resize_buf(self.buf_fc, [pk_num], np.uint16)
+        self.buf_dur = resize_buf(self.buf_dur, [pk_num], np.uint16)
+        self.buf_addr_des = resize_buf(self.buf_addr_des, [pk_num, 6],
+                                       np.uint8)
+        self.buf_addr_src = resize_buf(self.buf_addr_src, [pk_num, 6],
+                                       np.uint8)
+        self.buf_addr_bssid = resize_buf(self.buf_addr_bssid, [pk_num, 6],
+                                         np.uint8)
+        self.buf_seq = resize_buf(self.buf_seq, [pk_num], np.uint16)
+        self.buf_payload = resize_buf(self.buf_payload, [pk_num, self.pl_size],
+                                      np.uint8)
+
+        self.buf_fc_mem = self.buf_fc
+        self.buf_dur_mem = self.buf_dur
+        self.buf_addr_des_mem = self.buf_addr_des
+        self.buf_addr_src_mem = self.buf_addr_src
+        self.buf_addr_bssid_mem = self.buf_addr_bssid
+        self.buf_seq_mem = self.buf_seq
+        self.buf_payload_mem = self.buf_payload
+
     def __report(self, int count_0xbb, int count_0xc1):
         """Report parsed result."""
         if count_0xbb == 0:
@@ -480,13 +1056,16 @@ cdef class Intel:
 
 cdef class Atheros:
     def __cinit__(self, file, nrxnum=3, ntxnum=2, pl_size=0, tones=56,
-                  if_report=True, bufsize=0, *argv, **kw):
+                  if_report=True, bufsize=0, csi_dtype=np.complex128,
+                  *argv, **kw):
         self.file = file
         self.nrxnum = nrxnum
         self.ntxnum = ntxnum
         self.tones = tones
         self.pl_size = pl_size
         self.if_report = if_report
+        self.csi_code = csi_code_of(csi_dtype, CSI_DTYPES[:3])
+        self.csi_dtype = np.dtype(csi_dtype)
 
         if tones not in [56, 114]:
             raise ValueError("tones can only take 56 and 114!\n")
@@ -501,25 +1080,41 @@ cdef class Atheros:
         else:
             pk_num = bufsize
 
-        btype = np.intp
-        self.buf_timestamp = np.zeros([pk_num], dtype=np.uint64)
-        self.buf_csi_len = np.zeros([pk_num], dtype=btype)
-        self.buf_tx_channel = np.zeros([pk_num], dtype=btype)
-        self.buf_err_info = np.zeros([pk_num], dtype=btype)
-        self.buf_noise_floor = np.zeros([pk_num], dtype=btype)
-        self.buf_Rate = np.zeros([pk_num], dtype=btype)
-        self.buf_bandWidth = np.zeros([pk_num], dtype=btype)
-        self.buf_num_tones = np.zeros([pk_num], dtype=btype)
-        self.buf_nr = np.zeros([pk_num], dtype=btype)
-        self.buf_nc = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_1 = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_2 = np.zeros([pk_num], dtype=btype)
-        self.buf_rssi_3 = np.zeros([pk_num], dtype=btype)
-        self.buf_payload_len = np.zeros([pk_num], dtype=btype)
-        self.buf_csi = np.zeros([pk_num, self.tones, self.nrxnum, self.ntxnum],
-                                dtype=np.complex128)
-        self.buf_payload = np.zeros([pk_num, self.pl_size], dtype=np.uint8)
+        self.resize(pk_num)
+
+    def __init__(self, file, nrxnum=3, ntxnum=2, pl_size=0, tones=56,
+                 if_report=True, bufsize=0, csi_dtype=np.complex128):
+        pass
+
+    cdef resize(self, long pk_num):
+        self.buf_timestamp = resize_buf(self.buf_timestamp, [pk_num],
+                                        np.uint64)
+        self.buf_csi_len = resize_buf(self.buf_csi_len, [pk_num], np.uint16)
+        self.buf_tx_channel = resize_buf(self.buf_tx_channel, [pk_num],
+                                         np.uint16)
+        self.buf_err_info = resize_buf(self.buf_err_info, [pk_num], np.uint8)
+        self.buf_noise_floor = resize_buf(self.buf_noise_floor, [pk_num],
+                                          np.uint8)
+        self.buf_Rate = resize_buf(self.buf_Rate, [pk_num], np.uint8)
+        self.buf_bandWidth = resize_buf(self.buf_bandWidth, [pk_num],
+                                        np.uint8)
+        self.buf_num_tones = resize_buf(self.buf_num_tones, [pk_num],
+                                        np.uint8)
+        self.buf_nr = resize_buf(self.buf_nr, [pk_num], np.uint8)
+        self.buf_nc = resize_buf(self.buf_nc, [pk_num], np.uint8)
+        self.buf_rssi = resize_buf(self.buf_rssi, [pk_num], np.uint8)
+        self.buf_rssi_1 = resize_buf(self.buf_rssi_1, [pk_num], np.uint8)
+        self.buf_rssi_2 = resize_buf(self.buf_rssi_2, [pk_num], np.uint8)
+        self.buf_rssi_3 = resize_buf(self.buf_rssi_3, [pk_num], np.uint8)
+        self.buf_payload_len = resize_buf(self.buf_payload_len, [pk_num],
+                                          np.uint16)
+        self.buf_csi = resize_buf(self.buf_csi,
+                                  csi_shape(self.csi_code,
+                                            [pk_num, self.tones, self.nrxnum,
+                                             self.ntxnum]),
+                                  self.csi_dtype)
+        self.buf_payload = resize_buf(self.buf_payload, [pk_num, self.pl_size],
+                                      np.uint8)
 
         self.buf_timestamp_mem = self.buf_timestamp
         self.buf_csi_len_mem = self.buf_csi_len
@@ -536,197 +1131,272 @@ cdef class Atheros:
         self.buf_rssi_2_mem = self.buf_rssi_2
         self.buf_rssi_3_mem = self.buf_rssi_3
         self.buf_payload_len_mem = self.buf_payload_len
-        self.buf_csi_mem = self.buf_csi
+        if self.csi_code == CSI_COMPLEX128:
+            self.buf_csi_mem = self.buf_csi
+        elif self.csi_code == CSI_COMPLEX64:
+            self.buf_csi64_mem = self.buf_csi
+        else:
+            self.buf_csi16_mem = self.buf_csi
         self.buf_payload_mem = self.buf_payload
 
-    def __init__(self, file, nrxnum=3, ntxnum=2, pl_size=0, tones=56,
-                 if_report=True, bufsize=0):
-        pass
-
-    cpdef read(self, endian='little'):
-        self.seek(self.file, 0, 0, endian)
-
-    cpdef seek(self, file, long pos, long num, endian='little'):
-        cdef FILE *f
+    cpdef read(self, endian='little', bint resume=False):
+        if resume:
+            self.seek(self.file, self.last_pos, 0, endian, True)
+        else:
+            self.seek(self.file, 0, 0, endian)
 
-        tempfile = file.encode(encoding="utf-8")
-        cdef char *datafile = tempfile
+    cpdef seek(self, file, long pos, long num, endian='little',
+               bint append=False):
+        cdef bint big
+        if endian == "little":
+            big = False
+        elif endian == "big":
+            big = True
+        else:
+            raise ValueError("endian must be either 'little' or 'big'")
 
-        f = fopen(datafile, "rb")
-        if f is NULL:
-            printf("Open failed!\n")
-            exit(-1)
+        cdef MappedFile mf = MappedFile(file)
 
-        fseek(f, 0, SEEK_END)
-        cdef long lens = ftell(f)
-        fseek(f, pos, SEEK_SET)
+        if num == 0:
+            num = <long>mf.size
 
-        cdef int count = 0
-        cdef int c_len, pl_len, pl_stop
-        cdef int l, field_len
-        cdef uint16_t (*ath_cu16)(uint8_t, uint8_t)
-        cdef uint64_t (*ath_cu64)(uint64_t, uint64_t, uint64_t, uint64_t,
-                                  uint64_t, uint64_t, uint64_t, uint64_t)
+        try:
+            if append:
+                self.decode_from(mf, pos, num, big, self.count, True)
+            else:
+                self.decode_from(mf, pos, num, big)
+        finally:
+            mf.close()
 
-        if num == 0:
-            num = lens
+        if self.if_report:
+            self.__report(self.count)
+
+    def iter_chunks(self, long chunk_size, file=None, endian='little',
+                    long pos=0):
+        """Yield ``self`` with the views of up to ``chunk_size`` packets at a
+        time. ``file`` stays mapped and the buffers are reused, so views of a
+        chunk are overwritten by the next one."""
+        cdef bint big
+        if endian == "little":
+            big = False
+        elif endian == "big":
+            big = True
+        else:
+            raise ValueError("endian must be either 'little' or 'big'")
 
-        cdef int bits_left, bitmask, idx, h_data, current_data
-        cdef int k, nc_idx, nr_idx, imag, real, i
-        cdef unsigned char buf[4096]
-        cdef unsigned char csi_buf[4096]
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        self.resize(chunk_size)
+        mf = MappedFile(file)
+        cur = pos
+        used = chunk_size
+        try:
+            while True:
+                # clear what a smaller matrix or payload wouldn't overwrite
+                self.buf_csi[:used] = 0
+                self.buf_payload[:used] = 0
+                cur = self.decode_from(mf, cur, chunk_size, big)
+                if self.count == 0:
+                    break
+                used = self.count
+                yield self
+        finally:
+            mf.close()
+
+    def follow(self, long chunk_size=1, file=None, endian='little',
+               long pos=0, double interval=0.1, timeout=None):
+        """Yield ``self`` with the views of up to ``chunk_size`` packets at a
+        time, then wait for packets appended to ``file`` and yield them. It
+        stops if ``file`` doesn't grow in ``timeout`` seconds."""
+        cdef bint big
         if endian == "little":
-            ath_cu16 = cu16l
-            ath_cu64 = cu64l
+            big = False
         elif endian == "big":
-            ath_cu16 = cu16b
-            ath_cu64 = cu64b
+            big = True
         else:
-            fclose(f)
             raise ValueError("endian must be either 'little' or 'big'")
 
-        while pos < (lens - 4):
-            l = <int>fread(&buf, sizeof(unsigned char), 2, f)
-            field_len = ath_cu16(buf[0], buf[1])
-            pos += 2
-            if (pos + field_len) > lens:
-                break
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
 
-            l = <int>fread(&buf, sizeof(unsigned char), 25, f)
-            self.buf_timestamp_mem[count] = ath_cu64(buf[0], buf[1], buf[2],
-                                                     buf[3], buf[4], buf[5],
-                                                     buf[6], buf[7])
-            self.buf_csi_len_mem[count] = ath_cu16(buf[8], buf[9])
-            self.buf_tx_channel_mem[count] = ath_cu16(buf[10], buf[11])
-            self.buf_payload_len_mem[count] = ath_cu16(buf[23], buf[24])
-            self.buf_err_info_mem[count] = buf[12]
-            self.buf_noise_floor_mem[count] = buf[13]
-            self.buf_Rate_mem[count] = buf[14]
-            self.buf_bandWidth_mem[count] = buf[15]
-            self.buf_num_tones_mem[count] = buf[16]
-            self.buf_nr_mem[count] = buf[17]
-            self.buf_nc_mem[count] = buf[18]
-            self.buf_rssi_mem[count] = buf[19]
-            self.buf_rssi_1_mem[count] = buf[20]
-            self.buf_rssi_2_mem[count] = buf[21]
-            self.buf_rssi_3_mem[count] = buf[22]
-            pos += 25
-
-            c_len = <int>self.buf_csi_len_mem[count]
-            if c_len > 0:
-                if buf[17] > self.nrxnum:
-                    fclose(f)
-                    raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
-                if buf[18] > self.ntxnum:
-                    fclose(f)
-                    raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
-
-                l = <int>fread(&csi_buf, sizeof(unsigned char), c_len, f)
-                bits_left = 16
-                bitmask = (1 << 10) - 1
-
-                idx = 0
-                h_data = csi_buf[idx]
-                idx += 1
-                h_data += (csi_buf[idx] << 8)
-                idx += 1
-                current_data = h_data & ((1 << 16) - 1)
-
-                for k in range(buf[16]):
-                    for nr_idx in range(buf[17]):
-                        for nc_idx in range(buf[18]):
-                            # imag
-                            if (bits_left - 10) < 0:
-                                h_data = csi_buf[idx]
-                                idx += 1
-                                h_data += (csi_buf[idx] << 8)
-                                idx += 1
-                                current_data += h_data << bits_left
-                                bits_left += 16
-                            imag = current_data & bitmask
-                            if imag & (1 << 9):
-                                imag -= (1 << 10)
-
-                            bits_left -= 10
-                            current_data = current_data >> 10
-                            # real
-                            if (bits_left - 10) < 0:
-                                h_data = csi_buf[idx]
-                                idx += 1
-                                h_data += (csi_buf[idx] << 8)
-                                idx += 1
-                                current_data += h_data << bits_left
-                                bits_left += 16
-                            real = current_data & bitmask
-                            if real & (1 << 9):
-                                real -= (1 << 10)
-
-                            bits_left -= 10
-                            current_data = current_data >> 10
-                            # csi
-                            set_csi_mem(self.buf_csi_mem, count, k,
-                                        nr_idx, nc_idx, real, imag)
-                pos += c_len
-
-            pl_len = <int>self.buf_payload_len_mem[count]
-            pl_stop = min(pl_len, self.pl_size)
-            if pl_len > 0:
-                l = <int>fread(&buf, sizeof(unsigned char), pl_len, f)
-                for i in range(pl_stop):
-                    self.buf_payload_mem[count, i] = buf[i]
-                pos += pl_len
-
-            # In matlab, read_log_file drops the last two packets, but here we 
-            # keep them.
-            count += 1
-            if count >= num:
+        self.resize(chunk_size)
+        cur = pos
+        used = chunk_size
+        while True:
+            mf = MappedFile(file)
+            size = mf.size
+            if size < cur:
+                cur = pos   # truncated, start over
+            try:
+                while True:
+                    self.buf_csi[:used] = 0
+                    self.buf_payload[:used] = 0
+                    cur = self.decode_from(mf, cur, chunk_size, big)
+                    if self.count == 0:
+                        break
+                    used = self.count
+                    yield self
+            finally:
+                mf.close()
+            if not wait_growth(file, size, interval, timeout):
                 break
 
-        fclose(f)
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, bint big, int start=0,
+                                bint grow=False) except -1:
+        """Decode packets from ``cur`` into the rows from ``start`` until
+        ``num`` packets are parsed or the buffer is full (it grows if
+        ``grow``), then set the views of all rows. Returns the offset of the
+        first packet left, it is kept as ``last_pos``."""
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+        cdef Py_ssize_t rec
+        cdef int count = start
+        cdef int field_len, c_len, pl_len
+        cdef int ret = 0
+
+        with nogil:
+            while cur < (lens - 4):
+                if big:
+                    field_len = cu16b(data[cur], data[cur+1])
+                else:
+                    field_len = cu16l(data[cur], data[cur+1])
+                rec = cur + 2
+                if (rec + field_len) > lens or rec + 25 > lens:
+                    break
+                if big:
+                    c_len = cu16b(data[rec+8], data[rec+9])
+                    pl_len = cu16b(data[rec+23], data[rec+24])
+                else:
+                    c_len = cu16l(data[rec+8], data[rec+9])
+                    pl_len = cu16l(data[rec+23], data[rec+24])
+                if rec + 25 + c_len + pl_len > lens:
+                    break  # truncated
+                if count >= self.buf_csi.shape[0]:
+                    if not grow:
+                        break  # buffer is full
+                    with gil:
+                        self.resize(2 * count + 1)
+
+                ret = self.parse(data + rec, count, big)
+                if ret:
+                    break
+                cur = rec + 25 + c_len + pl_len
+
+                # In matlab, read_log_file drops the last two packets, but
+                # here we keep them.
+                count += 1
+                if count - start >= num:
+                    break
+
+        self.check(ret)
+        self.set_views(count)
+        self.count = count
+        self.last_pos = cur
+        return cur
+
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows,
+                    endian='little'):
+        """Decode the packets at ``offsets`` into ``rows`` in one pass
+
+        ``offsets`` should be ascending, so the file is walked forward once.
+        ``rows`` is a permutation of ``range(len(offsets))``.
+        """
+        cdef bint big
+        if endian == "little":
+            big = False
+        elif endian == "big":
+            big = True
+        else:
+            raise ValueError("endian must be either 'little' or 'big'")
+
+        cdef Py_ssize_t n = offsets.shape[0]
+        cdef Py_ssize_t k = 0
+        cdef Py_ssize_t cur
+        cdef int c_len, pl_len
+        cdef int ret = 0
+
+        if rows.shape[0] != n:
+            raise ValueError("offsets and rows must have the same length")
+        if n and (np.min(rows) < 0 or np.max(rows) >= n):
+            raise ValueError("rows must be in range(len(offsets))")
+        if n > self.buf_csi.shape[0]:
+            self.resize(n)
+
+        cdef MappedFile mf = MappedFile(file)
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+
+        with nogil:
+            for k in range(n):
+                cur = offsets[k] + 2
+                if cur < 2 or cur + 25 > lens:
+                    ret = 4
+                    break
+                if big:
+                    c_len = cu16b(data[cur+8], data[cur+9])
+                    pl_len = cu16b(data[cur+23], data[cur+24])
+                else:
+                    c_len = cu16l(data[cur+8], data[cur+9])
+                    pl_len = cu16l(data[cur+23], data[cur+24])
+                if cur + 25 + c_len + pl_len > lens:
+                    ret = 4
+                    break
+                ret = self.parse(data + cur, <int>rows[k], big)
+                if ret:
+                    break
+
+        mf.close()
+        if ret == 4:
+            raise ValueError("No packet at offset %d" % offsets[k])
+        self.check(ret)
 
         if self.if_report:
-            self.__report(count)
+            self.__report(n)
 
-        self.timestamp = self.buf_timestamp[:count]
-        self.csi_len = self.buf_csi_len[:count]
-        self.tx_channel = self.buf_tx_channel[:count]
-        self.err_info = self.buf_err_info[:count]
-        self.noise_floor = self.buf_noise_floor[:count]
-        self.Rate = self.buf_Rate[:count]
-        self.bandWidth = self.buf_bandWidth[:count]
-        self.num_tones = self.buf_num_tones[:count]
-        self.nr = self.buf_nr[:count]
-        self.nc = self.buf_nc[:count]
-        self.rssi = self.buf_rssi[:count]
-        self.rssi_1 = self.buf_rssi_1[:count]
-        self.rssi_2 = self.buf_rssi_2[:count]
-        self.rssi_3 = self.buf_rssi_3[:count]
-        self.payload_len = self.buf_payload_len[:count]
-        self.csi = self.buf_csi[:count]
-        self.payload = self.buf_payload[:count]
-        self.count = count
+        self.set_views(n)
+        self.count = n
 
     cpdef pmsg(self, unsigned char *data, endian='little'):
-        cdef int count = 0
-        cdef int c_len, pl_len, pl_stop
+        cdef bint big
+        if endian == "little":
+            big = False
+        elif endian == "big":
+            big = True
+        else:
+            raise ValueError("endian must be either 'little' or 'big'")
+
+        self.check(self.parse(data, 0, big))
+        self.set_views(self.buf_csi.shape[0])
+
+        return 0xff00
 
-        cdef int bits_left, bitmask, idx, h_data, current_data
-        cdef int k, nc_idx, nr_idx, imag, real, i
-        cdef unsigned char *buf
-        cdef unsigned char *csi_buf
-        cdef uint16_t (*ath_cu16)(uint8_t, uint8_t)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int parse(self, const uint8_t *buf, int count,
+                   bint big) noexcept nogil:
+        """Parse a packet (without the 2-byte field length) into ``count``
+
+        Returns:
+            int: ``0`` on success, ``1``: nrxnum is too small, ``2``: ntxnum
+                is too small, ``3``: tones is too small.
+        """
+        cdef int c_len, pl_len, pl_stop, i
+        cdef uint16_t (*ath_cu16)(uint8_t, uint8_t) noexcept nogil
         cdef uint64_t (*ath_cu64)(uint64_t, uint64_t, uint64_t, uint64_t,
-                                  uint64_t, uint64_t, uint64_t, uint64_t)
+                                  uint64_t, uint64_t, uint64_t,
+                                  uint64_t) noexcept nogil
 
-        buf = data
-        if endian == "little":
-            ath_cu16 = cu16l
-            ath_cu64 = cu64l
-        elif endian == "big":
+        if big:
             ath_cu16 = cu16b
             ath_cu64 = cu64b
         else:
-            raise ValueError("endian must be either 'little' or 'big'")
+            ath_cu16 = cu16l
+            ath_cu64 = cu64l
+
         self.buf_timestamp_mem[count] = ath_cu64(buf[0], buf[1], buf[2],
                                                  buf[3], buf[4], buf[5],
                                                  buf[6], buf[7])
@@ -748,85 +1418,64 @@ cdef class Atheros:
         c_len = <int>self.buf_csi_len_mem[count]
         if c_len > 0:
             if buf[17] > self.nrxnum:
-                raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
+                return 1
             if buf[18] > self.ntxnum:
-                raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
-
-            csi_buf = &buf[25]
-            bits_left = 16
-            bitmask = (1 << 10) - 1
-
-            idx = 0
-            h_data = csi_buf[idx]
-            idx += 1
-            h_data += (csi_buf[idx] << 8)
-            idx += 1
-            current_data = h_data & ((1 << 16) - 1)
-
-            for k in range(buf[16]):
-                for nr_idx in range(buf[17]):
-                    for nc_idx in range(buf[18]):
-                        # imag
-                        if (bits_left - 10) < 0:
-                            h_data = csi_buf[idx]
-                            idx += 1
-                            h_data += (csi_buf[idx] << 8)
-                            idx += 1
-                            current_data += h_data << bits_left
-                            bits_left += 16
-                        imag = current_data & bitmask
-                        if imag & (1 << 9):
-                            imag -= (1 << 10)
-
-                        bits_left -= 10
-                        current_data = current_data >> 10
-                        # real
-                        if (bits_left - 10) < 0:
-                            h_data = csi_buf[idx]
-                            idx += 1
-                            h_data += (csi_buf[idx] << 8)
-                            idx += 1
-                            current_data += h_data << bits_left
-                            bits_left += 16
-                        real = current_data & bitmask
-                        if real & (1 << 9):
-                            real -= (1 << 10)
-
-                        bits_left -= 10
-                        current_data = current_data >> 10
-                        # csi
-                        set_csi_mem(self.buf_csi_mem, count, k,
-                                    nr_idx, nc_idx, real, imag)
+                return 2
+            if buf[16] > self.tones:
+                return 3
+
+            # rows are C-contiguous, ``resize_buf`` allocates them
+            if self.csi_code == CSI_COMPLEX128:
+                ath_unpack(&buf[25], c_len, buf[16], buf[17], buf[18],
+                           <double *>&self.buf_csi_mem[count, 0, 0, 0],
+                           self.nrxnum, self.ntxnum)
+            elif self.csi_code == CSI_COMPLEX64:
+                ath_unpack(&buf[25], c_len, buf[16], buf[17], buf[18],
+                           <float *>&self.buf_csi64_mem[count, 0, 0, 0],
+                           self.nrxnum, self.ntxnum)
+            else:
+                ath_unpack(&buf[25], c_len, buf[16], buf[17], buf[18],
+                           &self.buf_csi16_mem[count, 0, 0, 0, 0],
+                           self.nrxnum, self.ntxnum)
 
         pl_len = <int>self.buf_payload_len_mem[count]
         pl_stop = min(pl_len, self.pl_size)
         if pl_len > 0:
             for i in range(pl_stop):
                 self.buf_payload_mem[count, i] = buf[25+c_len+i]
+        return 0
+
+    cdef check(self, int ret):
+        """Raise the error returned by ``parse``"""
+        if ret == 1:
+            raise ValueError("nrxnum=%d is too small!\n" % self.nrxnum)
+        if ret == 2:
+            raise ValueError("ntxnum=%d is too small!\n" % self.ntxnum)
+        if ret == 3:
+            raise ValueError("tones=%d is too small!\n" % self.tones)
+
+    cdef set_views(self, long count):
+        self.timestamp = self.buf_timestamp[:count]
+        self.csi_len = self.buf_csi_len[:count]
+        self.tx_channel = self.buf_tx_channel[:count]
+        self.err_info = self.buf_err_info[:count]
+        self.noise_floor = self.buf_noise_floor[:count]
+        self.Rate = self.buf_Rate[:count]
+        self.bandWidth = self.buf_bandWidth[:count]
+        self.num_tones = self.buf_num_tones[:count]
+        self.nr = self.buf_nr[:count]
+        self.nc = self.buf_nc[:count]
+        self.rssi = self.buf_rssi[:count]
+        self.rssi_1 = self.buf_rssi_1[:count]
+        self.rssi_2 = self.buf_rssi_2[:count]
+        self.rssi_3 = self.buf_rssi_3[:count]
+        self.payload_len = self.buf_payload_len[:count]
+        self.csi = self.buf_csi[:count]
+        self.payload = self.buf_payload[:count]
 
-        self.timestamp = self.buf_timestamp
-        self.csi_len = self.buf_csi_len
-        self.tx_channel = self.buf_tx_channel
-        self.err_info = self.buf_err_info
-        self.noise_floor = self.buf_noise_floor
-        self.Rate = self.buf_Rate
-        self.bandWidth = self.buf_bandWidth
-        self.num_tones = self.buf_num_tones
-        self.nr = self.buf_nr
-        self.nc = self.buf_nc
-        self.rssi = self.buf_rssi
-        self.rssi_1 = self.buf_rssi_1
-        self.rssi_2 = self.buf_rssi_2
-        self.rssi_3 = self.buf_rssi_3
-        self.payload_len = self.buf_payload_len
-        self.csi = self.buf_csi
-        self.payload = self.buf_payload
-
-        return 0xff00
-
-    def readstp(self, endian='little'):
-        self.stp = read_stpfile(self.file + "stp", endian)
-        return self.stp[0]
+    def readstp(self, endian='little', unit='s', long start=0, long num=0):
+        self.stp = read_stpfile(self.file + "stp", endian, unit, start, num)
+        return self.stp[0] if self.stp.shape[0] else None
 
     def __report(self, int count):
         """Report parsed result."""
@@ -835,35 +1484,82 @@ cdef class Atheros:
 
 cdef class Nexmon:
     def __cinit__(self, file, chip, bw, if_report=True, bufsize=0,
-                  *argv, **kw):
+                  csi_dtype=np.complex128, ring=False, alloc='grow', *argv,
+                  **kw):
         self.file = file
         self.chip = chip
         self.bw = bw
         self.if_report = if_report
 
+        if chip == '4339' or chip == '43455c0':
+            self.chip_code = CHIP_INT16
+        elif chip == '4358':
+            self.chip_code = CHIP_FLOAT_9_5
+        elif chip == '4366c0':
+            self.chip_code = CHIP_FLOAT_12_6
+        else:
+            self.chip_code = CHIP_UNKNOWN
+
+        # only the int16 format of 4339 and 43455c0 fits in int16 pairs
+        if self.chip_code == CHIP_INT16:
+            self.csi_code = csi_code_of(csi_dtype, CSI_DTYPES[:3])
+        else:
+            self.csi_code = csi_code_of(csi_dtype, CSI_DTYPES[:2])
+        self.csi_dtype = np.dtype(csi_dtype)
+
+        if alloc not in ['exact', 'grow']:
+            raise ValueError("alloc can only take 'exact' and 'grow'!\n")
+        # ``bufsize`` stays the maximum amount of packets
+        self.grow = alloc == 'grow' and bufsize == 0
+
+        if ring and bufsize < 1:
+            raise ValueError("ring requires bufsize > 0!\n")
+        self.ring = ring
+        self.capacity = bufsize
+
         if bufsize == 0:
             if file is None:
                 self.count = 1
                 pk_num = 1
-            else:
+            elif alloc == 'exact':
                 pk_num = self.get_count()
+            else:
+                # as if every record carried a whole CSI
+                lens = os.path.getsize(file)
+                pk_num = lens // (16 + 60 + 4 * int(self.bw * 3.2))
+                pk_num = max(pk_num, 1)
         else:
             pk_num = bufsize
+        if ring:
+            # every slot is mirrored, so the last packets are contiguous
+            pk_num = 2 * bufsize
+
+        self.resize(pk_num)
+        self._autoscale = 1
 
-        btype = np.intp
-        self.buf_sec = np.zeros([pk_num], dtype=np.uint32)
-        self.buf_usec = np.zeros([pk_num], dtype=np.uint32)
-        self.buf_caplen = np.zeros([pk_num], dtype=btype)
-        self.buf_wirelen = np.zeros([pk_num], dtype=btype)
-        self.buf_magic = np.zeros([pk_num], dtype=btype)
-        self.buf_src_addr = np.zeros([pk_num, 6], dtype=btype)
-        self.buf_seq = np.zeros([pk_num], dtype=btype)
-        self.buf_core = np.zeros([pk_num], dtype=btype)
-        self.buf_spatial = np.zeros([pk_num], dtype=btype)
-        self.buf_chan_spec = np.zeros([pk_num], dtype=btype)
-        self.buf_chip_version = np.zeros([pk_num], dtype=btype)
-        self.buf_csi = np.zeros([pk_num, int(self.bw * 3.2)],
-                                dtype=np.complex128)
+    def __init__(self, file, chip, bw, if_report=True, bufsize=0,
+                 csi_dtype=np.complex128, ring=False, alloc='grow'):
+        pass
+
+    cdef resize(self, long pk_num):
+        self.buf_sec = resize_buf(self.buf_sec, [pk_num], np.uint32)
+        self.buf_usec = resize_buf(self.buf_usec, [pk_num], np.uint32)
+        self.buf_caplen = resize_buf(self.buf_caplen, [pk_num], np.uint32)
+        self.buf_wirelen = resize_buf(self.buf_wirelen, [pk_num], np.uint32)
+        self.buf_magic = resize_buf(self.buf_magic, [pk_num], np.uint32)
+        self.buf_src_addr = resize_buf(self.buf_src_addr, [pk_num, 6],
+                                       np.uint8)
+        self.buf_seq = resize_buf(self.buf_seq, [pk_num], np.uint16)
+        self.buf_core = resize_buf(self.buf_core, [pk_num], np.uint8)
+        self.buf_spatial = resize_buf(self.buf_spatial, [pk_num], np.uint8)
+        self.buf_chan_spec = resize_buf(self.buf_chan_spec, [pk_num],
+                                        np.uint16)
+        self.buf_chip_version = resize_buf(self.buf_chip_version, [pk_num],
+                                           np.uint16)
+        self.buf_csi = resize_buf(self.buf_csi,
+                                  csi_shape(self.csi_code,
+                                            [pk_num, int(self.bw * 3.2)]),
+                                  self.csi_dtype)
         self.buf_sec_mem = self.buf_sec
         self.buf_usec_mem = self.buf_usec
         self.buf_caplen_mem = self.buf_caplen
@@ -875,129 +1571,324 @@ cdef class Nexmon:
         self.buf_spatial_mem = self.buf_spatial
         self.buf_chan_spec_mem = self.buf_chan_spec
         self.buf_chip_version_mem = self.buf_chip_version
-        self.buf_csi_mem = self.buf_csi
-        self._autoscale = 1
+        if self.csi_code == CSI_COMPLEX128:
+            self.buf_csi_mem = self.buf_csi
+        elif self.csi_code == CSI_COMPLEX64:
+            self.buf_csi64_mem = self.buf_csi
+        else:
+            self.buf_csi16_mem = self.buf_csi
 
-    def __init__(self, file, chip, bw, if_report=True, bufsize=0):
-        pass
+    cpdef read(self, bint resume=False):
+        if resume:
+            # skip the pcap header if nothing has been read
+            self.seek(self.file, max(self.last_pos, 24), 0, True)
+        else:
+            self.seek(self.file, 24, 0)
 
-    cpdef read(self):
-        self.seek(self.file, 24, 0)
+    cpdef seek(self, file, long pos, long num, bint append=False):
+        cdef MappedFile mf = MappedFile(file)
 
-    cpdef seek(self, file, long pos, long num):
-        cdef FILE *f
+        try:
+            big = self.pcapheader(mf.data, mf.size) == "big"
+            if num == 0:
+                num = <long>mf.size
+            if append:
+                self.decode_from(mf, pos, num, big, self.count, True)
+            else:
+                self.decode_from(mf, pos, num, big, 0, self.grow)
+        finally:
+            mf.close()
 
-        tempfile = file.encode(encoding="utf-8")
-        cdef char *datafile = tempfile
+        if self.if_report:
+            printf("%d packets parsed\n", self.count)
+
+    def iter_chunks(self, long chunk_size, file=None):
+        """Yield ``self`` with the views of up to ``chunk_size`` packets at a
+        time. ``file`` stays mapped and the buffers are reused, so views of a
+        chunk are overwritten by the next one."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        self.resize(chunk_size)
+        mf = MappedFile(file)
+        try:
+            big = self.pcapheader(mf.data, mf.size) == "big"
+            cur = 24
+            while True:
+                cur = self.decode_from(mf, cur, chunk_size, big)
+                if self.count == 0:
+                    break
+                yield self
+        finally:
+            mf.close()
+
+    def follow(self, long chunk_size=1, file=None, double interval=0.1,
+               timeout=None):
+        """Yield ``self`` with the views of up to ``chunk_size`` packets at a
+        time, then wait for packets appended to ``file`` and yield them. It
+        stops if ``file`` doesn't grow in ``timeout`` seconds."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        self.resize(chunk_size)
+        cur = 24
+        big = None
+        while True:
+            mf = MappedFile(file)
+            size = mf.size
+            if size < cur:
+                cur = 24    # truncated, start over
+                big = None
+            try:
+                if big is None and size >= 24:
+                    big = self.pcapheader(mf.data, mf.size) == "big"
+                while big is not None:
+                    cur = self.decode_from(mf, cur, chunk_size, big)
+                    if self.count == 0:
+                        break
+                    yield self
+            finally:
+                mf.close()
+            if not wait_growth(file, size, interval, timeout):
+                break
 
-        f = fopen(datafile, "rb")
-        if f is NULL:
-            printf("Open failed!\n")
-            exit(-1)
+    cdef Py_ssize_t decode_from(self, MappedFile mf, Py_ssize_t cur,
+                                long num, bint big, int start=0,
+                                bint grow=False) except -1:
+        """Decode packets from ``cur`` into the rows from ``start`` until
+        ``num`` packets are parsed or the buffer is full (it grows if
+        ``grow``), then set the views of all rows. Returns the offset of the
+        first packet left, it is kept as ``last_pos``."""
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+        cdef int count = start
+        cdef uint32_t caplen
+        cdef const uint8_t *hdr
+        cdef uint32_t (*pcap_cu32)(uint8_t, uint8_t, uint8_t,
+                                   uint8_t) noexcept nogil
+
+        pcap_cu32 = cu32b if big else cu32l
+
+        with nogil:
+            while cur < (lens - 24):
+                # global header
+                hdr = data + cur
+                caplen = pcap_cu32(hdr[8], hdr[9], hdr[10], hdr[11])
+                if cur + 16 + caplen > lens:
+                    break  # truncated
+
+                # we don't care about enth+ip+udp header
+                if caplen >= 60 and memcmp(hdr + 16 + 6, b"NEXMON", 6) == 0:
+                    if count >= self.buf_csi.shape[0]:
+                        if not grow:
+                            break  # buffer is full
+                        with gil:
+                            self.resize(2 * count + 1)
+                    self.parse_record(hdr, big, count)
+                    count += 1
+                cur += (16 + caplen)
+                if count - start >= num:
+                    break
+
+        self.set_views(count)
+        self.count = count
+        self.last_pos = cur
+        return cur
 
-        pcap_endian = self.pcapheader(f)
-        fseek(f, 0, SEEK_END)
-        cdef long lens = ftell(f)
-        fseek(f, pos, SEEK_SET)
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows):
+        """Decode the packets at ``offsets`` into ``rows`` in one pass
 
-        cdef int count = 0
-        cdef unsigned char buf[4096]
-        cdef int l, i
-        cdef int nfft = <int>(self.bw * 3.2)
+        ``offsets`` should be ascending, so the file is walked forward once.
+        ``rows`` is a permutation of ``range(len(offsets))``.
+        """
+        cdef Py_ssize_t n = offsets.shape[0]
+        cdef Py_ssize_t k = 0
+        cdef Py_ssize_t cur
+        cdef bint big
         cdef uint32_t caplen
-        cdef uint16_t (*pcap_cu16)(uint8_t, uint8_t) 
-        cdef uint32_t (*pcap_cu32)(uint8_t, uint8_t, uint8_t, uint8_t)
-
-        if num == 0:
-            num = lens
+        cdef bint bad = False
+
+        if rows.shape[0] != n:
+            raise ValueError("offsets and rows must have the same length")
+        if n and (np.min(rows) < 0 or np.max(rows) >= n):
+            raise ValueError("rows must be in range(len(offsets))")
+        if n > self.buf_csi.shape[0]:
+            self.resize(n)
+
+        cdef MappedFile mf = MappedFile(file)
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+
+        try:
+            big = self.pcapheader(data, lens) == "big"
+        except Exception:
+            mf.close()
+            raise
+
+        with nogil:
+            for k in range(n):
+                cur = offsets[k]
+                if cur < 24 or cur + 16 > lens:
+                    bad = True
+                    break
+                if big:
+                    caplen = cu32b(data[cur+8], data[cur+9], data[cur+10],
+                                   data[cur+11])
+                else:
+                    caplen = cu32l(data[cur+8], data[cur+9], data[cur+10],
+                                   data[cur+11])
+                if (caplen < 60 or cur + 16 + caplen > lens or
+                        memcmp(data + cur + 16 + 6, b"NEXMON", 6) != 0):
+                    bad = True
+                    break
+                self.parse_record(data + cur, big, <int>rows[k])
+
+        mf.close()
+        if bad:
+            raise ValueError("No nexmon packet at offset %d" % offsets[k])
+
+        self.count = n
+        if self.if_report:
+            printf("%d packets parsed\n", <int>n)
 
-        if pcap_endian == "little":
-            pcap_cu16 = cu16l
-            pcap_cu32 = cu32l
-        else:
-            pcap_cu16 = cu16b
-            pcap_cu32 = cu32b
+        self.set_views(n)
 
-        while pos < (lens - 24):
-            # global header
-            l = <int>fread(&buf, sizeof(unsigned char), 16, f)
-            if l < 16:
-                break
-            caplen = pcap_cu32(buf[8], buf[9], buf[10], buf[11])
-            self.buf_sec_mem[count] = pcap_cu32(buf[0], buf[1], buf[2], buf[3])
-            self.buf_usec_mem[count] = pcap_cu32(buf[4], buf[5], buf[6], buf[7])
-            self.buf_caplen_mem[count] = caplen
-            self.buf_wirelen_mem[count] = pcap_cu32(buf[12], buf[13], buf[14],
-                                                    buf[15])
-            pos += (16 + caplen)
-
-            # we don't care about enth+ip+udp header
-            l = <int>fread(&buf, sizeof(unsigned char), 42, f)
-            if buf[6:12] != b'NEXMON':
-                fseek(f, caplen - 42, SEEK_CUR)
-                continue
+    cpdef pmsg(self, unsigned char *data, endian='little'):
+        # magic number
+        if data[:4] != b'\x11\x11\x11\x11':
+            return
 
-            # Endian of the following payload is different from
-            # `pcap_endian`. Here, we assume it is always `little`.
-
-            # nexmon header
-            l = <int>fread(&buf, sizeof(unsigned char), 18, f)
-            self.buf_magic_mem[count] = cu32l(buf[0], buf[1], buf[2], buf[3])
-            for i in range(6):
-                self.buf_src_addr_mem[count, i] = buf[4+i]
-            self.buf_seq_mem[count] = cu16l(buf[10], buf[11])
-            self.buf_core_mem[count] = (buf[12] | buf[13]) & 0x7
-            self.buf_spatial_mem[count] = ((buf[12] | buf[13]) >> 3) & 0x7
-            self.buf_chan_spec_mem[count] = cu16l(buf[14], buf[15])
-            self.buf_chip_version_mem[count] = cu16l(buf[16], buf[17])
-
-            # CSI
-            l = <int>fread(&buf, sizeof(unsigned char), caplen - 42 - 18, f)
-            if self.chip == '4339' or self.chip == '43455c0':
-                unpack_int16(buf, self.buf_csi_mem[count], nfft, True)
-            elif self.chip == '4358':
-                unpack_float(buf, self.buf_csi_mem[count], nfft, 9, 5,
-                             self._autoscale, True)
-            elif self.chip == '4366c0':
-                unpack_float(buf, self.buf_csi_mem[count], nfft, 12, 6,
-                             self._autoscale, True)
-            else:
-                pass
+        self.store_msg(data)
+        return 0xf100
 
-            count += 1
-            if count >= num:
-                break
-        fclose(f)
+    cdef store_msg(self, const uint8_t *data):
+        """Parse a message of ``pmsg`` into row 0, or append it to the ring"""
+        cdef int row
+        if self.ring:
+            row = self.head % self.capacity
+            # the mirror isn't in any view until ``head`` moves on
+            self.parse_header(data, row + <int>self.capacity)
+            self.parse_csi(data + 18, row + <int>self.capacity)
+            self.parse_header(data, row)
+            self.parse_csi(data + 18, row)
+            self.head += 1
+        else:
+            self.parse_header(data, 0)
+            self.parse_csi(data + 18, 0)
+            self.set_views(self.buf_csi.shape[0])
+
+    def last(self, long n):
+        """Set the views to the last ``n`` packets received by ``pmsg`` in
+        ring mode, oldest first, without copying. Returns the count of
+        packets in the views."""
+        if not self.ring:
+            raise ValueError("last() requires ring=True!\n")
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        cdef long count = min(n, self.head, self.capacity)
+        self.set_views(count,
+                       self.head % self.capacity + self.capacity - count)
         self.count = count
-        if self.if_report:
-            printf("%d packets parsed\n", count)
-
-        self.sec = self.buf_sec[:count]
-        self.usec = self.buf_usec[:count]
-        self.caplen = self.buf_caplen[:count]
-        self.wirelen = self.buf_wirelen[:count]
-        self.magic = self.buf_magic[:count]
-        self.src_addr = self.buf_src_addr[:count]
-        self.seq = self.buf_seq[:count]
-        self.core = self.buf_core[:count]
-        self.spatial = self.buf_spatial[:count]
-        self.chan_spec = self.buf_chan_spec[:count]
-        self.chip_version = self.buf_chip_version[:count]
-        self.csi = self.buf_csi[:count]
+        return count
 
-    cpdef pmsg(self, unsigned char *data, endian='little'):
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets):
+        """Parse messages ``buffer[offsets[i]:offsets[i+1]]`` into consecutive
+        rows. In ring mode, they are appended to the ring and the views are
+        left.
+
+        Returns:
+            tuple: The count of messages parsed and the status code of each
+                message, ``0`` if it is not a CSI packet.
+        """
+        cdef Py_ssize_t n = max(offsets.shape[0] - 1, 0)
+        cdef const uint8_t *base = NULL
+        cdef const uint8_t *data
+        cdef Py_ssize_t k, length
         cdef int count = 0
-        cdef unsigned char *buf
-        cdef int i
+        cdef int row
+        cdef int code
+
+        check_offsets(offsets, buffer.shape[0])
+        if n > self.buf_csi.shape[0] and not self.ring:
+            self.resize(n)
+        if buffer.shape[0]:
+            base = &buffer[0]
+
+        status = np.zeros([n], dtype=np.int32)
+        cdef np.int32_t[:] status_mem = status
+
+        with nogil:
+            for k in range(n):
+                data = base + offsets[k]
+                length = offsets[k+1] - offsets[k]
+                if self.ring:
+                    row = (self.head + count) % self.capacity
+                    code = self.parse_msg(data, length,
+                                          row + <int>self.capacity)
+                    if code:
+                        self.parse_msg(data, length, row)
+                else:
+                    code = self.parse_msg(data, length, count)
+                if code:
+                    status_mem[k] = code
+                    count += 1
+
+        if self.ring:
+            self.head += count
+        else:
+            self.set_views(count)
+            self.count = count
+        return count, status
+
+    cdef int parse_msg(self, const uint8_t *data, Py_ssize_t length,
+                       int count) noexcept nogil:
+        """Parse a message of ``pmsg`` into ``count``, return its status code
+        or ``0``"""
+        if length < 18 + 4 * <int>(self.bw * 3.2):
+            return 0
+        if memcmp(data, b"\x11\x11\x11\x11", 4) != 0:
+            return 0
+        self.parse_header(data, count)
+        self.parse_csi(data + 18, count)
+        return 0xf100
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void parse_record(self, const uint8_t *hdr, bint big,
+                           int count) noexcept nogil:
+        """Parse a pcap record (with the 16-byte record header) into ``count``
+        """
         cdef int nfft = <int>(self.bw * 3.2)
+        cdef uint32_t (*pcap_cu32)(uint8_t, uint8_t, uint8_t,
+                                   uint8_t) noexcept nogil
+        cdef uint32_t caplen
+        pcap_cu32 = cu32b if big else cu32l
+        caplen = pcap_cu32(hdr[8], hdr[9], hdr[10], hdr[11])
 
-        buf = data
+        self.buf_sec_mem[count] = pcap_cu32(hdr[0], hdr[1], hdr[2], hdr[3])
+        self.buf_usec_mem[count] = pcap_cu32(hdr[4], hdr[5], hdr[6], hdr[7])
+        self.buf_caplen_mem[count] = caplen
+        self.buf_wirelen_mem[count] = pcap_cu32(hdr[12], hdr[13], hdr[14],
+                                                hdr[15])
 
-        # magic number
-        if buf[:4] != b'\x11\x11\x11\x11':
-            return
+        # Endian of the following payload is different from `pcap_endian`.
+        # Here, we assume it is always `little`.
 
         # nexmon header
+        self.parse_header(hdr + 16 + 42, count)
+
+        # CSI
+        if caplen >= <uint32_t>(60 + 4 * nfft):
+            self.parse_csi(hdr + 16 + 60, count)
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void parse_header(self, const uint8_t *buf,
+                           int count) noexcept nogil:
+        """Parse the 18-byte nexmon header into ``count``"""
+        cdef int i
         self.buf_magic_mem[count] = cu32l(buf[0], buf[1], buf[2], buf[3])
         for i in range(6):
             self.buf_src_addr_mem[count, i] = buf[4+i]
@@ -1007,70 +1898,87 @@ cdef class Nexmon:
         self.buf_chan_spec_mem[count] = cu16l(buf[14], buf[15])
         self.buf_chip_version_mem[count] = cu16l(buf[16], buf[17])
 
-        # CSI
-        if self.chip == '4339' or self.chip == '43455c0':
-            unpack_int16(&buf[18], self.buf_csi_mem[count], nfft, True)
-        elif self.chip == '4358':
-            unpack_float(&buf[18], self.buf_csi_mem[count], nfft, 9, 5,
-                         self._autoscale, True)
-        elif self.chip == '4366c0':
-            unpack_float(&buf[18], self.buf_csi_mem[count], nfft, 12, 6,
-                         self._autoscale, True)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void parse_csi(self, const uint8_t *buf, int count) noexcept nogil:
+        """Unpack ``nfft`` CSI samples into ``count`` according to the chip"""
+        cdef int nfft = <int>(self.bw * 3.2)
+        cdef int M, E
+        if self.chip_code == CHIP_INT16:
+            if self.csi_code == CSI_COMPLEX128:
+                unpack_int16(buf, self.buf_csi_mem[count], nfft, True)
+            elif self.csi_code == CSI_COMPLEX64:
+                unpack_int16(buf, self.buf_csi64_mem[count], nfft, True)
+            else:
+                unpack_int16_pair(buf, self.buf_csi16_mem[count], nfft, True)
+        elif (self.chip_code == CHIP_FLOAT_9_5 or
+                self.chip_code == CHIP_FLOAT_12_6):
+            if self.chip_code == CHIP_FLOAT_9_5:
+                M, E = 9, 5
+            else:
+                M, E = 12, 6
+            # rows are C-contiguous, ``resize_buf`` allocates them
+            if self.csi_code == CSI_COMPLEX128:
+                unpack_float(buf, <double *>&self.buf_csi_mem[count, 0],
+                             nfft, M, E, self._autoscale, True)
+            else:
+                unpack_float(buf, <float *>&self.buf_csi64_mem[count, 0],
+                             nfft, M, E, self._autoscale, True)
         else:
             pass
 
-        self.magic = self.buf_magic
-        self.src_addr = self.buf_src_addr
-        self.seq = self.buf_seq
-        self.core = self.buf_core
-        self.spatial = self.buf_spatial
-        self.chan_spec = self.buf_chan_spec
-        self.chip_version = self.buf_chip_version
-        self.csi = self.buf_csi
-
-        return 0xf100
+    cdef set_views(self, long count, long start=0):
+        cdef long stop = start + count
+
+        self.sec = self.buf_sec[start:stop]
+        self.usec = self.buf_usec[start:stop]
+        self.caplen = self.buf_caplen[start:stop]
+        self.wirelen = self.buf_wirelen[start:stop]
+        self.magic = self.buf_magic[start:stop]
+        self.src_addr = self.buf_src_addr[start:stop]
+        self.seq = self.buf_seq[start:stop]
+        self.core = self.buf_core[start:stop]
+        self.spatial = self.buf_spatial[start:stop]
+        self.chan_spec = self.buf_chan_spec[start:stop]
+        self.chip_version = self.buf_chip_version[start:stop]
+        self.csi = self.buf_csi[start:stop]
 
     cdef get_count(self):
-        cdef FILE *f
-        tempfile = self.file.encode(encoding="utf-8")
-        cdef char *datafile = tempfile
-
-        f = fopen(datafile, "rb")
-        if f is NULL:
-            printf("Open failed!\n")
-            exit(-1)
+        cdef MappedFile mf = MappedFile(self.file)
+        cdef const uint8_t *data = mf.data
+        cdef Py_ssize_t lens = mf.size
+        cdef Py_ssize_t cur = 24
 
         cdef int count = 0
-        cdef int l
         cdef uint32_t caplen
-        cdef unsigned char buf[64]
-        cdef uint32_t (*nex_cu32)(uint8_t, uint8_t, uint8_t, uint8_t)
+        cdef uint32_t (*nex_cu32)(uint8_t, uint8_t, uint8_t,
+                                  uint8_t) noexcept nogil
 
         # pcap header: head: endian
-        pcap_endian = self.pcapheader(f)
+        try:
+            pcap_endian = self.pcapheader(data, lens)
+        except Exception:
+            mf.close()
+            raise
         if pcap_endian == 'little':
             nex_cu32 = cu32l
         else:
             nex_cu32 = cu32b
 
         # count
-        while True:
-            l = <int>fread(&buf, sizeof(unsigned char), 16+42, f)
-            if l < 16:
-                break
-            if buf[22:28] == b'NEXMON':
-                count += 1
-            caplen = nex_cu32(buf[8], buf[9], buf[10], buf[11])
-            fseek(f, caplen - 42, SEEK_CUR)
-        fclose(f)
+        with nogil:
+            while cur + 16 <= lens:
+                caplen = nex_cu32(data[cur+8], data[cur+9], data[cur+10],
+                                  data[cur+11])
+                if (cur + 16 + 42 <= lens and
+                        memcmp(data + cur + 22, b"NEXMON", 6) == 0):
+                    count += 1
+                cur += (16 + caplen)
+        mf.close()
         return count
 
-    cdef pcapheader(self, FILE *f):
-        cdef unsigned char buf[16]
-        cdef int l
-
-        l = <int>fread(&buf, sizeof(unsigned char), 4, f)
-        magic = buf[:4]
+    cdef pcapheader(self, const uint8_t *data, Py_ssize_t lens):
+        magic = (<const char *>data)[:min(lens, 4)]
         if magic == b"\xa1\xb2\xc3\xd4":    # big endian
             endian = "big"
             self.nano = False
@@ -1086,153 +1994,47 @@ cdef class Nexmon:
         else:
             raise Exception("Not a pcap capture file (bad magic: %r)" % magic)
 
-        fseek(f, 20, SEEK_CUR)
         return endian
 
 
 cdef class NexmonPull46(Nexmon):
     def __cinit__(self, file, chip, bw, if_report=True, bufsize=0,
                   *argv, **kw):
-        self.file = file
-        self.chip = chip
-        self.bw = bw
-        self.if_report = if_report
-
-        if bufsize == 0:
-            if file is None:
-                self.count = 1
-                pk_num = 1
-            else:
-                pk_num = self.get_count()
-        else:
-            pk_num = bufsize
-
-        btype = np.intp
-        self.buf_rssi = np.zeros([pk_num], dtype=btype)
-        self.buf_fc = np.zeros([pk_num], dtype=btype)
+        # Nexmon.__cinit__ has sized the other buffers, even for ring mode
+        pk_num = self.buf_csi.shape[0]
+        self.buf_rssi = np.zeros([pk_num], dtype=np.int8)
+        self.buf_fc = np.zeros([pk_num], dtype=np.uint8)
 
         self.buf_rssi_mem = self.buf_rssi
         self.buf_fc_mem = self.buf_fc
         self._autoscale = 0
 
-    cpdef seek(self, file, long pos, long num):
-        cdef FILE *f
-
-        tempfile = file.encode(encoding="utf-8")
-        cdef char *datafile = tempfile
-
-        f = fopen(datafile, "rb")
-        if f is NULL:
-            printf("Open failed!\n")
-            exit(-1)
-
-        pcap_endian = self.pcapheader(f)
-        fseek(f, 0, SEEK_END)
-        cdef long lens = ftell(f)
-        fseek(f, pos, SEEK_SET)
-
-        cdef int count = 0
-        cdef unsigned char buf[4096]
-        cdef int l, i
-        cdef int nfft = <int>(self.bw * 3.2)
-        cdef uint32_t caplen
-        cdef uint16_t (*pcap_cu16)(uint8_t, uint8_t) 
-        cdef uint32_t (*pcap_cu32)(uint8_t, uint8_t, uint8_t, uint8_t)
-
-        if num == 0:
-            num = lens
-
-        if pcap_endian == "little":
-            pcap_cu16 = cu16l
-            pcap_cu32 = cu32l
-        else:
-            pcap_cu16 = cu16b
-            pcap_cu32 = cu32b
-
-        while pos < (lens - 24):
-            # global header
-            l = <int>fread(&buf, sizeof(unsigned char), 16, f)
-            if l < 16:
-                break
-            caplen = pcap_cu32(buf[8], buf[9], buf[10], buf[11])
-            self.buf_sec_mem[count] = pcap_cu32(buf[0], buf[1], buf[2], buf[3])
-            self.buf_usec_mem[count] = pcap_cu32(buf[4], buf[5], buf[6], buf[7])
-            self.buf_caplen_mem[count] = caplen
-            self.buf_wirelen_mem[count] = pcap_cu32(buf[12], buf[13], buf[14],
-                                                    buf[15])
-            pos += (16 + caplen)
-
-            # we don't care about enth+ip+udp header
-            l = <int>fread(&buf, sizeof(unsigned char), 42, f)
-            if buf[6:12] != b'NEXMON':
-                fseek(f, caplen - 42, SEEK_CUR)
-                continue
-
-            # Endian of the following payload is different from
-            # `pcap_endian`. Here, we assume it is always `little`.
-
-            # nexmon header
-            l = <int>fread(&buf, sizeof(unsigned char), 18, f)
-            self.buf_magic_mem[count] = cu16l(buf[0], buf[1])
-            self.buf_rssi_mem[count] = <int8_t>buf[2]
-            self.buf_fc_mem[count] = buf[3]
-            for i in range(6):
-                self.buf_src_addr_mem[count, i] = buf[4+i]
-            self.buf_seq_mem[count] = cu16l(buf[10], buf[11])
-            self.buf_core_mem[count] = (buf[12] | buf[13]) & 0x7
-            self.buf_spatial_mem[count] = ((buf[12] | buf[13]) >> 3) & 0x7
-            self.buf_chan_spec_mem[count] = cu16l(buf[14], buf[15])
-            self.buf_chip_version_mem[count] = cu16l(buf[16], buf[17])
-
-            # CSI
-            l = <int>fread(&buf, sizeof(unsigned char), caplen - 42 - 18, f)
-            if self.chip == '4339' or self.chip == '43455c0':
-                unpack_int16(buf, self.buf_csi_mem[count], nfft, True)
-            elif self.chip == '4358':
-                unpack_float(buf, self.buf_csi_mem[count], nfft, 9, 5,
-                             self._autoscale, True)
-            elif self.chip == '4366c0':
-                unpack_float(buf, self.buf_csi_mem[count], nfft, 12, 6,
-                             self._autoscale, True)
-            else:
-                pass
-
-            count += 1
-            if count >= num:
-                break
-        fclose(f)
-        self.count = count
-        if self.if_report:
-            printf("%d packets parsed\n", count)
-
-        self.sec = self.buf_sec[:count]
-        self.usec = self.buf_usec[:count]
-        self.caplen = self.buf_caplen[:count]
-        self.wirelen = self.buf_wirelen[:count]
-        self.magic = self.buf_magic[:count]
-        self.rssi = self.buf_rssi[:count]
-        self.fc = self.buf_fc[:count]
-        self.src_addr = self.buf_src_addr[:count]
-        self.seq = self.buf_seq[:count]
-        self.core = self.buf_core[:count]
-        self.spatial = self.buf_spatial[:count]
-        self.chan_spec = self.buf_chan_spec[:count]
-        self.chip_version = self.buf_chip_version[:count]
-        self.csi = self.buf_csi[:count]
-
     cpdef pmsg(self, unsigned char *data, endian='little'):
-        cdef int count = 0
-        cdef unsigned char *buf
-        cdef int i
-        cdef int nfft = <int>(self.bw * 3.2)
-
-        buf = data
-
         # magic number
-        if buf[:2] != b'\x11\x11':
+        if data[:2] != b'\x11\x11':
             return
 
-        # nexmon header
+        self.store_msg(data)
+        return 0xf101
+
+    cdef int parse_msg(self, const uint8_t *data, Py_ssize_t length,
+                       int count) noexcept nogil:
+        """Parse a message of ``pmsg`` into ``count``, return its status code
+        or ``0``"""
+        if length < 18 + 4 * <int>(self.bw * 3.2):
+            return 0
+        if memcmp(data, b"\x11\x11", 2) != 0:
+            return 0
+        self.parse_header(data, count)
+        self.parse_csi(data + 18, count)
+        return 0xf101
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void parse_header(self, const uint8_t *buf,
+                           int count) noexcept nogil:
+        """Parse the 18-byte nexmon header (with rssi and fc) into ``count``"""
+        cdef int i
         self.buf_magic_mem[count] = cu16l(buf[0], buf[1])
         self.buf_rssi_mem[count] = <int8_t>buf[2]
         self.buf_fc_mem[count] = buf[3]
@@ -1241,33 +2043,21 @@ cdef class NexmonPull46(Nexmon):
         self.buf_seq_mem[count] = cu16l(buf[10], buf[11])
         self.buf_core_mem[count] = (buf[12] | buf[13]) & 0x7
         self.buf_spatial_mem[count] = ((buf[12] | buf[13]) >> 3) & 0x7
-        self.buf_chan_spec_mem[count] = cu16l(buf[114], buf[15])
+        self.buf_chan_spec_mem[count] = cu16l(buf[14], buf[15])
         self.buf_chip_version_mem[count] = cu16l(buf[16], buf[17])
 
-        # CSI
-        if self.chip == '4339' or self.chip == '43455c0':
-            unpack_int16(&buf[18], self.buf_csi_mem[count], nfft, True)
-        elif self.chip == '4358':
-            unpack_float(&buf[18], self.buf_csi_mem[count], nfft, 9, 5,
-                         self._autoscale, True)
-        elif self.chip == '4366c0':
-            unpack_float(&buf[18], self.buf_csi_mem[count], nfft, 12, 6,
-                         self._autoscale, True)
-        else:
-            pass
+    cdef resize(self, long pk_num):
+        Nexmon.resize(self, pk_num)
+        self.buf_rssi = resize_buf(self.buf_rssi, [pk_num], np.int8)
+        self.buf_fc = resize_buf(self.buf_fc, [pk_num], np.uint8)
 
-        self.magic = self.buf_magic
-        self.rssi = self.buf_rssi
-        self.fc = self.buf_fc
-        self.src_addr = self.buf_src_addr
-        self.seq = self.buf_seq
-        self.core = self.buf_core
-        self.spatial = self.buf_spatial
-        self.chan_spec = self.buf_chan_spec
-        self.chip_version = self.buf_chip_version
-        self.csi = self.buf_csi
+        self.buf_rssi_mem = self.buf_rssi
+        self.buf_fc_mem = self.buf_fc
 
-        return 0xf101
+    cdef set_views(self, long count, long start=0):
+        Nexmon.set_views(self, count, start)
+        self.rssi = self.buf_rssi[start:start + count]
+        self.fc = self.buf_fc[start:start + count]
 
 
 @cython.boundscheck(False)
@@ -1317,14 +2107,8 @@ cdef void intel_mm_o3(np.complex128_t[:, :, :] ret_mem,
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
-cdef inline void set_csi_mem(np.complex128_t[:, :, :, :] csi_mem, int count,
-                             int s, int r, int t, double real, double imag):
-    csi_mem[count, s, r, t].real = real
-    csi_mem[count, s, r, t].imag = imag
-
-
-cdef void unpack_int16(uint8_t *buf, np.complex128_t[:] csi_mem, int nfft,
-                       bint flag):
+cdef void unpack_int16(const uint8_t *buf, complex_t[:] csi_mem, int nfft,
+                       bint flag) noexcept nogil:
     cdef int i, j
     if flag:
         for i in range(nfft):
@@ -1338,144 +2122,823 @@ cdef void unpack_int16(uint8_t *buf, np.complex128_t[:] csi_mem, int nfft,
             csi_mem[i].imag = <double><int16_t>cu16b(buf[j+2], buf[j+3])
 
 
-cdef void unpack_float(uint8_t *buf, np.complex128_t[:] csi_mem, int nfft,
-                       int M, int E, int autoscale, bint flag):
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void unpack_int16_pair(const uint8_t *buf, np.int16_t[:, :] csi_mem,
+                            int nfft, bint flag) noexcept nogil:
+    cdef int i, j
+    if flag:
+        for i in range(nfft):
+            j = i * 4
+            csi_mem[i, 0] = <int16_t>cu16l(buf[j+0], buf[j+1])
+            csi_mem[i, 1] = <int16_t>cu16l(buf[j+2], buf[j+3])
+    else:
+        for i in range(nfft):
+            j = i * 4
+            csi_mem[i, 0] = <int16_t>cu16b(buf[j+0], buf[j+1])
+            csi_mem[i, 1] = <int16_t>cu16b(buf[j+2], buf[j+3])
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void unpack_float(const uint8_t *buf, sample_t *out, int nfft, int M,
+                       int E, int autoscale, bint flag) noexcept nogil:
     """N = M * R ^ E
 
     M: Mantissa
     R: Radix
     E: Exponent
     flag: little endian if ``True`` else big endian
+
+    With ``autoscale``, the largest exponent is found from the words first,
+    then every sample is scaled and written to the (real, imag) pairs of
+    ``out`` in a single pass, so ``nfft`` is not limited.
     """
-    cdef int i, s, e, shft, sgn
-    cdef uint32_t h, m, b, x
+    cdef int i, e, shft
+    cdef uint32_t h, x
 
     cdef int nbits = 10
     cdef int e_p = (1 << (E - 1))
-    cdef int e_shift = 1
-    cdef int e_zero = - M
     cdef int maxbit = -e_p
-    cdef uint32_t k_tof_unpack_sgn_mask = (1 << 31)
     cdef uint32_t ri_mask = (1 << (M - 1)) - 1
-    cdef uint32_t E_mask = (1 << E) - 1
     cdef uint32_t sgnr_mask = (1 << (E + 2 * M - 1))
     cdef uint32_t sgni_mask = sgnr_mask >> M
-    cdef int8_t He[256]
-    cdef int32_t Hout[512]
-    cdef int32_t v_real, v_imag
 
-    for i in range(nfft):
-        if flag:
-            h = cu32l(buf[4*i+0], buf[4*i+1], buf[4*i+2], buf[4*i+3])
-        else:
-            h = cu32b(buf[4*i+0], buf[4*i+1], buf[4*i+2], buf[4*i+3])
-
-        v_real = <int32_t>((h >> (E + M)) & ri_mask)
-        v_imag = <int32_t>((h >> E) & ri_mask)
-        e = <int>(h & E_mask)
-        if e >= e_p:
-            e -= (e_p << 1)
-        He[i] = <int8_t>e
-        x = <uint32_t>v_real | <uint32_t>v_imag
-
-        if autoscale and x:
-            m = 0xffff0000
-            b = 0xffff
-            s = 16
-            while s > 0:
-                if x & m:
-                    e += s
-                    x >>= s
-                s >>= 1
-                m = (m >> s) & b
-                b >>= s
-            if e > maxbit:
-                maxbit = e
-        
-        if h & sgnr_mask:
-            v_real |= k_tof_unpack_sgn_mask
-        if h & sgni_mask:
-            v_imag |= k_tof_unpack_sgn_mask
-
-        Hout[i<<1] = v_real
-        Hout[(i<<1)+1] = v_imag
+    if autoscale:
+        for i in range(nfft):
+            h = nex_word(buf + 4 * i, flag)
+            x = ((h >> (E + M)) | (h >> E)) & ri_mask
+            if x:
+                e = (<int32_t>(h << (32 - E)) >> (32 - E)) + csiread_msb(x)
+                if e > maxbit:
+                    maxbit = e
 
     shft = nbits - maxbit
     for i in range(nfft):
-        e = He[(i*2 >> e_shift)] + shft
-        sgn = 1
-        v_real = Hout[i*2]
-        if v_real & k_tof_unpack_sgn_mask:
-            sgn = -1
-            v_real &= ~k_tof_unpack_sgn_mask
-        if e < e_zero:
-            v_real = 0
-        elif e < 0:
-            e = -e
-            v_real >>= e
-        else:
-            v_real <<= e
-        v_real *= sgn
-
-        e = He[(i*2+1 >> e_shift)] + shft
-        sgn = 1
-        v_imag = Hout[i*2+1]
-        if v_imag & k_tof_unpack_sgn_mask:
-            sgn = -1
-            v_imag &= ~k_tof_unpack_sgn_mask
-        if e < e_zero:
-            v_imag = 0
-        elif e < 0:
-            e = -e
-            v_imag >>= e
-        else:
-            v_imag <<= e
-        v_imag *= sgn
-
-        csi_mem[i].real = <double>v_real
-        csi_mem[i].imag = <double>v_imag
-
-
-cdef inline int8_t ccsi(uint8_t a, uint8_t b, uint8_t remainder):
-    return ((a >> remainder) | (b << (8 - remainder))) & 0xff
+        h = nex_word(buf + 4 * i, flag)
+        e = (<int32_t>(h << (32 - E)) >> (32 - E)) + shft
+        out[2*i] = float_scale((h >> (E + M)) & ri_mask, h & sgnr_mask, e)
+        out[2*i + 1] = float_scale((h >> E) & ri_mask, h & sgni_mask, e)
 
 
-cdef inline uint32_t cu32l(uint8_t a, uint8_t b, uint8_t c, uint8_t d):
+cdef inline uint32_t nex_word(const uint8_t *p, bint flag) noexcept nogil:
+    if flag:
+        return cu32l(p[0], p[1], p[2], p[3])
+    return cu32b(p[0], p[1], p[2], p[3])
+
+
+cdef inline int32_t float_scale(uint32_t v, uint32_t sgn,
+                                int e) noexcept nogil:
+    """Shift the mantissa ``v`` by ``e`` and apply the sign without branches,
+    ``v`` has less than 31 bits, so it is zero when ``e`` is below -31"""
+    cdef int32_t neg = -<int32_t>(sgn != 0)
+    cdef int32_t r = <int32_t>v << (e if e > 0 else 0)
+    r >>= (-e if -e < 31 else 31) if e < 0 else 0
+    return (r ^ neg) - neg
+
+
+cdef inline double intel_rss_power(uint8_t a, uint8_t b,
+                                   uint8_t c) noexcept nogil:
+    """Sum of the linear power of the non-zero rssi of 3 antennas"""
+    cdef double rss = 0
+    if a:
+        rss += DB_POWER[256 + a]
+    if b:
+        rss += DB_POWER[256 + b]
+    if c:
+        rss += DB_POWER[256 + c]
+    return rss
+
+
+cdef inline void intel_power(uint8_t a, uint8_t b, uint8_t c, uint8_t agc,
+                             int8_t noise, double *out) noexcept nogil:
+    """Linear rss and thermal noise power of a packet into ``out[0:2]``"""
+    cdef double rss = intel_rss_power(a, b, c)
+    if rss:
+        out[0] = rss * DB_POWER[256 - 44] * DB_POWER[256 - agc]
+    else:
+        out[0] = 1
+    if noise == -127:
+        out[1] = pow(10, -9.2)
+    else:
+        out[1] = DB_POWER[256 + noise]
+
+
+cdef Py_ssize_t intel_scale_any(const void *csi, int csi_code, real_t *out,
+                                const double *power, const uint8_t *Nrx,
+                                const uint8_t *Ntx, const uint16_t *rate,
+                                const double *sm, int nrx, int ntx,
+                                Py_ssize_t start, Py_ssize_t stop) noexcept nogil:
+    """``intel_scale`` of ``csi`` in the layout ``csi_code``"""
+    if csi_code == CSI_COMPLEX128:
+        return intel_scale(<const double *>csi, out, power, Nrx, Ntx, rate,
+                           sm, nrx, ntx, start, stop)
+    if csi_code == CSI_COMPLEX64:
+        return intel_scale(<const float *>csi, out, power, Nrx, Ntx, rate,
+                           sm, nrx, ntx, start, stop)
+    if csi_code == CSI_INT16:
+        return intel_scale(<const int16_t *>csi, out, power, Nrx, Ntx, rate,
+                           sm, nrx, ntx, start, stop)
+    return intel_scale(<const int8_t *>csi, out, power, Nrx, Ntx, rate, sm,
+                       nrx, ntx, start, stop)
+
+
+cdef Py_ssize_t intel_scale(const csi_t *csi, real_t *out,
+                            const double *power, const uint8_t *Nrx,
+                            const uint8_t *Ntx, const uint16_t *rate,
+                            const double *sm, int nrx, int ntx,
+                            Py_ssize_t start, Py_ssize_t stop) noexcept nogil:
+    """``intel_scale_row`` of the packets ``start:stop``, ``power`` holds the
+    linear rss and thermal noise of every packet. ``sm`` is ``NULL`` or the
+    table of 3 x 3 steering matrices indexed by ``2 * (Ntx - 2) + is_40MHz``.
+
+    Returns:
+        int: The first packet whose csi is all zeros, or ``stop``
+    """
+    cdef Py_ssize_t i
+    cdef int m = 2 * 30 * nrx * ntx
+    cdef const double *a
+    for i in range(start, stop):
+        a = NULL
+        if sm != NULL and (Ntx[i] == 2 or Ntx[i] == 3):
+            a = sm + 18 * (2 * (Ntx[i] - 2) + ((rate[i] & 0x800) != 0))
+        if not intel_scale_row(csi + m * i, out + m * i, power[2*i],
+                               power[2*i + 1], Nrx[i], Ntx[i], a, nrx, ntx):
+            return i
+    return stop
+
+
+@cython.cdivision(True)
+cdef bint intel_scale_row(const csi_t *p, real_t *q, double rss_pwr,
+                          double noise_pwr, int Nrx, int Ntx, const double *sm,
+                          int nrx, int ntx) noexcept nogil:
+    """Scale a packet of 30 x ``nrx`` x ``ntx`` (real, imag) pairs by its SNR
+    into ``q``, which may be ``p``. The power is summed and the samples are
+    scaled while the packet is still in cache. If ``sm`` (a row-major 3 x 3
+    complex matrix) isn't ``NULL``, the ``Nrx`` x ``Ntx`` block of every
+    subcarrier is multiplied by it as soon as it is scaled.
+
+    Returns:
+        bool: ``False`` if the csi is all zeros
+    """
+    cdef int m = 30 * nrx * ntx
+    cdef int k, s, j, o
+    cdef double csi_pwr, scale, total_noise_pwr
+
+    csi_pwr = 0
+    for k in range(m):
+        csi_pwr += (<double>p[2*k] * p[2*k] + <double>p[2*k + 1] * p[2*k + 1])
+    if csi_pwr == 0:
+        return False
+    scale = rss_pwr / (csi_pwr / 30)
+    total_noise_pwr = noise_pwr + scale * (Nrx * Ntx)
+    if Ntx == 2:
+        total_noise_pwr /= 2
+    if Ntx == 3:
+        total_noise_pwr /= pow(10, 0.45)
+    scale = sqrt(scale / total_noise_pwr)
+
+    if sm == NULL:
+        for k in range(2 * m):
+            q[k] = <real_t>(p[k] * scale)
+        return True
+
+    for s in range(30):
+        for j in range(nrx):
+            o = 2 * ntx * (nrx * s + j)
+            if j >= Nrx:
+                for k in range(2 * ntx):
+                    q[o + k] = <real_t>(p[o + k] * scale)
+                continue
+            # unrolled for 2 and 3 transmitters
+            if Ntx == 3:
+                intel_sm_mul(p + o, q + o, scale, sm, 3)
+            else:
+                intel_sm_mul(p + o, q + o, scale, sm, 2)
+            for k in range(2 * Ntx, 2 * ntx):
+                q[o + k] = <real_t>(p[o + k] * scale)
+    return True
+
+
+cdef inline void intel_sm_mul(const csi_t *p, real_t *q, double scale,
+                              const double *sm, int M) noexcept nogil:
+    """``q = (p * scale) @ sm`` for a row vector of ``M`` complex samples, in
+    the order of complex arithmetic"""
+    cdef int r, c
+    cdef double re, im
+    cdef double x[6]
+    for r in range(M):
+        x[2*r] = p[2*r] * scale
+        x[2*r + 1] = p[2*r + 1] * scale
+    for c in range(M):
+        re = x[0] * sm[2*c] - x[1] * sm[2*c + 1]
+        im = x[0] * sm[2*c + 1] + x[1] * sm[2*c]
+        for r in range(1, M):
+            re = re + (x[2*r] * sm[6*r + 2*c] - x[2*r + 1] * sm[6*r + 2*c + 1])
+            im = im + (x[2*r] * sm[6*r + 2*c + 1] + x[2*r + 1] * sm[6*r + 2*c])
+        q[2*c] = <real_t>re
+        q[2*c + 1] = <real_t>im
+
+
+cdef inline void intel_unpack(const uint8_t *payload, int n,
+                              int8_t *out) noexcept nogil:
+    """Unpack the 30 x ``n`` 8-bit (real, imag) pairs of a beamforming
+    matrix into ``out``. Every subcarrier starts 3 bits after the previous
+    one and its pairs are 16 bits apart, so the shift is the same for all
+    pairs of a subcarrier and each pair is cut from a 24-bit window."""
+    cdef int i, e, shift
+    cdef const uint8_t *p
+    cdef uint32_t w
+    for i in range(30):
+        shift = (3 * (i + 1)) & 0x7
+        p = payload + ((3 * (i + 1)) >> 3) + 2 * n * i
+        for e in range(n):
+            w = p[2*e] | (p[2*e + 1] << 8) | (<uint32_t>p[2*e + 2] << 16)
+            out[2*(n*i + e)] = <int8_t>(w >> shift)
+            out[2*(n*i + e) + 1] = <int8_t>(w >> (shift + 8))
+
+
+@cython.cdivision(True)
+cdef void ath_unpack(const uint8_t *csi, int c_len, int tones, int nr,
+                     int nc, sample_t *out, int nrxnum,
+                     int ntxnum) noexcept nogil:
+    """Unpack the tones x nr x nc 10-bit (imag, real) pairs of an Atheros
+    csi field into a C-contiguous (tones, nrxnum, ntxnum, 2) ``out``.
+
+    The field is a little-endian bit stream read by 16-bit words, a trailing
+    odd byte is ignored and missing bits are zero. Two pairs take 5 bytes,
+    so they are cut from one 64-bit load with fixed shifts; the last loads
+    go through a zero-padded copy.
+    """
+    cdef int n = tones * nr * nc
+    cdef int length = c_len & ~1
+    cdef int h, i, e, r = 0, c = 0
+    cdef Py_ssize_t o = 0
+    cdef uint64_t w
+    cdef uint8_t tail[8]
+    cdef const uint8_t *p
+    cdef int16_t v[4]
+
+    # a block that fills the rows is a single row
+    if nr == nrxnum and nc == ntxnum:
+        nc = n
+
+    for h in range((n + 1) >> 1):
+        p = csi + 5 * h
+        if 5 * h + 8 > length:
+            for i in range(8):
+                tail[i] = p[i] if 5 * h + i < length else 0
+            p = tail
+        w = cu64l(p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7])
+        # sign-extend each 10-bit field from the top of an int16
+        v[0] = <int16_t>(<uint16_t>w << 6) >> 6
+        v[1] = <int16_t>(<uint16_t>(w >> 10) << 6) >> 6
+        v[2] = <int16_t>(<uint16_t>(w >> 20) << 6) >> 6
+        v[3] = <int16_t>(<uint16_t>(w >> 30) << 6) >> 6
+        for e in range(2 if 2 * h + 1 < n else 1):
+            out[o] = v[2*e + 1]
+            out[o + 1] = v[2*e]
+            o += 2
+            c += 1
+            if c == nc:
+                c = 0
+                o += 2 * (ntxnum - nc)
+                r += 1
+                if r == nr:
+                    r = 0
+                    o += 2 * ntxnum * (nrxnum - nr)
+
+cdef inline uint32_t cu32l(uint8_t a, uint8_t b, uint8_t c,
+                          uint8_t d) noexcept nogil:
     return a | (b << 8) | (c << 16) | (d << 24)
 
 
-cdef inline uint32_t cu32b(uint8_t a, uint8_t b, uint8_t c, uint8_t d):
+cdef inline uint32_t cu32b(uint8_t a, uint8_t b, uint8_t c,
+                          uint8_t d) noexcept nogil:
     return d | (c << 8) | (b << 16) | (a << 24)
 
 
-cdef inline uint16_t cu16l(uint8_t a, uint8_t b):
+cdef inline uint16_t cu16l(uint8_t a, uint8_t b) noexcept nogil:
     return a | (b << 8)
 
 
-cdef inline uint16_t cu16b(uint8_t a, uint8_t b):
+cdef inline uint16_t cu16b(uint8_t a, uint8_t b) noexcept nogil:
     return b | (a << 8)
 
 
 cdef inline uint64_t cu64l(uint64_t a, uint64_t b, uint64_t c, uint64_t d,
-                           uint64_t e, uint64_t f, uint64_t g, uint64_t h):
+                           uint64_t e, uint64_t f, uint64_t g,
+                           uint64_t h) noexcept nogil:
     return (a | (b << 8) | (c << 16) | (d << 24) |
             (e << 32) | (f << 40) | (g << 48) | (h << 56))
 
 
 cdef inline uint64_t cu64b(uint64_t a, uint64_t b, uint64_t c, uint64_t d,
-                           uint64_t e, uint64_t f, uint64_t g, uint64_t h):
+                           uint64_t e, uint64_t f, uint64_t g,
+                           uint64_t h) noexcept nogil:
     return (h | (g << 8) | (f << 16) | (e << 24) |
             (d << 32) | (c << 40) | (b << 48) | (a << 56))
 
 
-cdef read_stpfile(stpfile, endian):
-    lens = os.path.getsize(stpfile) // 8
-    stp = np.empty(lens)
-    format_string = '<LL' if endian == 'little' else '>LL'
-    cdef int i, a, b
-    f = open(stpfile, "rb")
-    for i in range(lens):
-        a, b = struct.unpack(format_string, f.read(8))
-        stp[i] = a + b / 1000000
-    f.close()
-    return stp
+cdef inline const uint8_t *esp32_int(const uint8_t *p, const uint8_t *e,
+                                     np.int64_t *out) noexcept nogil:
+    """Parse the integer column at ``p`` into ``out``
+
+    Returns:
+        The pointer after the comma, or ``NULL`` if the column is malformed
+    """
+    cdef bint neg = False
+    cdef np.int64_t v = 0
+    cdef const uint8_t *start
+    while p < e and p[0] == b' ':
+        p += 1
+    if p < e and (p[0] == b'-' or p[0] == b'+'):
+        neg = p[0] == b'-'
+        p += 1
+    start = p
+    while p < e and c'0' <= p[0] <= c'9':
+        v = v * 10 + (p[0] - c'0')
+        p += 1
+    if p == start or p >= e or p[0] != b',':
+        return NULL
+    out[0] = -v if neg else v
+    return p + 1
+
+
+cdef inline const uint8_t *esp32_float(const uint8_t *p, const uint8_t *e,
+                                       double *out):
+    """Parse the float column at ``p`` into ``out`` like ``float()``
+
+    Returns:
+        The pointer after the comma, or ``NULL`` if the column is malformed
+    """
+    cdef char *end
+    while p < e and p[0] == b' ':
+        p += 1
+    try:
+        out[0] = PyOS_string_to_double(<const char *>p, &end, NULL)
+    except ValueError:
+        return NULL
+    p = <const uint8_t *>end
+    if p >= e or p[0] != b',':
+        return NULL
+    return p + 1
+
+
+cdef inline Py_ssize_t esp32_csi(const uint8_t *q, const uint8_t *e,
+                                 double *out, Py_ssize_t width) noexcept nogil:
+    """Parse the ``[imag real imag real ...]`` list after ``[`` into the
+    complex ``out``. The line ends with the newline at ``e``, which stops
+    every scan, so bytes are not checked against ``e`` one by one.
+
+    Returns:
+        int: Count of the values, ``-1`` if the list is malformed or ``-2``
+            if it is longer than ``width``
+    """
+    cdef Py_ssize_t k = 0
+    cdef np.int64_t v
+    cdef bint neg
+    cdef const uint8_t *start
+    while True:
+        while q[0] == b' ' or q[0] == b'\t':
+            q += 1
+        if q[0] == b']':
+            return k
+        neg = q[0] == b'-'
+        if neg or q[0] == b'+':
+            q += 1
+        start = q
+        v = 0
+        while c'0' <= q[0] <= c'9':
+            v = v * 10 + (q[0] - c'0')
+            q += 1
+        if q == start:
+            return -1
+        if k >= width:
+            return -2
+        # the imaginary part comes first
+        out[k ^ 1] = <double>(-v if neg else v)
+        k += 1
+
+
+cdef inline Py_ssize_t esp32_csi_len(const uint8_t *p,
+                                     const uint8_t *e) noexcept nogil:
+    """Count of the values in the ``[..]`` list of a line, ``-1`` if there
+    is no list"""
+    cdef Py_ssize_t n = 0
+    cdef bint in_value = False
+    p = <const uint8_t *>memchr(p, b'[', e - p)
+    if p == NULL:
+        return -1
+    p += 1
+    while p < e and p[0] != b']':
+        if p[0] == b' ' or p[0] == b'\t':
+            in_value = False
+        elif not in_value:
+            in_value = True
+            n += 1
+        p += 1
+    return n if p < e else -1
+
+
+def build_index(file, kind, long pos=0, endian='little'):
+    """Walk the records of ``file`` from ``pos`` and return their offsets
+
+    Args:
+        file (str): CSI data file
+        kind (str): ``'intel'``, ``'atheros'``, ``'nexmon'``, ``'picoscenes'``
+            or ``'esp32'``
+        pos (int): Position of the first record
+        endian (str): Endian of Atheros files, Nexmon files are detected by
+            their pcap header.
+
+    Returns:
+        tuple: ``(offset, length, type)`` arrays of all records. ``type`` is
+            the field code for Intel, ``1`` for CSI records and ``0`` for the
+            others.
+    """
+    cdef MappedFile mf = MappedFile(file)
+    cdef int ckind
+    cdef bint big = endian == 'big'
+
+    if kind == 'intel':
+        ckind = INDEX_INTEL
+    elif kind == 'atheros':
+        ckind = INDEX_ATHEROS
+    elif kind == 'nexmon':
+        ckind = INDEX_NEXMON
+        magic = (<const char *>mf.data)[:min(mf.size, 4)]
+        big = magic in [b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"]
+    elif kind == 'picoscenes':
+        ckind = INDEX_PICOSCENES
+    elif kind == 'esp32':
+        ckind = INDEX_ESP32
+    else:
+        mf.close()
+        raise ValueError("kind can only take 'intel', 'atheros', 'nexmon', "
+                         "'picoscenes' and 'esp32'!\n")
+    ret = index_records(mf, ckind, pos, big)
+    mf.close()
+    return ret
+
+
+cdef index_records(MappedFile mf, int kind, Py_ssize_t pos, bint big):
+    """Count the records first, then fill ``(offset, length, type)``"""
+    cdef Py_ssize_t count
+    with nogil:
+        count = walk_records(mf.data, mf.size, kind, pos, big,
+                             NULL, NULL, NULL)
+    offset = np.zeros([count], dtype=np.int64)
+    length = np.zeros([count], dtype=np.uint32)
+    rtype = np.zeros([count], dtype=np.uint8)
+    cdef np.int64_t[:] offset_mem = offset
+    cdef np.uint32_t[:] length_mem = length
+    cdef np.uint8_t[:] rtype_mem = rtype
+    if count:
+        with nogil:
+            walk_records(mf.data, mf.size, kind, pos, big, &offset_mem[0],
+                         &length_mem[0], &rtype_mem[0])
+    return offset, length, rtype
+
+
+cdef Py_ssize_t walk_records(const uint8_t *data, Py_ssize_t lens, int kind,
+                             Py_ssize_t pos, bint big, np.int64_t *offset,
+                             np.uint32_t *length,
+                             np.uint8_t *rtype) noexcept nogil:
+    """Walk the records from ``pos`` and return the count of them. Arrays are
+    filled if they are not ``NULL``. Truncated records are not counted."""
+    cdef Py_ssize_t cur = pos
+    cdef Py_ssize_t count = 0
+    cdef Py_ssize_t rlen
+    cdef uint8_t t
+    cdef const uint8_t *p
+
+    while True:
+        t = 1
+        if kind == INDEX_INTEL:
+            if cur >= lens - 3:
+                break
+            rlen = (data[cur+1] + (data[cur] << 8)) + 2
+            if rlen == 2:
+                break
+            t = data[cur+2]
+        elif kind == INDEX_ATHEROS:
+            if cur >= lens - 4 or cur + 27 > lens:
+                break
+            if big:
+                rlen = 2 + cu16b(data[cur], data[cur+1])
+            else:
+                rlen = 2 + cu16l(data[cur], data[cur+1])
+            if cur + rlen > lens:
+                break
+            if big:
+                rlen = (27 + cu16b(data[cur+10], data[cur+11]) +
+                        cu16b(data[cur+25], data[cur+26]))
+            else:
+                rlen = (27 + cu16l(data[cur+10], data[cur+11]) +
+                        cu16l(data[cur+25], data[cur+26]))
+        elif kind == INDEX_NEXMON:
+            if cur >= lens - 24:
+                break
+            if big:
+                rlen = 16 + <Py_ssize_t>cu32b(data[cur+8], data[cur+9],
+                                              data[cur+10], data[cur+11])
+            else:
+                rlen = 16 + <Py_ssize_t>cu32l(data[cur+8], data[cur+9],
+                                              data[cur+10], data[cur+11])
+            t = (rlen >= 16 + 60 and
+                 memcmp(data + cur + 22, b"NEXMON", 6) == 0)
+        elif kind == INDEX_PICOSCENES:
+            if cur >= lens - 4:
+                break
+            rlen = 4 + <Py_ssize_t>cu32l(data[cur], data[cur+1],
+                                         data[cur+2], data[cur+3])
+        else:
+            if cur >= lens:
+                break
+            p = <const uint8_t *>memchr(data + cur, b'\n', lens - cur)
+            rlen = (p - data + 1 if p != NULL else lens) - cur
+            t = rlen >= 8 and memcmp(data + cur, b"CSI_DATA", 8) == 0
+
+        if cur + rlen > lens:
+            break   # truncated
+        if offset != NULL:
+            offset[count] = cur
+            length[count] = <np.uint32_t>rlen
+            rtype[count] = t
+        count += 1
+        cur += rlen
+    return count
+
+
+def _intel_decode_range(Intel csidata, MappedFile mf, np.int64_t[:] offsets,
+                        Py_ssize_t start, Py_ssize_t stop):
+    """Decode the 0xbb fields at ``offsets[start:stop]`` into the same rows
+
+    Returns:
+        tuple: ``(row, status)`` of the first broken packet, ``status`` is
+            ``0`` if all of them are parsed.
+    """
+    cdef Py_ssize_t i
+    cdef int ret = 0
+    with nogil:
+        for i in range(start, stop):
+            ret = csidata.decode_0xbb(mf.data + offsets[i], <int>i)
+            if ret:
+                break
+    return i if ret else stop, ret
+
+
+def _intel_scale_range(Intel csidata, np.ndarray csi, np.ndarray scaled_csi,
+                       const double[:, :] power, np.ndarray sm_table,
+                       Py_ssize_t start, Py_ssize_t stop):
+    """Scale the C-contiguous rows ``start:stop`` of ``csi`` into the same
+    rows of ``scaled_csi`` (complex128 or complex64), they may share memory.
+    The spatial mapping is undone if ``sm_table`` isn't ``None``.
+
+    Returns:
+        int: The first packet whose csi is all zeros, or ``stop``
+    """
+    cdef const np.uint8_t[:] Nrx = csidata.Nrx
+    cdef const np.uint8_t[:] Ntx = csidata.Ntx
+    cdef const np.uint16_t[:] rate = csidata.rate
+    cdef const void *src = np.PyArray_DATA(csi)
+    cdef void *dst = np.PyArray_DATA(scaled_csi)
+    cdef const double *sm = NULL
+    cdef int csi_code = csidata.csi_code
+    cdef int nrx = <int>csi.shape[2]
+    cdef int ntx = <int>csi.shape[3]
+    cdef bint single = scaled_csi.dtype == np.complex64
+    cdef Py_ssize_t ret = stop
+    if start >= stop:
+        return stop
+    if sm_table is not None:
+        sm = <const double *>np.PyArray_DATA(sm_table)
+    with nogil:
+        if single:
+            ret = intel_scale_any(src, csi_code, <float *>dst, &power[0, 0],
+                                  &Nrx[0], &Ntx[0], &rate[0], sm, nrx, ntx,
+                                  start, stop)
+        else:
+            ret = intel_scale_any(src, csi_code, <double *>dst, &power[0, 0],
+                                  &Nrx[0], &Ntx[0], &rate[0], sm, nrx, ntx,
+                                  start, stop)
+    return ret
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def parse_esp32(source, Py_ssize_t pos, long num, bint csi_only, int maxlen):
+    """Parse ``num`` (all if ``0``) ``CSI_DATA`` lines of ``source`` from
+    ``pos`` in one pass, other lines are skipped. ``source`` is a file name,
+    a ``MappedFile`` or a bytes-like object. Every line must end with a
+    newline, a truncated one is left. The csi list has the length of the
+    first line, shorter lines are padded with zeros if ``maxlen`` isn't
+    ``128``, see ``ESP32``.
+
+    Returns:
+        tuple: ``(count, stop, str_data, int_data, flo_data, csi_data)``,
+            ``stop`` is the offset after the last line taken. ``str_data``
+            holds the lists of ``type``, ``role`` and ``mac``, ``int_data``
+            the 21 integer columns (``len`` last), ``flo_data``
+            ``real_timestamp`` and ``csi_data`` the complex csi.
+    """
+    cdef MappedFile mf = None
+    cdef const uint8_t[:] view
+    cdef const uint8_t *data = NULL
+    cdef Py_ssize_t lens = 0
+    if isinstance(source, MappedFile):
+        mf = source
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        view = source
+        lens = view.shape[0]
+        if lens:
+            data = &view[0]
+    else:
+        mf = MappedFile(source)
+    if mf is not None:
+        data = mf.data
+        lens = mf.size
+    if pos < 0 or pos > lens:
+        raise ValueError("pos is out of the file")
+
+    cdef const uint8_t *p
+    cdef const uint8_t *e
+    cdef const uint8_t *q
+    cdef const uint8_t *c
+    cdef Py_ssize_t cur, rows = 0, width = -1, count = 0, k, f, n
+
+    # rows: lines ending with a newline, width: values of the first list
+    cur = pos
+    while cur < lens:
+        e = <const uint8_t *>memchr(data + cur, b'\n', lens - cur)
+        if e == NULL:
+            break
+        if width < 0 and e - (data + cur) >= 8 and \
+                memcmp(data + cur, b"CSI_DATA", 8) == 0:
+            width = esp32_csi_len(data + cur, e)
+        rows += 1
+        cur = e - data + 1
+    if num > 0:
+        rows = min(rows, num)
+    if maxlen != 128:
+        width = max(width, maxlen)
+    elif width < 0:
+        width = maxlen
+    if width % 2:
+        raise ValueError("csi of CSI_DATA lines must have an even length")
+
+    int_data = np.zeros([rows, 21], dtype=np.int64)
+    flo_data = np.zeros([rows], dtype=np.float64)
+    csi_data = np.zeros([rows, width // 2], dtype=np.complex128)
+    cdef np.int64_t[:, :] int_mem = int_data
+    cdef np.float64_t[:] flo_mem = flo_data
+    cdef np.complex128_t[:, :] csi_mem = csi_data
+
+    # type, role and mac are mostly the same in a file, so the string of the
+    # previous line is reused if the bytes are
+    str_data = ([], [], [])
+    cdef list str_list
+    cdef const uint8_t *prev_p[3]
+    cdef Py_ssize_t prev_n[3]
+    cdef list prev_s = [None, None, None]
+    for f in range(3):
+        prev_n[f] = -1
+        prev_p[f] = NULL
+
+    cur = pos
+    while count < rows:
+        p = data + cur
+        e = <const uint8_t *>memchr(p, b'\n', lens - cur)
+        if e == NULL:
+            break
+        if e - p < 8 or memcmp(p, b"CSI_DATA", 8) != 0:
+            cur = e - data + 1
+            continue
+
+        if csi_only:
+            q = <const uint8_t *>memchr(p, b'[', e - p)
+        else:
+            # type, role, mac, 20 integers, real_timestamp, len
+            q = p
+            for f in range(3):
+                c = <const uint8_t *>memchr(q, b',', e - q)
+                if c == NULL:
+                    q = NULL
+                    break
+                n = c - q
+                if n != prev_n[f] or memcmp(prev_p[f], q, n) != 0:
+                    prev_s[f] = (<const char *>q)[:n].decode()
+                    prev_p[f] = q
+                    prev_n[f] = n
+                str_list = str_data[f]
+                str_list.append(prev_s[f])
+                q = c + 1
+            for f in range(20):
+                if q != NULL:
+                    q = esp32_int(q, e, &int_mem[count, f])
+            if q != NULL:
+                q = esp32_float(q, e, &flo_mem[count])
+            if q != NULL:
+                q = esp32_int(q, e, &int_mem[count, 20])
+            if q != NULL and q[0] != b'[':
+                q = NULL
+        if q == NULL:
+            raise ValueError("malformed CSI_DATA line at offset %d" % cur)
+
+        k = esp32_csi(q + 1, e, <double *>&csi_mem[count, 0] if width else
+                      NULL, width)
+        if k == -1:
+            raise ValueError("malformed CSI_DATA line at offset %d" % cur)
+        if k == -2:
+            raise ValueError("csi of the line at offset %d is longer than "
+                             "%d, see maxlen" % (cur, width))
+        if k < width and maxlen == 128:
+            raise ValueError("csi of the line at offset %d is shorter than "
+                             "%d, see maxlen" % (cur, width))
+        count += 1
+        cur = e - data + 1
+
+    if count < rows:
+        int_data = int_data[:count]
+        flo_data = flo_data[:count]
+        csi_data = csi_data[:count]
+    return count, cur, str_data, int_data, flo_data, csi_data
+
+
+cdef int csi_code_of(csi_dtype, allowed) except -1:
+    """Map ``csi_dtype`` to ``CSI_*``, ``allowed`` are the names of dtypes
+    supported by the reader"""
+    name = np.dtype(csi_dtype).name
+    if name not in allowed:
+        raise ValueError("csi_dtype can only take %s!\n" % ", ".join(allowed))
+    return CSI_DTYPES.index(name)
+
+
+cdef list csi_shape(int csi_code, list shape):
+    """Shape of the ``csi`` buffer, integer layouts append an axis of 2"""
+    if csi_code == CSI_INT16 or csi_code == CSI_INT8:
+        return shape + [2]
+    return shape
+
+
+cdef np.ndarray as_complex128(np.ndarray csi, int csi_code):
+    """View or convert ``csi`` in the layout ``csi_code`` as complex128"""
+    if csi_code == CSI_COMPLEX128:
+        return csi
+    if csi_code == CSI_COMPLEX64:
+        return csi.astype(np.complex128)
+    return csi[..., 0] + 1j * csi[..., 1]
+
+
+cdef bint wait_growth(file, Py_ssize_t size, double interval, timeout):
+    """Poll the size of ``file`` every ``interval`` seconds until it isn't
+    ``size``. Returns False if it doesn't change in ``timeout`` seconds."""
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while os.stat(file).st_size == size:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+cdef check_offsets(np.int64_t[:] offsets, Py_ssize_t size):
+    """Check that ``offsets`` are ascending boundaries of messages inside a
+    buffer of ``size`` bytes"""
+    offsets_arr = np.asarray(offsets)
+    if offsets_arr.shape[0] and (offsets_arr[0] < 0 or
+                                 offsets_arr[-1] > size or
+                                 np.any(np.diff(offsets_arr) < 0)):
+        raise ValueError("offsets must be ascending and inside the buffer")
+
+
+cdef np.ndarray resize_buf(np.ndarray buf, shape, dtype):
+    """Allocate a zeroed buffer of ``shape`` and keep the content of ``buf``"""
+    ret = np.zeros(shape, dtype=dtype)
+    if buf is not None:
+        n = min(buf.shape[0], ret.shape[0])
+        ret[:n] = buf[:n]
+    return ret
+
+
+cdef read_stpfile(stpfile, endian, unit, long start, long num):
+    """Read ``num`` (all if ``0``) records of ``stpfile`` from the
+    ``start``-th one in a single ``fromfile`` call. A record is seconds and
+    microseconds in two 32-bit words, they are converted to ``float64``
+    seconds if ``unit`` is ``'s'`` or ``int64`` microseconds if ``'us'``."""
+    if unit not in ['s', 'us']:
+        raise ValueError("unit can only take 's' and 'us'!\n")
+    if start < 0 or num < 0:
+        raise ValueError("start and num must be non-negative")
+    byteorder = '<' if endian == 'little' else '>'
+    record = np.dtype([('sec', byteorder + 'u4'),
+                       ('usec', byteorder + 'u4')])
+    count = max(os.path.getsize(stpfile) // 8 - start, 0)
+    if num:
+        count = min(count, num)
+    raw = np.fromfile(stpfile, dtype=record, count=count, offset=8 * start)
+    if unit == 'us':
+        return raw['sec'].astype(np.int64) * 1000000 + raw['usec']
+    return raw['sec'] + raw['usec'] / 1000000
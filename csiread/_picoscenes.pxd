@@ -477,9 +477,13 @@ cdef packed struct dtc_MPDU_Info:
 cdef class Picoscenes:
     cdef readonly str file
     cdef readonly int count
+    cdef readonly long last_pos
+    cdef readonly long head
 
     cdef public np.ndarray raw
     cdef np.ndarray cache
+    cdef char *cache_data
+    cdef Py_ssize_t cache_itemsize
 
     cdef dtc_ieee80211_mac_frame_header[:] mem_StandardHeader
     cdef dtc_RXBasic[:] mem_RxSBasic
@@ -497,6 +501,9 @@ cdef class Picoscenes:
     cdef np.complex128_t[:, :, :, :] mem_CSI_CSI
     cdef np.complex128_t[:, :, :, :] mem_PilotCSI_CSI
     cdef np.complex128_t[:, :, :, :] mem_LegacyCSI_CSI
+    cdef np.complex64_t[:, :, :, :] mem_CSI_CSI64
+    cdef np.complex64_t[:, :, :, :] mem_PilotCSI_CSI64
+    cdef np.complex64_t[:, :, :, :] mem_LegacyCSI_CSI64
     cdef np.complex128_t[:, :, :, :] mem_BasebandSignals_Data
     cdef np.complex128_t[:, :, :, :] mem_PreEQSymbols_Data
     cdef np.uint8_t[:, :] mem_MPDU_Data
@@ -505,12 +512,21 @@ cdef class Picoscenes:
     cdef np.int32_t[:, :] mem_LegacyCSI_SubcarrierIndex
 
     cdef bint if_report
-
-    cpdef read(self)
-    cpdef seek(self, file, long pos, long num)
+    cdef bint csi64
+    cdef bint ring
+    cdef long capacity
+
+    cpdef read(self, bint resume=?)
+    cpdef seek(self, file, long pos, long num, bint append=?)
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows)
+    cdef long decode_from(self, FILE *f, long pos, long lens, long num,
+                          int start=?, bint grow=?)
     cpdef pmsg(self, data)
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets)
     cpdef interpolate_csi(self, name, bint IQ=?)
     cdef void init_memview(self)
+    cdef void clear_row(self, int row) noexcept nogil
     cdef int get_pknum(self, int bufsize)
     cdef int get_count(self)
-    cdef bint parse(self, unsigned char *buf, uint32_t buf_length, int count)
+    cdef bint parse(self, unsigned char *buf, uint32_t buf_length,
+                    int count) noexcept nogil
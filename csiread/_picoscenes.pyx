@@ -4,13 +4,20 @@ from libc.stdint cimport (uint8_t, uint16_t, uint32_t, uint64_t,
                           int8_t, int16_t, int32_t, int64_t)
 from libc.stdlib cimport malloc, realloc, free, exit
 from libc.stddef cimport size_t
-from libc.string cimport strncmp
+from libc.string cimport strncmp, memset
 from libc.math cimport abs, atan2, pi, cos, sin
 import numpy as np
 cimport numpy as np
 cimport cython
 
 
+# CSI fields are decoded into ``complex128`` or ``complex64`` (``csi_dtype`` of
+# ``init_dtype_picoscenes``)
+ctypedef fused complex_t:
+    np.complex64_t
+    np.complex128_t
+
+
 # Functions for parsing
 
 
@@ -25,7 +32,7 @@ cdef FILE* crfopen(str file):
 
 
 cdef unsigned char *crfread(unsigned char *buf, uint32_t *buf_size,
-                            FILE *f, uint32_t *field_len):
+                            FILE *f, uint32_t *field_len) noexcept nogil:
     cdef size_t l
     l = fread(buf, sizeof(unsigned char), 4, f)
     field_len[0] = cu32(buf) + 4
@@ -40,46 +47,46 @@ cdef unsigned char *crfread(unsigned char *buf, uint32_t *buf_size,
     return buf
 
 
-cdef long getfilesize(FILE *f, long pos):
+cdef long getfilesize(FILE *f, long pos) noexcept nogil:
     fseek(f, 0, SEEK_END)
     cdef long lens = ftell(f)
     fseek(f, pos, SEEK_SET)
     return lens
 
 
-cdef inline uint8_t cu8(unsigned char *buf):
+cdef inline uint8_t cu8(unsigned char *buf) noexcept nogil:
     return (<uint8_t*>buf)[0]
 
 
-cdef inline uint16_t cu16(unsigned char *buf):
+cdef inline uint16_t cu16(unsigned char *buf) noexcept nogil:
     return (<uint16_t*>buf)[0]
 
 
-cdef inline uint32_t cu32(unsigned char *buf):
+cdef inline uint32_t cu32(unsigned char *buf) noexcept nogil:
     return (<uint32_t*>buf)[0]
 
 
-cdef inline uint64_t cu64(unsigned char *buf):
+cdef inline uint64_t cu64(unsigned char *buf) noexcept nogil:
     return (<uint64_t*>buf)[0]
 
 
-cdef inline int16_t c16(unsigned char *buf):
+cdef inline int16_t c16(unsigned char *buf) noexcept nogil:
     return (<int16_t*>buf)[0]
 
 
-cdef inline double cd64(unsigned char *buf):
+cdef inline double cd64(unsigned char *buf) noexcept nogil:
     return (<double*>buf)[0]
 
 
 cdef void parse_AbstractPicoScenesFrameSegment(unsigned char *buf, 
-    AbstractPicoScenesFrameSegment *m):
+    AbstractPicoScenesFrameSegment *m) noexcept nogil:
     m.segmentLength = cu32(buf)
     m.segNameLength = cu8(buf + 4)
     m.segmentName = buf + 5
     m.versionId = cu16(buf + 5 + m.segNameLength)
 
 
-cdef int16_t* get_scidx_pilot(int8_t format, uint16_t cbw):
+cdef int16_t* get_scidx_pilot(int8_t format, uint16_t cbw) noexcept nogil:
     global pilot_scidx
     if format == PacketFormatEnum.PacketFormat_HESU:
         if cbw == ChannelBandwidthEnum.CBW_20:
@@ -120,7 +127,7 @@ cdef int16_t* get_scidx_pilot(int8_t format, uint16_t cbw):
 
 cdef bint set_scidx_all(np.int32_t[:] scidx, int count, int offset,
                   int a, int b, int c, int d, int16_t *pilot_scidx,
-                  bint skip_pilot):
+                  bint skip_pilot) noexcept nogil:
     cdef int i
     cdef int j = 0
     cdef int k = 0
@@ -158,7 +165,8 @@ cdef bint set_scidx_all(np.int32_t[:] scidx, int count, int offset,
 
 
 cdef bint get_scidx_all(np.int32_t[:] scidx, int8_t format,
-                        uint16_t cbw, int offset, bint skip_pilot=False):
+                        uint16_t cbw, int offset,
+                        bint skip_pilot=False) noexcept nogil:
     global pilot_scidx
     if format == PacketFormatEnum.PacketFormat_HESU:
         if cbw == ChannelBandwidthEnum.CBW_20:
@@ -209,7 +217,7 @@ cdef bint get_scidx_all(np.int32_t[:] scidx, int8_t format,
 
 
 cdef bint get_scidx_5300(np.int32_t[:] scidx, int count, int offset,
-                         int a, int b, int step):
+                         int a, int b, int step) noexcept nogil:
     cdef int i, j
     if scidx.shape[0] < count:
         return False
@@ -231,12 +239,12 @@ cdef bint get_scidx_5300(np.int32_t[:] scidx, int count, int offset,
 
 
 cdef bint parseCSI9300scidx(np.int32_t[:] scidx, int8_t format,
-                            uint16_t cbw, int offset):
+                            uint16_t cbw, int offset) noexcept nogil:
     return get_scidx_all(scidx, format, cbw, offset, False)
 
 
 cdef bint parseCSI5300scidx(np.int32_t[:] scidx, int8_t format,
-                            uint16_t cbw, int offset):
+                            uint16_t cbw, int offset) noexcept nogil:
     if cbw == ChannelBandwidthEnum.CBW_20:
         return get_scidx_5300(scidx, 30, offset, 28, 1, 2)
     elif cbw == ChannelBandwidthEnum.CBW_40:
@@ -247,12 +255,13 @@ cdef bint parseCSI5300scidx(np.int32_t[:] scidx, int8_t format,
 
 
 cdef bint parseCSIMVMscidx(np.int32_t[:] scidx, int8_t format,
-                          uint16_t cbw, int offset, bint skipPilotSubcarriers):
+                          uint16_t cbw, int offset,
+                          bint skipPilotSubcarriers) noexcept nogil:
     return get_scidx_all(scidx, format, cbw, offset, skipPilotSubcarriers)
 
 
 cdef bint parseCSIUSRPscidx(np.int32_t[:] scidx, unsigned char *payload,
-                            int16_t numTones):
+                            int16_t numTones) noexcept nogil:
     cdef int i
     if scidx.shape[0] < numTones:
         return False
@@ -264,8 +273,9 @@ cdef bint parseCSIUSRPscidx(np.int32_t[:] scidx, unsigned char *payload,
     return True
 
 
-cdef bint parseCSI9300(np.complex128_t[:, :, :] csi, unsigned char *payload,
-                       uint16_t numTones, uint8_t numTx, uint8_t numRx):
+cdef bint parseCSI9300(complex_t[:, :, :] csi, unsigned char *payload,
+                       uint16_t numTones, uint8_t numTx,
+                       uint8_t numRx) noexcept nogil:
     cdef int i, j
     cdef int tempArray[4]
     cdef int valuePos, pos, rxIndex, txIndex, toneIndex
@@ -305,9 +315,9 @@ cdef bint parseCSI9300(np.complex128_t[:, :, :] csi, unsigned char *payload,
     return True
 
 
-cdef bint parseCSI5300(np.complex128_t[:, :, :] csi, unsigned char *payload,
+cdef bint parseCSI5300(complex_t[:, :, :] csi, unsigned char *payload,
                        uint16_t numTones, uint8_t numTx, uint8_t numRx,
-                       uint8_t antSel):
+                       uint8_t antSel) noexcept nogil:
     """Parse CSI of Intel 5300 NIC
 
     Important:
@@ -339,10 +349,10 @@ cdef bint parseCSI5300(np.complex128_t[:, :, :] csi, unsigned char *payload,
                 index += 16
     return True
 
-cdef bint parseCSIMVM(np.complex128_t[:, :, :] csi, unsigned char *payload,
+cdef bint parseCSIMVM(complex_t[:, :, :] csi, unsigned char *payload,
                       uint16_t numTones, uint8_t numTx, uint8_t numRx,
                       int8_t format, uint16_t cbw, uint8_t fwversion,
-                      bint skip_pilot):
+                      bint skip_pilot) noexcept nogil:
     """Important: this function may be incorrect"""
     cdef int16_t *p = get_scidx_pilot(format, cbw)
     cdef int i, j, k, g
@@ -374,8 +384,8 @@ cdef bint parseCSIMVM(np.complex128_t[:, :, :] csi, unsigned char *payload,
     return True
 
 
-cdef bint parseCSIUSRP(np.complex128_t[:, :, :] csi, unsigned char *payload,
-                       uint32_t csiBufferLength):
+cdef bint parseCSIUSRP(complex_t[:, :, :] csi, unsigned char *payload,
+                       uint32_t csiBufferLength) noexcept nogil:
     """parseSignalMatrix = parseCSIUSRP"""
     cdef uint32_t i, j, k
     cdef uint32_t offset = 0
@@ -409,7 +419,7 @@ cdef bint parseCSIUSRP(np.complex128_t[:, :, :] csi, unsigned char *payload,
 
 
 cdef bint parse_SignalMatrixV1(unsigned char *buf, dtc_SignalMatrix_Info *m,
-                               np.complex128_t[:, :, :] data):
+                               np.complex128_t[:, :, :] data) noexcept nogil:
     """parseSignalMatrix = parseCSIUSRP"""
     cdef uint32_t i, j, k
     cdef uint32_t offset = 0
@@ -446,7 +456,7 @@ cdef bint parse_SignalMatrixV1(unsigned char *buf, dtc_SignalMatrix_Info *m,
     return True
 
 
-cdef void parse_RxSBasicV1(unsigned char *buf, dtc_RXBasic *m):
+cdef void parse_RxSBasicV1(unsigned char *buf, dtc_RXBasic *m) noexcept nogil:
     cdef RxSBasicV1 *rsbv1 = <RxSBasicV1*>buf
     m.deviceType = rsbv1.deviceType
     m.timestamp = rsbv1.tstamp
@@ -467,7 +477,7 @@ cdef void parse_RxSBasicV1(unsigned char *buf, dtc_RXBasic *m):
     m.rssi3 = rsbv1.noiseFloor + rsbv1.rssi_ctl2
 
 
-cdef void parse_RxSBasicV2(unsigned char *buf, dtc_RXBasic *m):
+cdef void parse_RxSBasicV2(unsigned char *buf, dtc_RXBasic *m) noexcept nogil:
     cdef RxSBasicV2 *rsbv2 = <RxSBasicV2*>buf
     m.deviceType = rsbv2.deviceType
     m.timestamp = rsbv2.tstamp
@@ -488,7 +498,7 @@ cdef void parse_RxSBasicV2(unsigned char *buf, dtc_RXBasic *m):
     m.rssi3 = rsbv2.noiseFloor + rsbv2.rssi_ctl2
 
 
-cdef void parse_RxSBasicV3(unsigned char *buf, dtc_RXBasic *m):
+cdef void parse_RxSBasicV3(unsigned char *buf, dtc_RXBasic *m) noexcept nogil:
     cdef RxSBasicV3 *rsbv3 = <RxSBasicV3*>buf
     m.deviceType = rsbv3.deviceType
     m.timestamp = rsbv3.tstamp
@@ -509,7 +519,8 @@ cdef void parse_RxSBasicV3(unsigned char *buf, dtc_RXBasic *m):
     m.rssi3 = rsbv3.rssi_ctl2
 
 
-cdef void parse_ExtraInfoV1(unsigned char *buf, dtc_ExtraInfo *m):
+cdef void parse_ExtraInfoV1(unsigned char *buf,
+                            dtc_ExtraInfo *m) noexcept nogil:
     cdef FeatureCode *featurecode = <FeatureCode*>buf
     cdef int offset = 4
     cdef int i
@@ -622,14 +633,16 @@ cdef void parse_ExtraInfoV1(unsigned char *buf, dtc_ExtraInfo *m):
         offset += 1
 
 
-cdef void parse_MVMExtraV1(unsigned char *buf, dtc_IntelMVMExtrta *m):
+cdef void parse_MVMExtraV1(unsigned char *buf,
+                           dtc_IntelMVMExtrta *m) noexcept nogil:
     cdef IntelMVMExtrta *imvme = <IntelMVMExtrta*>buf
     m.FMTClock = imvme.parsedHeader.ftmClock
     m.usClock = imvme.parsedHeader.muClock
     m.RateNFlags = imvme.parsedHeader.rate_n_flags
 
 
-cdef void parse_DPASRequestV1(unsigned char *buf, dtc_DPASRequest *m):
+cdef void parse_DPASRequestV1(unsigned char *buf,
+                              dtc_DPASRequest *m) noexcept nogil:
     cdef DPASRequestV1 *dpasr = <DPASRequestV1*>buf
     m.batchId = dpasr.batchId
     m.batchLength = dpasr.batchLength
@@ -637,7 +650,8 @@ cdef void parse_DPASRequestV1(unsigned char *buf, dtc_DPASRequest *m):
     m.intervalTime = dpasr.intervalTime
 
 
-cdef void parse_DPASRequestV2(unsigned char *buf, dtc_DPASRequest *m):
+cdef void parse_DPASRequestV2(unsigned char *buf,
+                              dtc_DPASRequest *m) noexcept nogil:
     cdef DPASRequestV2 *dpasr = <DPASRequestV2*>buf
     m.batchId = dpasr.batchId
     m.batchLength = dpasr.batchLength
@@ -646,7 +660,8 @@ cdef void parse_DPASRequestV2(unsigned char *buf, dtc_DPASRequest *m):
     m.intervalStep = dpasr.intervalStep
 
 
-cdef void parse_DPASRequestV3(unsigned char *buf, dtc_DPASRequest *m):
+cdef void parse_DPASRequestV3(unsigned char *buf,
+                              dtc_DPASRequest *m) noexcept nogil:
     cdef DPASRequestV3 *dpasr = <DPASRequestV3*>buf
     m.batchId = dpasr.batchId
     m.batchLength = dpasr.batchLength
@@ -657,7 +672,8 @@ cdef void parse_DPASRequestV3(unsigned char *buf, dtc_DPASRequest *m):
     m.carrierFrequency = dpasr.carrierFrequency
     m.samplingFrequency = dpasr.samplingFrequency
 
-cdef void parse_DPASRequestV4(unsigned char *buf, dtc_DPASRequest *m):
+cdef void parse_DPASRequestV4(unsigned char *buf,
+                              dtc_DPASRequest *m) noexcept nogil:
     cdef DPASRequestV4 *dpasr = <DPASRequestV4*>buf
     m.requestMode = dpasr.requestMode
     m.batchId = dpasr.batchId
@@ -672,8 +688,8 @@ cdef void parse_DPASRequestV4(unsigned char *buf, dtc_DPASRequest *m):
 
 
 cdef void parse_CSIV1(unsigned char *buf, dtc_CSI_Info *m,
-                      np.complex128_t[:, :, :] csi,
-                      np.int32_t[:] scidx):
+                      complex_t[:, :, :] csi,
+                      np.int32_t[:] scidx) noexcept nogil:
     cdef CSIV1 *csiv1 = <CSIV1*>buf
     cdef int actualNumSTSPerChain
     cdef int temp
@@ -719,8 +735,8 @@ cdef void parse_CSIV1(unsigned char *buf, dtc_CSI_Info *m,
 
 
 cdef void parse_CSIV2(unsigned char *buf, dtc_CSI_Info *m,
-                      np.complex128_t[:, :, :] csi,
-                      np.int32_t[:] scidx):    
+                      complex_t[:, :, :] csi,
+                      np.int32_t[:] scidx) noexcept nogil:
     cdef CSIV2 *csiv2 = <CSIV2*>buf
     cdef int actualNumSTSPerChain
     cdef int temp
@@ -768,8 +784,8 @@ cdef void parse_CSIV2(unsigned char *buf, dtc_CSI_Info *m,
 
 
 cdef void parse_CSIV3(unsigned char *buf, dtc_CSI_Info *m,
-                      np.complex128_t[:, :, :] csi,
-                      np.int32_t[:] scidx):
+                      complex_t[:, :, :] csi,
+                      np.int32_t[:] scidx) noexcept nogil:
     cdef CSIV3 *csiv3 = <CSIV3*>buf
     cdef int actualNumSTSPerChain
     cdef int temp
@@ -829,8 +845,8 @@ cdef void parse_CSIV3(unsigned char *buf, dtc_CSI_Info *m,
 
 
 cdef void parse_CSIV4(unsigned char *buf, dtc_CSI_Info *m,
-                      np.complex128_t[:, :, :] csi,
-                      np.int32_t[:] scidx):
+                      complex_t[:, :, :] csi,
+                      np.int32_t[:] scidx) noexcept nogil:
     cdef CSIV4 *csiv4 = <CSIV4*>buf
     cdef int actualNumSTSPerChain
     cdef int temp
@@ -890,7 +906,7 @@ cdef void parse_CSIV4(unsigned char *buf, dtc_CSI_Info *m,
 
 
 cdef bint parse_MPDU(unsigned char *buf, dtc_MPDU_Info *m,
-                     np.uint8_t[:] mpdu, uint32_t length):
+                     np.uint8_t[:] mpdu, uint32_t length) noexcept nogil:
     cdef uint32_t i
     m.length = length
     if mpdu.shape[0] < length:
@@ -901,8 +917,8 @@ cdef bint parse_MPDU(unsigned char *buf, dtc_MPDU_Info *m,
     return True
 
 
-cdef void parse_StandardHeader(unsigned char *buf,
-                               dtc_ieee80211_mac_frame_header *m):
+cdef void parse_StandardHeader(
+        unsigned char *buf, dtc_ieee80211_mac_frame_header *m) noexcept nogil:
     cdef ieee80211_mac_frame_header *imfh = <ieee80211_mac_frame_header*>buf
     cdef int i
 
@@ -926,7 +942,7 @@ cdef void parse_StandardHeader(unsigned char *buf,
 
 
 cdef void parse_PicoScenesHeader(unsigned char *buf,
-                                 dtc_PicoScenesFrameHeader *m):
+                                 dtc_PicoScenesFrameHeader *m) noexcept nogil:
     cdef PicoScenesFrameHeader *psfh = <PicoScenesFrameHeader*>buf
     m.MagicValue = psfh.magicValue
     m.Version = psfh.version
@@ -937,7 +953,7 @@ cdef void parse_PicoScenesHeader(unsigned char *buf,
 
 
 cdef void parse_RxSBasic(uint16_t versionId, unsigned char *buf,
-                         dtc_RXBasic *m):
+                         dtc_RXBasic *m) noexcept nogil:
     if versionId == 0x1:
         parse_RxSBasicV1(buf, m)
     elif versionId == 0x2:
@@ -949,7 +965,7 @@ cdef void parse_RxSBasic(uint16_t versionId, unsigned char *buf,
 
 
 cdef void parse_ExtraInfo(uint16_t versionId, unsigned char *buf,
-                          dtc_ExtraInfo *m):
+                          dtc_ExtraInfo *m) noexcept nogil:
     if versionId == 0x1:
         parse_ExtraInfoV1(buf, m)
     else:
@@ -957,7 +973,7 @@ cdef void parse_ExtraInfo(uint16_t versionId, unsigned char *buf,
 
 
 cdef void parse_MVMExtra(uint16_t versionId, unsigned char *buf,
-                         dtc_IntelMVMExtrta *m):
+                         dtc_IntelMVMExtrta *m) noexcept nogil:
     if versionId == 0x1:
         parse_MVMExtraV1(buf, m)
     else:
@@ -965,7 +981,7 @@ cdef void parse_MVMExtra(uint16_t versionId, unsigned char *buf,
 
 
 cdef void parse_DPASRequest(uint16_t versionId, unsigned char *buf,
-                            dtc_DPASRequest *m):
+                            dtc_DPASRequest *m) noexcept nogil:
     if versionId == 0x1:
         parse_DPASRequestV1(buf, m)
     elif versionId == 0x2:
@@ -979,7 +995,8 @@ cdef void parse_DPASRequest(uint16_t versionId, unsigned char *buf,
 
 
 cdef void parse_CSI(uint16_t versionId, unsigned char *buf, dtc_CSI_Info *m,
-                    np.complex128_t[:, :, :] csi, np.int32_t[:] scidx):
+                    complex_t[:, :, :] csi,
+                    np.int32_t[:] scidx) noexcept nogil:
     if versionId == 0x1:
         parse_CSIV1(buf, m, csi, scidx)
     elif versionId == 0x2:
@@ -994,7 +1011,7 @@ cdef void parse_CSI(uint16_t versionId, unsigned char *buf, dtc_CSI_Info *m,
 
 cdef void parse_SignalMatrix(uint16_t versionId, unsigned char *buf,
                              dtc_SignalMatrix_Info *m,
-                             np.complex128_t[:, :, :] data):
+                             np.complex128_t[:, :, :] data) noexcept nogil:
     if versionId == 0x1:
         parse_SignalMatrixV1(buf, m, data)
     else:
@@ -1002,7 +1019,8 @@ cdef void parse_SignalMatrix(uint16_t versionId, unsigned char *buf,
 
 
 cdef void interp_iq(np.complex128_t *csi_1, np.complex128_t *csi_2,
-                    np.float64_t ratio, np.complex128_t *iplcsi):
+                    np.float64_t ratio,
+                    np.complex128_t *iplcsi) noexcept nogil:
     """interpolate csi along real and imag (linear)"""
     cdef np.complex128_t csi
     csi = csi_2[0] - csi_1[0]
@@ -1012,7 +1030,8 @@ cdef void interp_iq(np.complex128_t *csi_1, np.complex128_t *csi_2,
 
 
 cdef void interp_ap(np.complex128_t *csi_1, np.complex128_t *csi_2,
-                    np.float64_t ratio, np.complex128_t *iplcsi):
+                    np.float64_t ratio,
+                    np.complex128_t *iplcsi) noexcept nogil:
     """interpolate csi along amplitude and phase (linear)"""
     cdef np.float64_t csi_a
     cdef np.float64_t csi_p
@@ -1042,51 +1061,248 @@ cdef class Picoscenes:
         pass
 
     def __init__(self, str file, np.dtype dtype, bint if_report=True,
-                 int bufsize=0):
+                 int bufsize=0, bint ring=False):
+        if ring and bufsize < 1:
+            raise ValueError("ring requires bufsize > 0!\n")
         self.file = file
         self.if_report = if_report
+        self.ring = ring
+        self.capacity = bufsize
         pk_num = self.get_pknum(bufsize)
+        if ring:
+            # every slot is mirrored, so the last frames are contiguous
+            pk_num = 2 * bufsize
         self.cache = np.zeros([pk_num], dtype)
         self.init_memview()
 
-    cpdef read(self):
-        self.seek(self.file, 0, 0) 
+    cpdef read(self, bint resume=False):
+        if resume:
+            self.seek(self.file, self.last_pos, 0, True)
+        else:
+            self.seek(self.file, 0, 0)
+
+    cpdef seek(self, file, long pos, long num, bint append=False):
+        cdef FILE *f = crfopen(file)
+        cdef long lens = getfilesize(f, pos)
+        if num == 0:
+            num = lens
+
+        if append:
+            self.decode_from(f, pos, lens, num, self.count, True)
+        else:
+            self.decode_from(f, pos, lens, num)
+        fclose(f)
+        if self.if_report:
+            printf("%d packets parsed\n", self.count)
+
+    def iter_chunks(self, long chunk_size, file=None):
+        """Yield ``self`` with ``raw`` of up to ``chunk_size`` frames at a
+        time. ``file`` stays open and ``raw`` is reused, so a chunk is
+        overwritten by the next one."""
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+
+        if chunk_size != self.cache.shape[0]:
+            self.cache = np.zeros([chunk_size], self.cache.dtype)
+            self.init_memview()
 
-    cpdef seek(self, file, long pos, long num):
         cdef FILE *f = crfopen(file)
         cdef long lens = getfilesize(f, 0)
+        cdef long pos = 0
+        cdef int used = 0
+        try:
+            while True:
+                # clear what a frame without some segments wouldn't overwrite
+                self.cache[:used] = 0
+                pos = self.decode_from(f, pos, lens, chunk_size)
+                if self.count == 0:
+                    break
+                used = self.count
+                yield self
+        finally:
+            fclose(f)
+
+    cdef long decode_from(self, FILE *f, long pos, long lens, long num,
+                          int start=0, bint grow=False):
+        """Decode frames from ``pos`` of ``f`` into the rows from ``start``
+        until ``num`` frames are parsed or the buffer is full (it grows if
+        ``grow``), then set ``raw`` of all rows. Returns the offset of the
+        first frame left, it is kept as ``last_pos``."""
         cdef uint32_t field_len = 4
         cdef uint32_t buf_size = 4              # Require: buf_size >= 4
         cdef unsigned char *buf
-        if num == 0:
-            num = lens
+        cdef int count = start
+        cdef size_t l
 
-        cdef int count = 0
+        buf = <unsigned char *>malloc(buf_size * sizeof(unsigned char))
+        with nogil:
+            while pos < (lens-4):
+                if count >= self.mem_RxSBasic.shape[0]:
+                    if not grow:
+                        break   # buffer is full
+                    with gil:
+                        cache = np.zeros([2 * count + 1], self.cache.dtype)
+                        cache[:count] = self.cache[:count]
+                        self.cache = cache
+                        self.init_memview()
+                buf = crfread(buf, &buf_size, f, &field_len)
+                if pos + field_len > lens:
+                    break   # truncated
+                l = fread(buf, sizeof(unsigned char), field_len, f)
+                self.parse(buf, <uint32_t>l, count)
+                pos += field_len
+                count += 1
+                if count - start >= num:
+                    break
+        free(buf)
+        self.count = count
+        self.last_pos = pos
+        self.raw = self.cache[:count]
+        return pos
+
+    cpdef seek_many(self, file, np.int64_t[:] offsets, np.int64_t[:] rows):
+        """Decode the frames at ``offsets`` into ``rows`` in one pass
+
+        ``offsets`` should be ascending, so the file is walked forward once.
+        ``rows`` is a permutation of ``range(len(offsets))``.
+        """
+        cdef Py_ssize_t n = offsets.shape[0]
+        cdef Py_ssize_t k = 0
+        cdef uint32_t field_len = 4
+        cdef uint32_t buf_size = 4              # Require: buf_size >= 4
+        cdef unsigned char *buf
+        cdef bint bad = False
         cdef size_t l
 
+        if rows.shape[0] != n:
+            raise ValueError("offsets and rows must have the same length")
+        if n and (np.min(rows) < 0 or np.max(rows) >= n):
+            raise ValueError("rows must be in range(len(offsets))")
+        if n > self.cache.shape[0]:
+            cache = np.zeros([n], self.cache.dtype)
+            cache[:self.cache.shape[0]] = self.cache
+            self.cache = cache
+            self.init_memview()
+
+        cdef FILE *f = crfopen(file)
+        cdef long lens = getfilesize(f, 0)
+
         buf = <unsigned char *>malloc(buf_size * sizeof(unsigned char))
-        while pos < (lens-4):
-            buf = crfread(buf, &buf_size, f, &field_len)
-            l = fread(buf, sizeof(unsigned char), field_len, f)
-            self.parse(buf, <uint32_t>l, count)
-            pos += field_len
-            count += 1
-            if count >= num:
-                break
+        with nogil:
+            for k in range(n):
+                if offsets[k] < 0 or offsets[k] + 4 > lens:
+                    bad = True
+                    break
+                fseek(f, offsets[k], SEEK_SET)
+                buf = crfread(buf, &buf_size, f, &field_len)
+                if offsets[k] + field_len > lens:
+                    bad = True
+                    break
+                l = fread(buf, sizeof(unsigned char), field_len, f)
+                self.parse(buf, <uint32_t>l, <int>rows[k])
         free(buf)
         fclose(f)
-        self.count = count
+        if bad:
+            raise ValueError("No frame at offset %d" % offsets[k])
+
+        self.count = n
         if self.if_report:
-            printf("%d packets parsed\n", count)
-        self.raw = self.cache[:count]
+            printf("%d packets parsed\n", <int>n)
+        self.raw = self.cache[:n]
 
     cpdef pmsg(self, data):
         # This method hasn't been ready
-        if self.parse(data, <uint32_t>len(data), 0):
+        cdef int row
+        if self.ring:
+            row = self.head % self.capacity
+            # the mirror isn't in any view until ``head`` moves on
+            self.clear_row(row + <int>self.capacity)
+            if not self.parse(data, <uint32_t>len(data),
+                              row + <int>self.capacity):
+                return
+            self.clear_row(row)
+            self.parse(data, <uint32_t>len(data), row)
+            self.head += 1
+            return 0xf300
+        self.clear_row(0)
+        if not self.parse(data, <uint32_t>len(data), 0):
             return
         self.raw = self.cache
         return 0xf300       # status code
 
+    def last(self, long n):
+        """Set ``raw`` to the last ``n`` frames received by ``pmsg`` in ring
+        mode, oldest first, without copying. Returns the count of frames in
+        ``raw``."""
+        if not self.ring:
+            raise ValueError("last() requires ring=True!\n")
+        if n < 0:
+            raise ValueError("n must be non-negative")
+        cdef long count = min(n, self.head, self.capacity)
+        cdef long stop = self.head % self.capacity + self.capacity
+        self.raw = self.cache[stop - count:stop]
+        self.count = count
+        return count
+
+    cpdef pmsg_many(self, const uint8_t[:] buffer, np.int64_t[:] offsets):
+        """Parse messages ``buffer[offsets[i]:offsets[i+1]]`` into consecutive
+        rows. In ring mode, they are appended to the ring and ``raw`` is left.
+
+        Returns:
+            tuple: The count of messages parsed and the status code of each
+                message, ``0`` if it is not a frame.
+        """
+        cdef Py_ssize_t n = max(offsets.shape[0] - 1, 0)
+        cdef const uint8_t *base = NULL
+        cdef unsigned char *data
+        cdef Py_ssize_t k, length
+        cdef int count = 0
+        cdef int row
+
+        offsets_arr = np.asarray(offsets)
+        if n and (offsets_arr[0] < 0 or offsets_arr[-1] > buffer.shape[0] or
+                  np.any(np.diff(offsets_arr) < 0)):
+            raise ValueError("offsets must be ascending and inside the buffer")
+        if n > self.cache.shape[0] and not self.ring:
+            cache = np.zeros([n], self.cache.dtype)
+            cache[:self.cache.shape[0]] = self.cache
+            self.cache = cache
+            self.init_memview()
+        if buffer.shape[0]:
+            base = &buffer[0]
+
+        status = np.zeros([n], dtype=np.int32)
+        cdef np.int32_t[:] status_mem = status
+
+        with nogil:
+            for k in range(n):
+                data = <unsigned char *>(base + offsets[k])
+                length = offsets[k+1] - offsets[k]
+                if length < 4:
+                    continue
+                if self.ring:
+                    row = (self.head + count) % self.capacity
+                    self.clear_row(row + <int>self.capacity)
+                    if not self.parse(data, <uint32_t>length,
+                                      row + <int>self.capacity):
+                        continue
+                    self.clear_row(row)
+                    self.parse(data, <uint32_t>length, row)
+                else:
+                    self.clear_row(count)
+                    if not self.parse(data, <uint32_t>length, count):
+                        continue
+                status_mem[k] = 0xf300
+                count += 1
+
+        if self.ring:
+            self.head += count
+        else:
+            self.count = count
+            self.raw = self.cache[:count]
+        return count, status
+
     cpdef interpolate_csi(self, name, bint IQ=False):
         """interpolate csi"""
         cdef int i, j, k, g, d, nsc, nrx, ntx
@@ -1100,11 +1316,13 @@ cdef class Picoscenes:
         if name == 'CSI':
             mem_CSI_Info = self.mem_CSI_Info
             mem_CSI_scidx = self.mem_CSI_SubcarrierIndex
-            mem_CSI_CSI = self.mem_CSI_CSI
+            mem_CSI_CSI = self.cache["CSI"]["CSI"].astype(np.complex128,
+                                                          copy=False)
         elif name == 'LegacyCSI':
             mem_CSI_Info = self.mem_LegacyCSI_Info
             mem_CSI_scidx = self.mem_LegacyCSI_SubcarrierIndex
-            mem_CSI_CSI = self.mem_LegacyCSI_CSI
+            mem_CSI_CSI = self.cache["LegacyCSI"]["CSI"].astype(
+                np.complex128, copy=False)
         else:
             pass
 
@@ -1164,6 +1382,8 @@ cdef class Picoscenes:
         return interpolated_csi, interpolated_scindex
 
     cdef void init_memview(self):
+        self.cache_data = <char *>np.PyArray_DATA(self.cache)
+        self.cache_itemsize = self.cache.itemsize
         self.mem_StandardHeader = self.cache["StandardHeader"]
         self.mem_RxSBasic = self.cache["RxSBasic"]
         self.mem_RxExtraInfo = self.cache["RxExtraInfo"]
@@ -1178,9 +1398,15 @@ cdef class Picoscenes:
         self.mem_PreEQSymbols_Info = self.cache["PreEQSymbols"]["Info"]
         self.mem_MPDU_Info = self.cache["MPDU"]["Info"]
 
-        self.mem_CSI_CSI = self.cache["CSI"]["CSI"]
-        self.mem_PilotCSI_CSI = self.cache["PilotCSI"]["CSI"]
-        self.mem_LegacyCSI_CSI = self.cache["LegacyCSI"]["CSI"]
+        self.csi64 = self.cache["CSI"]["CSI"].dtype == np.complex64
+        if self.csi64:
+            self.mem_CSI_CSI64 = self.cache["CSI"]["CSI"]
+            self.mem_PilotCSI_CSI64 = self.cache["PilotCSI"]["CSI"]
+            self.mem_LegacyCSI_CSI64 = self.cache["LegacyCSI"]["CSI"]
+        else:
+            self.mem_CSI_CSI = self.cache["CSI"]["CSI"]
+            self.mem_PilotCSI_CSI = self.cache["PilotCSI"]["CSI"]
+            self.mem_LegacyCSI_CSI = self.cache["LegacyCSI"]["CSI"]
         self.mem_BasebandSignals_Data = self.cache["BasebandSignals"]["Data"]
         self.mem_PreEQSymbols_Data = self.cache["PreEQSymbols"]["Data"]
         self.mem_MPDU_Data = self.cache["MPDU"]["Data"]
@@ -1189,6 +1415,12 @@ cdef class Picoscenes:
         self.mem_PilotCSI_SubcarrierIndex = self.cache["PilotCSI"]["SubcarrierIndex"]
         self.mem_LegacyCSI_SubcarrierIndex = self.cache["LegacyCSI"]["SubcarrierIndex"]
 
+    cdef void clear_row(self, int row) noexcept nogil:
+        """Zero frame ``row``, a reused row may hold segments of an older
+        frame which the next one doesn't have"""
+        memset(self.cache_data + row * self.cache_itemsize, 0,
+               self.cache_itemsize)
+
     cdef int get_pknum(self, int bufsize):
         cdef int pk_num
         if bufsize == 0:
@@ -1210,17 +1442,19 @@ cdef class Picoscenes:
         cdef long lens = getfilesize(f, 0)
         cdef unsigned char buf[4]
 
-        while pos < (lens - 4):
-            l = fread(buf, sizeof(unsigned char), 4, f)
-            field_len = cu32(buf) + 4
-            fseek(f, field_len - 4, SEEK_CUR)
+        with nogil:
+            while pos < (lens - 4):
+                l = fread(buf, sizeof(unsigned char), 4, f)
+                field_len = cu32(buf) + 4
+                fseek(f, field_len - 4, SEEK_CUR)
 
-            pos += field_len
-            count += 1
+                pos += field_len
+                count += 1
         fclose(f)
         return count
 
-    cdef bint parse(self, unsigned char *buf, uint32_t buf_length, int count):
+    cdef bint parse(self, unsigned char *buf, uint32_t buf_length,
+                    int count) noexcept nogil:
         cdef int cur = 0
         cdef int i, offset
         cdef ModularPicoScenesRxFrameHeader *mpsrfh
@@ -1257,20 +1491,38 @@ cdef class Picoscenes:
                 parse_MVMExtra(apsfs.versionId, p,
                                &self.mem_MVMExtra[count])
             elif not strncmp(b"CSI", sname, slength):
-                parse_CSI(apsfs.versionId, p,
-                          &self.mem_CSI_Info[count],
-                          self.mem_CSI_CSI[count],
-                          self.mem_CSI_SubcarrierIndex[count])
+                if self.csi64:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_CSI_Info[count],
+                              self.mem_CSI_CSI64[count],
+                              self.mem_CSI_SubcarrierIndex[count])
+                else:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_CSI_Info[count],
+                              self.mem_CSI_CSI[count],
+                              self.mem_CSI_SubcarrierIndex[count])
             elif not strncmp(b"PilotCSI", sname, slength):
-                parse_CSI(apsfs.versionId, p,
-                          &self.mem_PilotCSI_Info[count],
-                          self.mem_PilotCSI_CSI[count],
-                          self.mem_PilotCSI_SubcarrierIndex[count])
+                if self.csi64:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_PilotCSI_Info[count],
+                              self.mem_PilotCSI_CSI64[count],
+                              self.mem_PilotCSI_SubcarrierIndex[count])
+                else:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_PilotCSI_Info[count],
+                              self.mem_PilotCSI_CSI[count],
+                              self.mem_PilotCSI_SubcarrierIndex[count])
             elif not strncmp(b"LegacyCSI", sname, slength):
-                parse_CSI(apsfs.versionId, p,
-                          &self.mem_LegacyCSI_Info[count],
-                          self.mem_LegacyCSI_CSI[count],
-                          self.mem_LegacyCSI_SubcarrierIndex[count])
+                if self.csi64:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_LegacyCSI_Info[count],
+                              self.mem_LegacyCSI_CSI64[count],
+                              self.mem_LegacyCSI_SubcarrierIndex[count])
+                else:
+                    parse_CSI(apsfs.versionId, p,
+                              &self.mem_LegacyCSI_Info[count],
+                              self.mem_LegacyCSI_CSI[count],
+                              self.mem_LegacyCSI_SubcarrierIndex[count])
             elif not strncmp(b"BasebandSignal", sname, slength):
                 parse_SignalMatrix(apsfs.versionId, p,
                                    &self.mem_BasebandSignals_Info[count],
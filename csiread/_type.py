@@ -1,7 +1,7 @@
 import numpy as np
 
 
-def init_dtype_picoscenes(pl_size):
+def init_dtype_picoscenes(pl_size, csi_dtype=complex):
     dt_ieee80211_mac_frame_header_frame_control_field = np.dtype([
         ('Version', np.uint16),
         ('Type', np.uint16),
@@ -117,19 +117,19 @@ def init_dtype_picoscenes(pl_size):
 
     dt_CSI = np.dtype([
         ('Info', dt_CSI_info),
-        ('CSI', complex, pl_size['CSI']),
+        ('CSI', csi_dtype, pl_size['CSI']),
         ('SubcarrierIndex', np.int32, (pl_size['CSI'][0], )),
     ])
 
     dt_PilotCSI = np.dtype([
         ('Info', dt_CSI_info),
-        ('CSI', complex, pl_size['PilotCSI']),
+        ('CSI', csi_dtype, pl_size['PilotCSI']),
         ('SubcarrierIndex', np.int32, (pl_size['PilotCSI'][0], )),
     ])
 
     dt_LegacyCSI = np.dtype([
         ('Info', dt_CSI_info),
-        ('CSI', complex, pl_size['LegacyCSI']),
+        ('CSI', csi_dtype, pl_size['LegacyCSI']),
         ('SubcarrierIndex', np.int32, (pl_size['LegacyCSI'][0], )),
     ])
 
@@ -203,3 +203,19 @@ def init_dtype_picoscenes(pl_size):
         ('MPDU', dt_MPDU),
     ])
     return dt
+
+
+# A record of the ``.idx`` sidecar: offset, length and type of a packet
+dt_index = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('type', 'u1'),
+])
+
+dt_index_header = np.dtype([
+    ('magic', 'S8'),
+    ('key', 'S24'),
+    ('size', '<u8'),
+    ('mtime', '<i8'),
+    ('count', '<u8'),
+])
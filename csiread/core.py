@@ -7,7 +7,7 @@ import numpy as np
 from numpy.lib import recfunctions as rfn
 from . import _csiread
 from . import _picoscenes
-from ._type import init_dtype_picoscenes
+from ._type import init_dtype_picoscenes, dt_index, dt_index_header
 
 
 def stringify(array, sep=':'):
@@ -29,10 +29,38 @@ class Intel(_csiread.Intel):
             If ``0`` and file is ``str``, all packets will be parsed. If ``0``
             and file is ``None``, this parameter is ignored by `pmsg` method.
             Default: 0
+        alloc (str, optional): How to allocate buffers when ``bufsize`` is
+            ``0`` and file is ``str``. It can be ``'estimate'``, ``'exact'``
+            and ``'grow'``. ``'estimate'`` allocates ``filesize // 95`` rows,
+            the upper bound of the packet count. ``'exact'`` walks the length
+            prefixes of the file once and allocates exactly the count of 0xbb
+            and 0xc1 packets. ``'grow'`` allocates according to ``nrxnum``
+            and ``ntxnum`` and doubles buffers when they are full, ``bufsize``
+            is the initial size if it is not ``0``. Default: ``'estimate'``
+        csi_dtype (dtype, optional): The dtype of ``csi``. It can be
+            ``complex128``, ``complex64``, ``int16`` and ``int8``. ``int16``
+            and ``int8`` store the real and imaginary parts in an extra last
+            axis of size 2, e.g. ``csi[..., 0]`` is the real part. Default:
+            ``np.complex128``
+        ring (bool, optional): Ring mode for ``pmsg``. Packets are appended
+            to a ring of ``bufsize`` slots instead of overwriting row 0, and
+            ``last(n)`` sets the views to the latest ones. ``bufsize`` must
+            be positive. Default: ``False``
+        output (str, optional): What ``csi`` holds. It can be ``'raw'``,
+            ``'scaled'`` and ``'scaled_sm'``. ``'scaled'`` scales every 0xbb
+            packet by its SNR right after it is decoded, like
+            ``get_scaled_csi``, and ``'scaled_sm'`` also undoes the spatial
+            mapping, like ``get_scaled_csi_sm``. Then ``csi_dtype`` must be
+            ``complex128`` or ``complex64``. Default: ``'raw'``
 
     Attributes:
         file (str, readonly): CSI data file
+        output (str, readonly): What ``csi`` holds, see ``output`` above
         count (int, readonly): Count of 0xbb packets parsed
+        last_pos (int, readonly): The offset after the last field parsed by
+            ``read`` and ``seek``, see ``read(resume=True)``
+        head (int, readonly): Count of 0xbb packets received in ring mode
+        head_0xc1 (int, readonly): Count of 0xc1 packets received in ring mode
         timestamp_low (ndarray): The low 32 bits of the NIC's 1 MHz clock. It
             wraps about every 4300 seconds, or 72 minutes.
         bfee_count (ndarray): The count of the total number of beamforming
@@ -82,9 +110,10 @@ class Intel(_csiread.Intel):
     """
 
     def __init__(self, file, nrxnum=3, ntxnum=2, pl_size=0, if_report=True,
-                 bufsize=0):
+                 bufsize=0, alloc='estimate', csi_dtype=np.complex128,
+                 ring=False, output='raw'):
         super(Intel, self).__init__(file, nrxnum, ntxnum, pl_size, if_report,
-                                    bufsize)
+                                    bufsize, alloc, csi_dtype, ring, output)
 
     def __getitem__(self, index):
         ret = {
@@ -103,18 +132,30 @@ class Intel(_csiread.Intel):
         }
         return ret
 
-    def read(self):
+    def read(self, workers=1, resume=False):
         """Parse data if 0xbb and 0xc1 packets
 
+        Args:
+            workers (int, optional): Number of threads. If ``workers > 1``,
+                offsets of all packets are indexed first, then 0xbb packets
+                are split into ``workers`` ranges and decoded concurrently.
+                The result is the same as ``workers=1``. Default: 1
+            resume (bool, optional): Parse only the packets after
+                ``last_pos`` and append them to the packets parsed before, the
+                buffers grow if they are full. It is the same as
+                ``seek(file, last_pos, 0, append=True)``. Default: ``False``
+
         Examples:
 
             >>> csifile = "../material/5300/dataset/sample_0x1_ap.dat"
             >>> csidata = csiread.Intel(csifile)
             >>> csidata.read()
+            >>> # after more packets are written to csifile
+            >>> csidata.read(resume=True)
         """
-        super().read()
+        super().read(workers, resume)
 
-    def seek(self, file, pos, num):
+    def seek(self, file, pos, num, append=False):
         """Read packets from a specific position
 
         This method allows us to read different parts of different files
@@ -129,6 +170,9 @@ class Intel(_csiread.Intel):
                 ``example/csiseek.py``.
             num (int): Number of packets to be read. ``num <= bufsize`` must be
                 true. If ``0``, all packets after ``pos`` will be read.
+            append (bool, optional): Append the packets to the packets parsed
+                before instead of replacing them, the buffers grow if they
+                are full. Default: ``False``
 
         Examples:
 
@@ -138,7 +182,127 @@ class Intel(_csiread.Intel):
             >>>     csidata.seek(csifile, 0, i+1)
             >>>     print(csidata.csi.shape)
         """
-        super().seek(file, pos, num)
+        super().seek(file, pos, num, append)
+
+    def build_index(self, file=None, save=True):
+        """Build the index of all fields in ``file``
+
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file. Default: ``self.file``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                (field code, e.g. ``0xbb``) of each field.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'intel', save=save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` packets from the ``index``-th 0xbb packet
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first 0xbb packet.
+            num (int): Number of packets to be read. See ``seek``.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/5300/dataset/sample_0x5_64_3000.dat"
+            >>> csidata = csiread.Intel(csifile, bufsize=64)
+            >>> csidata.seek_index(1000, 64)
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'intel')[index]
+        self.seek(file, int(pos), num)
+
+    def read_packets(self, indices, file=None):
+        """Read packets ``indices``, row ``i`` is the ``indices[i]``-th packet
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered. Packets are decoded into the buffers of the
+        instance, which are reused if ``bufsize`` is large enough and grow
+        otherwise. A 0xc1 field right before a 0xbb packet is decoded into
+        the same row.
+
+        Args:
+            indices (array_like): Indices of packets, in any order, repeated
+                indices are allowed.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/5300/dataset/sample_0x5_64_3000.dat"
+            >>> csidata = csiread.Intel(csifile, bufsize=64)
+            >>> csidata.read_packets(np.random.randint(0, 3000, 64))
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'intel')
+        self.seek_many(file, offsets, rows)
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` 0xbb packets at a time
+
+        ``file`` is mapped once and walked forward once. The buffers of the
+        instance are resized to ``chunk_size`` packets and reused by every
+        chunk, so a large file is processed with constant memory. Attributes
+        are views of the buffers, copy them if they are needed after the next
+        chunk. Nothing is reported.
+
+        Args:
+            chunk_size (int): Number of packets of each chunk, the last one
+                may be shorter.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Yields:
+            Intel: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/5300/dataset/sample_0x5_64_3000.dat"
+            >>> csidata = csiread.Intel(csifile, bufsize=1)
+            >>> for chunk in csidata.iter_chunks(500):
+            >>>     print(chunk.csi.shape)
+        """
+        return super().iter_chunks(chunk_size, file)
+
+    def follow(self, chunk_size=1, file=None, interval=0.1, timeout=None):
+        """Follow ``file`` while it is being written, like ``tail -f``
+
+        The packets in ``file`` are yielded ``chunk_size`` 0xbb packets at a
+        time as ``iter_chunks`` does, then the size of ``file`` is polled
+        every ``interval`` seconds and only the packets appended are decoded.
+        A truncated packet at the end is decoded once it is complete. If
+        ``file`` shrinks, it is followed from the start again.
+
+        Args:
+            chunk_size (int): The maximum number of packets of each chunk.
+                Default: 1
+            file (str, optional): CSI data file. Default: ``self.file``
+            interval (float): Seconds between polls. Default: 0.1
+            timeout (float, optional): Stop if ``file`` doesn't grow in
+                ``timeout`` seconds. Default: ``None``, follow it forever.
+
+        Yields:
+            Intel: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csidata = csiread.Intel("csi.dat", bufsize=1)
+            >>> for chunk in csidata.follow(100, timeout=10):
+            >>>     print(chunk.csi.shape)
+        """
+        return super().follow(chunk_size, file, interval, timeout)
 
     def pmsg(self, data):
         """Parse message in real time
@@ -166,17 +330,101 @@ class Intel(_csiread.Intel):
         """
         return super().pmsg(data)
 
-    def readstp(self, endian='little'):
+    def pmsg_many(self, buffer, offsets):
+        """Parse many messages in one call
+
+        Messages ``buffer[offsets[i]:offsets[i+1]]`` are decoded into
+        consecutive rows, the buffers grow if they are too small. Attributes
+        are views of the rows parsed. In ring mode, messages are appended to
+        the ring instead and the views are left, see ``last``.
+
+        Args:
+            buffer (bytes-like): Messages received by udp socket, one after
+                another.
+            offsets (array_like): Boundaries of messages, ``len(offsets) - 1``
+                messages are parsed.
+
+        Returns:
+            tuple: ``(count, status)``. ``count`` is the number of messages
+                parsed. ``status`` is an int32 array of the status code of
+                each message, see ``pmsg``, ``0`` if it is not a CSI packet.
+
+        Examples:
+
+            >>> csidata = csiread.Intel(None)
+            >>> count, status = csidata.pmsg_many(buffer, offsets)
+            >>> print(count, (status == 0xbb).sum())
+        """
+        return super().pmsg_many(buffer, np.asarray(offsets, np.int64))
+
+    def pmsg_batch(self, messages):
+        """Parse a list of messages in one call
+
+        The messages are joined into one buffer and parsed by ``pmsg_many``.
+
+        Args:
+            messages (list): A list of bytes objects received by udp socket.
+
+        Returns:
+            tuple: ``(count, status)``, see ``pmsg_many``.
+
+        Examples:
+
+            >>> import socket
+            >>> import csiread
+            >>>
+            >>> csidata = csiread.Intel(None)
+            >>> with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            >>>     s.bind(('127.0.0.1', 10011))
+            >>>     while True:
+            >>>         messages = [s.recv(4096) for _ in range(64)]
+            >>>         count, status = csidata.pmsg_batch(messages)
+            >>>         print(csidata.csi.shape)
+        """
+        return self.pmsg_many(*_join_messages(messages))
+
+    def last(self, n):
+        """Set the views to the last ``n`` packets of the ring, oldest first
+
+        It requires ``ring=True``. The views are slices of the ring, nothing
+        is copied, and they stay valid until ``bufsize`` more packets are
+        received. 0xbb and 0xc1 packets have their own rings.
+
+        Args:
+            n (int): Number of packets, it is clipped to ``bufsize`` and the
+                count of packets received.
+
+        Returns:
+            int: The count of 0xbb packets in the views.
+
+        Examples:
+
+            >>> csidata = csiread.Intel(None, bufsize=1000, ring=True)
+            >>> # call csidata.pmsg(data) for every message received
+            >>> csidata.last(100)
+            >>> print(csidata.csi.shape)
+        """
+        return super().last(n)
+
+    def readstp(self, endian='little', unit='s', start=0, num=0):
         """Parse timestamp recorded by the modified ``log_to_file``
 
-        ``file.dat`` and ``file.datstp`` must be in the same directory.
+        ``file.dat`` and ``file.datstp`` must be in the same directory. The
+        records are read into ``stp`` at once.
 
         Args:
             endian (str): The byte order of ``file.datstp``， it can be
                 ``little`` and ``big``. Default: ``little``
+            unit (str): ``'s'`` for ``float64`` seconds, or ``'us'`` for
+                ``int64`` microseconds, which keeps the full precision.
+                Default: ``'s'``
+            start (int): Index of the first packet to be read. Default: 0
+            num (int): Number of packets to be read. If ``0``, all packets
+                after ``start`` will be read. Default: 0
 
         Returns:
-            int: Timestamp of the first packet.
+            float or int: Timestamp of the first packet, ``None`` if no
+                packet is read.
 
         Examples:
 
@@ -184,8 +432,11 @@ class Intel(_csiread.Intel):
             >>> csidata = csiread.Intel(csifile)
             >>> first_stp = csidata.readstp()
             >>> print(first_stp)
+            >>> # timestamps of the packets of ``seek_index(100, 64)``
+            >>> csidata.readstp(unit='us', start=100, num=64)
+            >>> print(csidata.stp.shape)
         """
-        return super().readstp(endian)
+        return super().readstp(endian, unit, start, num)
 
     def get_total_rss(self):
         """Calculate the Received Signal Strength[RSS] in dBm from CSI
@@ -200,11 +451,18 @@ class Intel(_csiread.Intel):
         """
         return super().get_total_rss()
 
-    def get_scaled_csi(self, inplace=False):
+    def get_scaled_csi(self, inplace=False, dtype=np.complex128, workers=1):
         """Convert CSI to channel matrix H
 
+        If ``output`` is ``'scaled'``, ``csi`` is H already and it is returned
+        as ``dtype``.
+
         Args:
-            inplace (bool): Optionally do the operation in-place. Default: False
+            inplace (bool): Optionally do the operation in-place. It works if
+                ``csi_dtype`` is ``dtype``. Default: False
+            dtype (dtype): The dtype of H, ``complex128`` or ``complex64``.
+                Default: ``np.complex128``
+            workers (int): Scale packets in ``workers`` threads. Default: 1
 
         Returns:
             ndarray: Channel matrix H
@@ -218,16 +476,23 @@ class Intel(_csiread.Intel):
             >>> print(scaled_csi.shape)
             >>> print("scaled_csi is csidata.csi: ", scaled_csi is csidata.csi)
         """
-        return super().get_scaled_csi(inplace)
+        return super().get_scaled_csi(inplace, dtype, workers)
 
-    def get_scaled_csi_sm(self, inplace=False):
+    def get_scaled_csi_sm(self, inplace=False, dtype=np.complex128,
+                          workers=1):
         """Convert CSI to pure channel matrix H
 
         This version undoes Intel's spatial mapping to return the pure MIMO
-        channel matrix H.
+        channel matrix H. It scales and undoes the spatial mapping of a
+        packet in the same pass. If ``output`` is ``'scaled_sm'``, ``csi`` is
+        the pure H already and it is returned as ``dtype``.
 
         Args:
-            inplace (bool): Optionally do the operation in-place. Default: False
+            inplace (bool): Optionally do the operation in-place. It works if
+                ``csi_dtype`` is ``dtype``. Default: False
+            dtype (dtype): The dtype of H, ``complex128`` or ``complex64``.
+                Default: ``np.complex128``
+            workers (int): Process packets in ``workers`` threads. Default: 1
 
         Returns:
             ndarray: The pure MIMO channel matrix H.
@@ -241,7 +506,7 @@ class Intel(_csiread.Intel):
             >>> print(scaled_csi.shape)
             >>> print("scaled_csi_sm is csidata.csi: ", scaled_csi_sm is csidata.csi)
         """
-        return super().get_scaled_csi_sm(inplace)
+        return super().get_scaled_csi_sm(inplace, dtype, workers)
 
     def apply_sm(self, scaled_csi):
         """Undo the input spatial mapping
@@ -311,10 +576,16 @@ class Atheros(_csiread.Atheros):
             If ``0`` and file is ``str``, all packets will be parsed. If ``0``
             and file is ``None``, this parameter is ignored by ``pmsg`` method.
             Default: 0
+        csi_dtype (dtype, optional): The dtype of ``csi``. It can be
+            ``complex128``, ``complex64`` and ``int16``. ``int16`` stores the
+            real and imaginary parts in an extra last axis of size 2.
+            Default: ``np.complex128``
 
     Attributes:
         file (str, readonly): CSI data file
         count (int, readonly): Count of CSI packets parsed
+        last_pos (int, readonly): The offset after the last packet parsed by
+            ``read`` and ``seek``, see ``read(resume=True)``
         timestamp (ndarray): The time when packet is received, expressed in μs
         csi_len (ndarray): The csi data length in the received data buffer,
             expressed in bytes
@@ -355,9 +626,9 @@ class Atheros(_csiread.Atheros):
     """
 
     def __init__(self, file, nrxnum=3, ntxnum=2, pl_size=0, tones=56,
-                 if_report=True, bufsize=0):
+                 if_report=True, bufsize=0, csi_dtype=np.complex128):
         super(Atheros, self).__init__(file, nrxnum, ntxnum, pl_size, tones,
-                                      if_report, bufsize)
+                                      if_report, bufsize, csi_dtype)
 
     def __getitem__(self, index):
         ret = {
@@ -381,12 +652,15 @@ class Atheros(_csiread.Atheros):
         }
         return ret
 
-    def read(self, endian='little'):
+    def read(self, endian='little', resume=False):
         """Parse data
 
         Args:
             endian (str): The byte order of ``file.dat``， it can be ``little``
                 and ``big``. Default: ``little``
+            resume (bool, optional): Parse only the packets after
+                ``last_pos`` and append them, see ``Intel.read``.
+                Default: ``False``
 
         Examples:
 
@@ -394,9 +668,9 @@ class Atheros(_csiread.Atheros):
             >>> csidata = csiread.Atheros(csifile)
             >>> csidata.read()
         """
-        super().read(endian)
+        super().read(endian, resume)
 
-    def seek(self, file, pos, num, endian='little'):
+    def seek(self, file, pos, num, endian='little', append=False):
         """Read packets from a specific position
 
         This method allows us to read different parts of different files
@@ -413,6 +687,8 @@ class Atheros(_csiread.Atheros):
                 true. If ``0``, all packets after ``pos`` will be read.
             endian (str): The byte order of ``file.dat``， it can be ``little``
                 and ``big``. Default: ``little``
+            append (bool, optional): Append the packets to the packets parsed
+                before, see ``Intel.seek``. Default: ``False``
 
         Examples:
 
@@ -422,7 +698,124 @@ class Atheros(_csiread.Atheros):
             >>>     csidata.seek(csifile, 0, i+1)
             >>>     print(csidata.csi.shape)
         """
-        super().seek(file, pos, num, endian)
+        super().seek(file, pos, num, endian, append)
+
+    def build_index(self, file=None, endian='little', save=True):
+        """Build the index of all packets in ``file``
+
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file. Default: ``self.file``
+            endian (str): The byte order of ``file.dat``， it can be ``little``
+                and ``big``. Default: ``little``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                of each packet.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'atheros', 0, endian, save)
+
+    def seek_index(self, index, num, endian='little', file=None):
+        """Read ``num`` packets from the ``index``-th packet
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first packet.
+            num (int): Number of packets to be read. See ``seek``.
+            endian (str): The byte order of ``file.dat``， it can be ``little``
+                and ``big``. Default: ``little``
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/atheros/dataset/ath_csi_1.dat"
+            >>> csidata = csiread.Atheros(csifile, bufsize=16)
+            >>> csidata.seek_index(100, 16)
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'atheros', 0, endian)[index]
+        self.seek(file, int(pos), num, endian)
+
+    def read_packets(self, indices, endian='little', file=None):
+        """Read packets ``indices``, row ``i`` is the ``indices[i]``-th packet
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered. Packets are decoded into the buffers of the
+        instance, which are reused if ``bufsize`` is large enough and grow
+        otherwise.
+
+        Args:
+            indices (array_like): Indices of packets, in any order, repeated
+                indices are allowed.
+            endian (str): The byte order of ``file.dat``， it can be ``little``
+                and ``big``. Default: ``little``
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/atheros/dataset/ath_csi_1.dat"
+            >>> csidata = csiread.Atheros(csifile, bufsize=16)
+            >>> csidata.read_packets([120, 3, 4, 5, 80])
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'atheros', 0,
+                                      endian)
+        self.seek_many(file, offsets, rows, endian)
+
+    def iter_chunks(self, chunk_size, endian='little', file=None):
+        """Iterate over ``file`` ``chunk_size`` packets at a time
+
+        See ``Intel.iter_chunks``.
+
+        Args:
+            chunk_size (int): Number of packets of each chunk, the last one
+                may be shorter.
+            endian (str): The byte order of ``file.dat``， it can be ``little``
+                and ``big``. Default: ``little``
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Yields:
+            Atheros: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/atheros/dataset/ath_csi_1.dat"
+            >>> csidata = csiread.Atheros(csifile, bufsize=1)
+            >>> for chunk in csidata.iter_chunks(100):
+            >>>     print(chunk.csi.shape)
+        """
+        return super().iter_chunks(chunk_size, file, endian)
+
+    def follow(self, chunk_size=1, endian='little', file=None, interval=0.1,
+               timeout=None):
+        """Follow ``file`` while it is being written, like ``tail -f``
+
+        See ``Intel.follow``.
+
+        Args:
+            chunk_size (int): The maximum number of packets of each chunk.
+                Default: 1
+            endian (str): The byte order of ``file.dat``， it can be ``little``
+                and ``big``. Default: ``little``
+            file (str, optional): CSI data file. Default: ``self.file``
+            interval (float): Seconds between polls. Default: 0.1
+            timeout (float, optional): Stop if ``file`` doesn't grow in
+                ``timeout`` seconds. Default: ``None``, follow it forever.
+
+        Yields:
+            Atheros: The instance itself, with the packets of the chunk.
+        """
+        return super().follow(chunk_size, file, endian, 0, interval, timeout)
 
     def pmsg(self, data, endian='little'):
         """Parse message in real time
@@ -453,14 +846,21 @@ class Atheros(_csiread.Atheros):
         """
         return super().pmsg(data, endian)
 
-    def readstp(self, endian='little'):
+    def readstp(self, endian='little', unit='s', start=0, num=0):
         """Parse timestamp recorded by the modified ``recv_csi``
 
-        ``file.dat`` and ``file.datstp`` must be in the same directory.
+        ``file.dat`` and ``file.datstp`` must be in the same directory. The
+        records are read into ``stp`` at once.
 
         Args:
             endian (str): The byte order of ``file.datstp``， it can be
                 ``little`` and ``big``. Default: ``little``
+            unit (str): ``'s'`` for ``float64`` seconds, or ``'us'`` for
+                ``int64`` microseconds, which keeps the full precision.
+                Default: ``'s'``
+            start (int): Index of the first packet to be read. Default: 0
+            num (int): Number of packets to be read. If ``0``, all packets
+                after ``start`` will be read. Default: 0
 
         Examples:
 
@@ -469,7 +869,7 @@ class Atheros(_csiread.Atheros):
             >>> first_stp = csidata.readstp()
             >>> print(first_stp)
         """
-        return super().readstp(endian)
+        return super().readstp(endian, unit, start, num)
 
     def display(self, index):
         """Print the formatted representation of ``index`` packet"""
@@ -507,16 +907,35 @@ class Nexmon(_csiread.Nexmon):
             methods is allowed. If ``None``, ``seek`` and ``pmsg`` methods are
             allowed.
         chip (str): WiFi Chip, it can be '4339', '43455c0', '4358' and '4366c0'.
-        bw (int): bandwidth, it can be 20, 40 and 80.
+        bw (int): bandwidth, it can be 20, 40, 80 and 160.
         if_report (bool, optional): Report the parsed result. Default: `True`
         bufsize (int, optional): The maximum amount of packets to be parsed. If
             ``0`` and file is ``str``, all packets will be parsed. If ``0`` and
             file is ``None``, this parameter is ignored by `pmsg` method.
             Default: 0
+        csi_dtype (dtype, optional): The dtype of ``csi``. It can be
+            ``complex128`` and ``complex64``, and also ``int16`` for chip
+            ``'4339'`` and ``'43455c0'``. ``int16`` stores the real and
+            imaginary parts in an extra last axis of size 2.
+            Default: ``np.complex128``
+        ring (bool, optional): Ring mode for ``pmsg``. Packets are appended
+            to a ring of ``bufsize`` slots instead of overwriting row 0, and
+            ``last(n)`` sets the views to the latest ones. ``bufsize`` must
+            be positive. Default: ``False``
+        alloc (str, optional): How to allocate buffers when ``bufsize`` is
+            ``0`` and file is ``str``. It can be ``'exact'`` and ``'grow'``.
+            ``'exact'`` walks the record headers of the file once and
+            allocates exactly the count of nexmon packets. ``'grow'`` reads
+            the file in a single pass, it allocates ``filesize`` divided by
+            the size of a record with the whole CSI and doubles buffers when
+            they are full. Default: ``'grow'``
 
     Attributes:
         file (str, readonly): CSI data file
         count (int, readonly): Count of csi packets parsed
+        last_pos (int, readonly): The offset after the last packet parsed by
+            ``read`` and ``seek``, see ``read(resume=True)``
+        head (int, readonly): Count of packets received in ring mode
         chip (str, readonly): Chip type we set
         bw (int, readonly): Bandwidth we set
         nano (bool, readonly): nanosecond-resolution or not
@@ -550,8 +969,10 @@ class Nexmon(_csiread.Nexmon):
         2. `rdpcap <https://github.com/secdev/scapy/blob/master/scapy/utils.py>`_
         3. `Libpcap File Format <https://wiki.wireshark.org/Development/LibpcapFileFormat>`_
     """
-    def __init__(self, file, chip, bw, if_report=True, bufsize=0):
-        super(Nexmon, self).__init__(file, chip, bw, if_report, bufsize)
+    def __init__(self, file, chip, bw, if_report=True, bufsize=0,
+                 csi_dtype=np.complex128, ring=False, alloc='grow'):
+        super(Nexmon, self).__init__(file, chip, bw, if_report, bufsize,
+                                     csi_dtype, ring, alloc)
 
     def __getitem__(self, index):
         ret = {
@@ -566,9 +987,14 @@ class Nexmon(_csiread.Nexmon):
         }
         return ret
 
-    def read(self):
+    def read(self, resume=False):
         """Parse data
 
+        Args:
+            resume (bool, optional): Parse only the packets after
+                ``last_pos`` and append them, see ``Intel.read``.
+                Default: ``False``
+
         Examples:
 
             >>> csifile = "../material/nexmon/dataset/example.pcap"
@@ -576,9 +1002,9 @@ class Nexmon(_csiread.Nexmon):
             >>> csidata.read()
             >>> print(csidata.csi.shape)
         """
-        super().read()
+        super().read(resume)
 
-    def seek(self, file, pos, num):
+    def seek(self, file, pos, num, append=False):
         """Read packets from specific position
 
         This method allows us to read different parts of different files
@@ -593,6 +1019,8 @@ class Nexmon(_csiread.Nexmon):
                 ``example/csiseek.py``.
             num (int): Number of packets to be read. ``num <= bufsize`` must be
                 true. If ``0``, all packets after ``pos`` will be read.
+            append (bool, optional): Append the packets to the packets parsed
+                before, see ``Intel.seek``. Default: ``False``
 
         Examples:
 
@@ -602,7 +1030,112 @@ class Nexmon(_csiread.Nexmon):
             >>>     csidata.seek(csifile, 0, i+1)
             >>>     print(csidata.csi.shape)
         """
-        super().seek(file, pos, num)
+        super().seek(file, pos, num, append)
+
+    def build_index(self, file=None, save=True):
+        """Build the index of all packets in ``file``
+
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                (``1`` for nexmon_csi packets) of each pcap record.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'nexmon', 24, save=save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` packets from the ``index``-th packet
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first packet.
+            num (int): Number of packets to be read. See ``seek``.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.Nexmon(csifile, chip='4358', bw=80)
+            >>> csidata.seek_index(2, 2)
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'nexmon', 24)[index]
+        self.seek(file, int(pos), num)
+
+    def read_packets(self, indices, file=None):
+        """Read packets ``indices``, row ``i`` is the ``indices[i]``-th packet
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered. Packets are decoded into the buffers of the
+        instance, which are reused if ``bufsize`` is large enough and grow
+        otherwise.
+
+        Args:
+            indices (array_like): Indices of packets, in any order, repeated
+                indices are allowed.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.Nexmon(csifile, chip='4358', bw=80)
+            >>> csidata.read_packets([3, 0])
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'nexmon', 24)
+        self.seek_many(file, offsets, rows)
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` packets at a time
+
+        See ``Intel.iter_chunks``.
+
+        Args:
+            chunk_size (int): Number of packets of each chunk, the last one
+                may be shorter.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Yields:
+            Nexmon: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.Nexmon(csifile, chip='4358', bw=80, bufsize=1)
+            >>> for chunk in csidata.iter_chunks(2):
+            >>>     print(chunk.csi.shape)
+        """
+        return super().iter_chunks(chunk_size, file)
+
+    def follow(self, chunk_size=1, file=None, interval=0.1, timeout=None):
+        """Follow ``file`` while it is being written, like ``tail -f``
+
+        See ``Intel.follow``, the pcap header is parsed once ``file`` has it.
+
+        Args:
+            chunk_size (int): The maximum number of packets of each chunk.
+                Default: 1
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+            interval (float): Seconds between polls. Default: 0.1
+            timeout (float, optional): Stop if ``file`` doesn't grow in
+                ``timeout`` seconds. Default: ``None``, follow it forever.
+
+        Yields:
+            Nexmon: The instance itself, with the packets of the chunk.
+        """
+        return super().follow(chunk_size, file, interval, timeout)
 
     def pmsg(self, data, endian='little'):
         """Parse message in real time
@@ -632,6 +1165,83 @@ class Nexmon(_csiread.Nexmon):
         """
         return super().pmsg(data, endian)
 
+    def pmsg_many(self, buffer, offsets):
+        """Parse many messages in one call
+
+        Messages ``buffer[offsets[i]:offsets[i+1]]`` are decoded into
+        consecutive rows, the buffers grow if they are too small. Attributes
+        are views of the rows parsed. In ring mode, messages are appended to
+        the ring instead and the views are left, see ``last``.
+
+        Args:
+            buffer (bytes-like): Messages received by udp socket, one after
+                another.
+            offsets (array_like): Boundaries of messages, ``len(offsets) - 1``
+                messages are parsed.
+
+        Returns:
+            tuple: ``(count, status)``. ``count`` is the number of messages
+                parsed. ``status`` is an int32 array of the status code of
+                each message, see ``pmsg``, ``0`` if it is not a CSI packet.
+
+        Examples:
+
+            >>> csidata = csiread.Nexmon(None, chip='4358', bw=80)
+            >>> count, status = csidata.pmsg_many(buffer, offsets)
+            >>> print(count, (status == 0xf100).sum())
+        """
+        return super().pmsg_many(buffer, np.asarray(offsets, np.int64))
+
+    def pmsg_batch(self, messages):
+        """Parse a list of messages in one call
+
+        The messages are joined into one buffer and parsed by ``pmsg_many``.
+
+        Args:
+            messages (list): A list of bytes objects received by udp socket.
+
+        Returns:
+            tuple: ``(count, status)``, see ``pmsg_many``.
+
+        Examples:
+
+            >>> import socket
+            >>> import csiread
+            >>>
+            >>> csidata = csiread.Nexmon(None, chip='4358', bw=80)
+            >>> with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            >>>     s.bind(('127.0.0.1', 10011))
+            >>>     while True:
+            >>>         messages = [s.recv(4096) for _ in range(64)]
+            >>>         count, status = csidata.pmsg_batch(messages)
+            >>>         print(csidata.csi.shape)
+        """
+        return self.pmsg_many(*_join_messages(messages))
+
+    def last(self, n):
+        """Set the views to the last ``n`` packets of the ring, oldest first
+
+        It requires ``ring=True``. The views are slices of the ring, nothing
+        is copied, and they stay valid until ``bufsize`` more packets are
+        received.
+
+        Args:
+            n (int): Number of packets, it is clipped to ``bufsize`` and the
+                count of packets received.
+
+        Returns:
+            int: The count of packets in the views.
+
+        Examples:
+
+            >>> csidata = csiread.Nexmon(None, '4358', 80, bufsize=1000,
+            >>>                          ring=True)
+            >>> # call csidata.pmsg(data) for every message received
+            >>> csidata.last(100)
+            >>> print(csidata.csi.shape)
+        """
+        return super().last(n)
+
     def group(self, c_num=4, s_num=4):
         """Build spatial stream index (experimental)
 
@@ -691,18 +1301,75 @@ class AtherosPull10(Atheros):
     References:
         1. `Atheros-CSI-Tool-UserSpace-APP pull 10 <https://github.com/xieyaxiongfly/Atheros-CSI-Tool-UserSpace-APP/pull/10>`_
     """
-    def read(self):
+    def read(self, resume=False):
         """Parse data
 
+        Args:
+            resume (bool, optional): Parse only the packets after
+                ``last_pos`` and append them, see ``Intel.read``.
+                Default: ``False``
+
         Examples:
 
             >>> csifile = "../material/atheros/dataset/ath_csi_1.dat"
             >>> csidata = csiread.Atheros(csifile)
             >>> csidata.read()
         """
-        with open(self.file, 'rb') as f:
-            endian = 'big' if f.read(1) == b'\xff' else 'little'
-        self.seek(self.file, 1, 0, endian)
+        pos = max(self.last_pos, 1) if resume else 1
+        self.seek(self.file, pos, 0, _pull10_endian(self.file), resume)
+
+    def build_index(self, file=None, save=True):
+        """Build the index of all packets in ``file``
+
+        See ``Atheros.build_index``, the byte order is detected from the
+        first byte of ``file``.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'atheros', 1, _pull10_endian(file), save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` packets from the ``index``-th packet
+
+        See ``Atheros.seek_index``, the byte order is detected from the
+        first byte of ``file``.
+        """
+        file = self.file if file is None else file
+        endian = _pull10_endian(file)
+        pos = _packet_offsets(self, file, 'atheros', 1, endian)[index]
+        self.seek(file, int(pos), num, endian)
+
+    def read_packets(self, indices, file=None):
+        """Read packets ``indices``
+
+        See ``Atheros.read_packets``, the byte order is detected from the
+        first byte of ``file``.
+        """
+        file = self.file if file is None else file
+        endian = _pull10_endian(file)
+        offsets, rows = _packet_order(self, file, indices, 'atheros', 1,
+                                      endian)
+        self.seek_many(file, offsets, rows, endian)
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` packets at a time
+
+        See ``Atheros.iter_chunks``, the byte order is detected from the
+        first byte of ``file``.
+        """
+        file = self.file if file is None else file
+        return _csiread.Atheros.iter_chunks(self, chunk_size, file,
+                                            _pull10_endian(file), 1)
+
+    def follow(self, chunk_size=1, file=None, interval=0.1, timeout=None):
+        """Follow ``file`` while it is being written, like ``tail -f``
+
+        See ``Atheros.follow``, the byte order is detected from the first
+        byte of ``file``.
+        """
+        file = self.file if file is None else file
+        return _csiread.Atheros.follow(self, chunk_size, file,
+                                       _pull10_endian(file), 1, interval,
+                                       timeout)
 
 
 class NexmonPull46(_csiread.NexmonPull46):
@@ -722,10 +1389,117 @@ class NexmonPull46(_csiread.NexmonPull46):
         1. `nexmon_csi pull 46 <https://github.com/seemoo-lab/nexmon_csi/pull/46>`_
         2. `nexmon_csi pull 256 <https://github.com/seemoo-lab/nexmon_csi/pull/256>`_
     """
-    def __init__(self, file, chip, bw, if_report=True, bufsize=0):
-        super(NexmonPull46, self).__init__(file, chip, bw, if_report, bufsize)
+    def __init__(self, file, chip, bw, if_report=True, bufsize=0,
+                 csi_dtype=np.complex128, ring=False, alloc='grow'):
+        super(NexmonPull46, self).__init__(file, chip, bw, if_report, bufsize,
+                                           csi_dtype, ring, alloc)
         self._autoscale = 0     # Undetermined
 
+    def build_index(self, file=None, save=True):
+        """Build the index of all packets in ``file``
+
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                (``1`` for nexmon_csi packets) of each pcap record.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'nexmon', 24, save=save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` packets from the ``index``-th packet
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first packet.
+            num (int): Number of packets to be read. See ``seek``.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.NexmonPull46(csifile, chip='4358', bw=80)
+            >>> csidata.seek_index(2, 2)
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'nexmon', 24)[index]
+        self.seek(file, int(pos), num)
+
+    def read_packets(self, indices, file=None):
+        """Read packets ``indices``, row ``i`` is the ``indices[i]``-th packet
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered. Packets are decoded into the buffers of the
+        instance, which are reused if ``bufsize`` is large enough and grow
+        otherwise.
+
+        Args:
+            indices (array_like): Indices of packets, in any order, repeated
+                indices are allowed.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.NexmonPull46(csifile, chip='4358', bw=80)
+            >>> csidata.read_packets([3, 0])
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'nexmon', 24)
+        self.seek_many(file, offsets, rows)
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` packets at a time
+
+        See ``Intel.iter_chunks``.
+
+        Args:
+            chunk_size (int): Number of packets of each chunk, the last one
+                may be shorter.
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+
+        Yields:
+            NexmonPull46: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/nexmon/dataset/example.pcap"
+            >>> csidata = csiread.NexmonPull46(csifile, chip='4358', bw=80, bufsize=1)
+            >>> for chunk in csidata.iter_chunks(2):
+            >>>     print(chunk.csi.shape)
+        """
+        return super().iter_chunks(chunk_size, file)
+
+    def follow(self, chunk_size=1, file=None, interval=0.1, timeout=None):
+        """Follow ``file`` while it is being written, like ``tail -f``
+
+        See ``Intel.follow``, the pcap header is parsed once ``file`` has it.
+
+        Args:
+            chunk_size (int): The maximum number of packets of each chunk.
+                Default: 1
+            file (str, optional): CSI data file ``.pcap``. Default: ``self.file``
+            interval (float): Seconds between polls. Default: 0.1
+            timeout (float, optional): Stop if ``file`` doesn't grow in
+                ``timeout`` seconds. Default: ``None``, follow it forever.
+
+        Yields:
+            NexmonPull46: The instance itself, with the packets of the chunk.
+        """
+        return super().follow(chunk_size, file, interval, timeout)
+
     def __getitem__(self, index):
         ret = {
             "magic": self.magic[index],
@@ -755,6 +1529,27 @@ class NexmonPull46(_csiread.NexmonPull46):
         """
         return super().pmsg(data, endian)
 
+    def pmsg_many(self, buffer, offsets):
+        """Parse many messages in one call
+
+        See ``Nexmon.pmsg_many``, the status code is ``0xf101``.
+        """
+        return super().pmsg_many(buffer, np.asarray(offsets, np.int64))
+
+    def pmsg_batch(self, messages):
+        """Parse a list of messages in one call
+
+        See ``Nexmon.pmsg_batch``.
+        """
+        return self.pmsg_many(*_join_messages(messages))
+
+    def last(self, n):
+        """Set the views to the last ``n`` packets of the ring, oldest first
+
+        See ``Nexmon.last``.
+        """
+        return super().last(n)
+
     def group(self, c_num=4, s_num=4):
         """Build spatial stream index (experimental)
 
@@ -794,7 +1589,8 @@ NexmonPull256 = NexmonPull46
 class ESP32:
     """Parse CSI obtained using 'ESP32-CSI-Tool'.(experimental)
 
-    For better flexibility, please consider ``pandas.read_csv``
+    For better flexibility, please consider ``pandas.read_csv``. Lines other
+    than ``CSI_DATA`` are skipped.
 
     Args:
         file (str or None): CSI data file ``.csv``. If ``str``, ``read``
@@ -804,10 +1600,14 @@ class ESP32:
         csi_only (bool, optional): Only parse csi and ignore the others.
             Default: `False`.
         maxlen (int, optional): The max length of csi_data filed. Designed for
-            the issue #12 of ESP32-CSI-Tool. Default: `128`.
+            the issue #12 of ESP32-CSI-Tool. If it is not `128`, shorter
+            csi_data are padded with zeros to `maxlen`, otherwise all of them
+            must have the length of the first one. Default: `128`.
 
     Attributes:
-        pass
+        count (int): Count of packets parsed
+        last_pos (int): The offset after the last line parsed by ``read`` and
+            ``seek``, see ``read(resume=True)``
 
     References:
         1. `ESP32-CSI-Tool <https://github.com/StevenMHernandez/ESP32-CSI-Tool>`_
@@ -832,14 +1632,20 @@ class ESP32:
         self.dt_csi = [k for k, v in self.dt.items() if v is list]
         for k in self.dt.keys():
             self.__setattr__(k, None)
+        self.count = 0
+        self.last_pos = 0
 
     def __getitem__(self, index):
         ret = {k: self.__getattribute__(k)[index] for k in self.dt.keys()}
         return ret
 
-    def read(self):
+    def read(self, resume=False):
         """Parse data
 
+        Args:
+            resume (bool, optional): Parse only the lines after ``last_pos``
+                and append them, see ``Intel.read``. Default: ``False``
+
         Examples:
 
             >>> csifile = "../material/esp32/dataset/example_csi.csv"
@@ -847,11 +1653,14 @@ class ESP32:
             >>> csidata.read()
             >>> print(csidata.csi.shape)
         """
-        self.seek(self.file, 0, 0)
+        if resume:
+            self.seek(self.file, self.last_pos, 0, True)
+        else:
+            self.seek(self.file, 0, 0)
         if self.if_report:
             print("%d packets parsed" % self.count)
 
-    def seek(self, file, pos, num):
+    def seek(self, file, pos, num, append=False):
         """Read packets from specific position
 
         This method allows us to read different parts of different files
@@ -866,6 +1675,8 @@ class ESP32:
                 ``example/csiseek.py``.
             num (int): Number of packets to be read. If ``0``, all packets
                 after ``pos`` will be read.
+            append (bool, optional): Append the packets to the packets parsed
+                before, see ``Intel.seek``. Default: ``False``
 
         Examples:
 
@@ -875,40 +1686,114 @@ class ESP32:
             >>>     csidata.seek(csifile, 0, i+1)
             >>>     print(csidata.csi.shape)
         """
-        if num == 0:
-            num = np.iinfo(np.int64).max
-        count = 0
-        str_data = [[], [], []]
-        int_data, flo_data, csi_data = [], [], []
+        ret = _csiread.parse_esp32(file, pos, num, self.csi_only, self.maxlen)
+        self.last_pos = ret[1]
+        self.__parse(ret, append)
 
-        with open(file) as f:
-            f.seek(pos, os.SEEK_CUR)
-            for line in f:
-                if count >= num:
-                    break
+    def build_index(self, file=None, save=True):
+        """Build the index of all lines in ``file``
 
-                if self.csi_only:
-                    line = line.split(',[')
-                else:
-                    line = line.split(',')
-                    line[23], line[24] = line[24], line[23]
-                    str_data[0].append(line[0])
-                    str_data[1].append(line[1])
-                    str_data[2].append(line[2])
-                    int_data.append(' '.join(line[3:24]))
-                    flo_data.append(line[24])
-
-                line_csi = line[-1][:-2].lstrip('[')
-                csi_data.append(line_csi)
-                if self.maxlen != 128:
-                    ph_num = self.maxlen - line_csi.count(' ')
-                    csi_data.append(ph_num * ' 0')
-                count += 1
-
-        int_data = ' '.join(int_data)
-        flo_data = ' '.join(flo_data)
-        csi_data = ' '.join(csi_data)
-        self.__parse(str_data, int_data, flo_data, csi_data, count)
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file ``.csv``. Default: ``self.file``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                (``1`` for ``CSI_DATA`` lines) of each line.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'esp32', save=save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` packets from the ``index``-th packet
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first packet.
+            num (int): Number of packets to be read. See ``seek``.
+            file (str, optional): CSI data file ``.csv``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/esp32/dataset/example_csi.csv"
+            >>> csidata = csiread.ESP32(csifile)
+            >>> csidata.seek_index(4, 2)
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'esp32')[index]
+        self.seek(file, int(pos), num)
+
+    def read_packets(self, indices, file=None):
+        """Read packets ``indices``, row ``i`` is the ``indices[i]``-th packet
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered.
+
+        Args:
+            indices (array_like): Indices of packets, in any order, repeated
+                indices are allowed.
+            file (str, optional): CSI data file ``.csv``. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/esp32/dataset/example_csi.csv"
+            >>> csidata = csiread.ESP32(csifile)
+            >>> csidata.read_packets([6, 1, 2])
+            >>> print(csidata.csi.shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'esp32')
+        lines = [None] * len(rows)
+        with open(file, 'rb') as f:
+            for pos, row in zip(offsets.tolist(), rows.tolist()):
+                f.seek(pos)
+                lines[row] = f.readline().rstrip(b'\n') + b'\n'
+        self.__parse(_csiread.parse_esp32(b''.join(lines), 0, 0,
+                                          self.csi_only, self.maxlen))
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` packets at a time
+
+        ``file`` is opened once and read forward once, so a large file is
+        processed with constant memory. The attributes are replaced by every
+        chunk. Nothing is reported.
+
+        Args:
+            chunk_size (int): Number of packets of each chunk, the last one
+                may be shorter.
+            file (str, optional): CSI data file ``.csv``. Default: ``self.file``
+
+        Yields:
+            ESP32: The instance itself, with the packets of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/esp32/dataset/example_csi.csv"
+            >>> csidata = csiread.ESP32(csifile)
+            >>> for chunk in csidata.iter_chunks(4):
+            >>>     print(chunk.csi.shape)
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        file = self.file if file is None else file
+        mf = _csiread.MappedFile(file)
+        pos = 0
+        while True:
+            ret = _csiread.parse_esp32(mf, pos, chunk_size, self.csi_only,
+                                       self.maxlen)
+            if ret[0] == 0:
+                break
+            pos = ret[1]
+            self.__parse(ret)
+            yield self
 
     def pmsg(self, data):
         """Parse message in real time
@@ -933,34 +1818,32 @@ class ESP32:
             >>>         print(csidata.csi.shape)
         """
         if data.startswith('CSI_DATA'):
-            if self.csi_only:
-                line = data.split(',[')
-            else:
-                line = data.split(',')
-                str_data = [[li] for li in line[:3]]
-                int_data = ' '.join(line[3:23] + line[24:25])
-                flo_data = ' '.join(line[23:24])
-            csi_data = line[-1][:-2].lstrip('[')
-            if self.maxlen != 128:
-                ph_num = self.maxlen - csi_data.count(' ')
-                csi_data = csi_data + ph_num * ' 0'
-            self.__parse(str_data, int_data, flo_data, csi_data, 1)
+            self.__parse(_csiread.parse_esp32((data + '\n').encode(), 0, 1,
+                                              self.csi_only, self.maxlen))
             return 0xf200
 
-    def __parse(self, str_data, int_data, flo_data, csi_data, count):
-        str_array = str_data
-        int_array = np.fromstring(int_data, int, sep=' ').reshape(count, -1)
-        flo_array = np.fromstring(flo_data, float, sep=' ').reshape(count, -1)
-        csi_array = np.fromstring(csi_data, int, sep=' ').reshape(count, -1)
+    def __parse(self, ret, append=False):
+        """Set the attributes to the result of ``parse_esp32``"""
+        count, _, str_data, int_data, flo_data, csi_data = ret
 
+        values = {}
         for idx, k in enumerate(self.dt_str):
-            self.__setattr__(k, str_array[idx])
+            values[k] = str_data[idx]
         for idx, k in enumerate(self.dt_int):
-            self.__setattr__(k, int_array[:, idx])
-        for idx, k in enumerate(self.dt_flo):
-            self.__setattr__(k, flo_array[:, idx])
-        for idx, k in enumerate(self.dt_csi):
-            self.__setattr__(k, csi_array[:, 1::2] + csi_array[:, ::2] * 1.j)
+            values[k] = int_data[:, idx]
+        for k in self.dt_flo:
+            values[k] = flo_data
+        for k in self.dt_csi:
+            values[k] = csi_data
+
+        if append and self.count:
+            for k, v in values.items():
+                old = self.__getattribute__(k)
+                values[k] = old + v if self.dt[k] is str else \
+                    np.concatenate([old, v])
+            count += self.count
+        for k, v in values.items():
+            self.__setattr__(k, v)
         self.count = count
 
     def display(self, index):
@@ -1019,10 +1902,20 @@ class Picoscenes(_picoscenes.Picoscenes):
             ``0`` and file is ``str``, all frames will be parsed. If ``0`` and
             file is ``None``, this parameter is ignored by `pmsg` method.
             Default: 0
+        csi_dtype (dtype, optional): The dtype of ``raw["CSI"]["CSI"]``,
+            ``raw["PilotCSI"]["CSI"]`` and ``raw["LegacyCSI"]["CSI"]``. It can
+            be ``complex128`` and ``complex64``. Default: ``np.complex128``
+        ring (bool, optional): Ring mode for ``pmsg``. Frames are appended to
+            a ring of ``bufsize`` slots instead of overwriting row 0, and
+            ``last(n)`` sets ``raw`` to the latest ones. ``bufsize`` must be
+            positive. Default: ``False``
 
     Attributes:
         file (str, readonly): CSI data file
         count (int, readonly): Count of csi frames parsed
+        last_pos (int, readonly): The offset after the last frame parsed by
+            ``read`` and ``seek``, see ``read(resume=True)``
+        head (int, readonly): Count of frames received in ring mode
         pl_size (dict): A dictionary which initializes the dtype of ``raw``
         raw (ndarray): structured array which stores the parsed result, See
             ``PicoScenes documentation: PicoScenes MATLAB Toolbox`` for more
@@ -1062,10 +1955,13 @@ class Picoscenes(_picoscenes.Picoscenes):
         on arxiv.
         2. `PicoScenes documentation <https://ps.zpj.io>`_
     """
-    def __init__(self, file, pl_size=None, if_report=True, bufsize=0):
+    def __init__(self, file, pl_size=None, if_report=True, bufsize=0,
+                 csi_dtype=np.complex128, ring=False):
+        if np.dtype(csi_dtype).name not in ('complex128', 'complex64'):
+            raise ValueError("csi_dtype can only take complex128, complex64!\n")
         self.pl_size = self.__init_pl_size(pl_size)
-        dtype = init_dtype_picoscenes(self.pl_size)
-        super(Picoscenes, self).__init__(file, dtype, if_report, bufsize)
+        dtype = init_dtype_picoscenes(self.pl_size, csi_dtype)
+        super(Picoscenes, self).__init__(file, dtype, if_report, bufsize, ring)
 
     def __getitem__(self, index):
         return self.raw[index]
@@ -1102,9 +1998,13 @@ class Picoscenes(_picoscenes.Picoscenes):
         for name in self.raw.dtype.names:
             self.__setattr__(name, self.raw[name].view(np.recarray))
 
-    def read(self):
+    def read(self, resume=False):
         """Parse data
 
+        Args:
+            resume (bool, optional): Parse only the frames after ``last_pos``
+                and append them, see ``Intel.read``. Default: ``False``
+
         Examples:
 
             >>> csifile = "../material/picoscenes/dataset/rx_by_iwl5300.csi"
@@ -1113,10 +2013,10 @@ class Picoscenes(_picoscenes.Picoscenes):
             >>> print(csidata.raw[10]["CSI"].dtype.names)
 
         """
-        super().read()
+        super().read(resume)
         self._merge()
 
-    def seek(self, file, pos, num):
+    def seek(self, file, pos, num, append=False):
         """Read frames from a specific position
 
         This method allows us to read different parts of different files
@@ -1131,6 +2031,8 @@ class Picoscenes(_picoscenes.Picoscenes):
                 ``example/csiseek.py``.
             num (int): Number of frames to be read. If ``0``, all frames
                 after ``pos`` will be read.
+            append (bool, optional): Append the frames to the frames parsed
+                before, see ``Intel.seek``. Default: ``False``
 
         Examples:
 
@@ -1140,7 +2042,98 @@ class Picoscenes(_picoscenes.Picoscenes):
             >>>     csidata.seek(csifile, 0, i+1)
             >>>     print(csidata.raw["CSI"]["CSI"].shape)
         """
-        super().seek(file, pos, num)
+        super().seek(file, pos, num, append)
+
+    def build_index(self, file=None, save=True):
+        """Build the index of all frames in ``file``
+
+        The index is saved as ``file + '.idx'`` and reused until the size or
+        the modification time of ``file`` changes.
+
+        Args:
+            file (str, optional): CSI data file. Default: ``self.file``
+            save (bool, optional): Save the index as a sidecar file.
+                Default: ``True``
+
+        Returns:
+            ndarray: Structured array with ``offset``, ``length`` and ``type``
+                of each frame.
+        """
+        file = self.file if file is None else file
+        return _load_index(file, 'picoscenes', save=save)
+
+    def seek_index(self, index, num, file=None):
+        """Read ``num`` frames from the ``index``-th frame
+
+        Offsets are looked up in the index built by ``build_index``, so random
+        access doesn't rescan the file.
+
+        Args:
+            index (int): Index of the first frame.
+            num (int): Number of frames to be read. See ``seek``.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/picoscenes/dataset/rx_by_iwl5300.csi"
+            >>> csidata = csiread.Picoscenes(csifile, {"CSI": (30, 3, 2)})
+            >>> csidata.seek_index(100, 10)
+            >>> print(csidata.raw["CSI"]["CSI"].shape)
+        """
+        file = self.file if file is None else file
+        pos = _packet_offsets(self, file, 'picoscenes')[index]
+        self.seek(file, int(pos), num)
+
+    def read_packets(self, indices, file=None):
+        """Read frames ``indices``, row ``i`` is the ``indices[i]``-th frame
+
+        Offsets are looked up in the index built by ``build_index`` and
+        sorted, so ``file`` is opened once and walked forward once, however
+        ``indices`` are ordered. Frames are decoded into the buffers of the
+        instance, which are reused if ``bufsize`` is large enough and grow
+        otherwise.
+
+        Args:
+            indices (array_like): Indices of frames, in any order, repeated
+                indices are allowed.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Examples:
+
+            >>> csifile = "../material/picoscenes/dataset/rx_by_iwl5300.csi"
+            >>> csidata = csiread.Picoscenes(csifile, {"CSI": (30, 3, 2)})
+            >>> csidata.read_packets([100, 7, 8, 9])
+            >>> print(csidata.raw["CSI"]["CSI"].shape)
+        """
+        file = self.file if file is None else file
+        offsets, rows = _packet_order(self, file, indices, 'picoscenes')
+        self.seek_many(file, offsets, rows)
+
+    def iter_chunks(self, chunk_size, file=None):
+        """Iterate over ``file`` ``chunk_size`` frames at a time
+
+        ``file`` is opened once and read forward once. ``raw`` is resized to
+        ``chunk_size`` frames and reused by every chunk, so a large file is
+        processed with constant memory. ``raw`` is a view of the buffer, copy
+        it if it is needed after the next chunk. Dynamic attributes are not
+        set. Nothing is reported.
+
+        Args:
+            chunk_size (int): Number of frames of each chunk, the last one
+                may be shorter.
+            file (str, optional): CSI data file. Default: ``self.file``
+
+        Yields:
+            Picoscenes: The instance itself, with the frames of the chunk.
+
+        Examples:
+
+            >>> csifile = "../material/picoscenes/dataset/rx_by_iwl5300.csi"
+            >>> csidata = csiread.Picoscenes(csifile, {"CSI": (30, 3, 2)})
+            >>> for chunk in csidata.iter_chunks(100):
+            >>>     print(chunk.raw["CSI"]["CSI"].shape)
+        """
+        return super().iter_chunks(chunk_size, file)
 
     def pmsg(self, data):
         """Parse message in real time (This method hasn't been READY)
@@ -1168,6 +2161,84 @@ class Picoscenes(_picoscenes.Picoscenes):
         """
         return super().pmsg(data)
 
+    def pmsg_many(self, buffer, offsets):
+        """Parse many messages in one call
+
+        Messages ``buffer[offsets[i]:offsets[i+1]]`` are decoded into
+        consecutive rows, the buffers grow if they are too small. Attributes
+        are views of the rows parsed. In ring mode, messages are appended to
+        the ring instead and the views are left, see ``last``.
+
+        Args:
+            buffer (bytes-like): Messages received by udp socket, one after
+                another.
+            offsets (array_like): Boundaries of messages, ``len(offsets) - 1``
+                messages are parsed.
+
+        Returns:
+            tuple: ``(count, status)``. ``count`` is the number of messages
+                parsed. ``status`` is an int32 array of the status code of
+                each message, see ``pmsg``, ``0`` if it is not a PicoScenes
+                frame.
+
+        Examples:
+
+            >>> csidata = csiread.Picoscenes(None, {'CSI': [30, 3, 3]})
+            >>> count, status = csidata.pmsg_many(buffer, offsets)
+            >>> print(count, (status == 0xf300).sum())
+        """
+        return super().pmsg_many(buffer, np.asarray(offsets, np.int64))
+
+    def pmsg_batch(self, messages):
+        """Parse a list of messages in one call
+
+        The messages are joined into one buffer and parsed by ``pmsg_many``.
+
+        Args:
+            messages (list): A list of bytes objects received by udp socket.
+
+        Returns:
+            tuple: ``(count, status)``, see ``pmsg_many``.
+
+        Examples:
+
+            >>> import socket
+            >>> import csiread
+            >>>
+            >>> csidata = csiread.Picoscenes(None, {'CSI': [30, 3, 3]})
+            >>> with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            >>>     s.bind(('127.0.0.1', 10011))
+            >>>     while True:
+            >>>         messages = [s.recv(4096) for _ in range(64)]
+            >>>         count, status = csidata.pmsg_batch(messages)
+            >>>         print(csidata.raw["CSI"]["CSI"].shape)
+        """
+        return self.pmsg_many(*_join_messages(messages))
+
+    def last(self, n):
+        """Set ``raw`` to the last ``n`` frames of the ring, oldest first
+
+        It requires ``ring=True``. ``raw`` is a slice of the ring, nothing is
+        copied, and it stays valid until ``bufsize`` more frames are
+        received. Dynamic attributes are not set.
+
+        Args:
+            n (int): Number of frames, it is clipped to ``bufsize`` and the
+                count of frames received.
+
+        Returns:
+            int: The count of frames in ``raw``.
+
+        Examples:
+
+            >>> csidata = csiread.Picoscenes(None, {'CSI': [30, 3, 3]},
+            >>>                              bufsize=1000, ring=True)
+            >>> # call csidata.pmsg(data) for every message received
+            >>> csidata.last(100)
+            >>> print(csidata.raw["CSI"]["CSI"].shape)
+        """
+        return super().last(n)
+
     def interpolate_csi(self, name='CSI', mode='AP'):
         """Interpolate csi by linear method
 
@@ -1309,3 +2380,92 @@ class Picoscenes(_picoscenes.Picoscenes):
         s += T % ("  ", "count", self.count)
         s = report(s, self.raw[index], None, 0)
         print(s, end='')
+
+
+def _pull10_endian(file):
+    """Byte order of files recorded by 'Atheros CSI Tool' pull 10"""
+    with open(file, 'rb') as f:
+        return 'big' if f.read(1) == b'\xff' else 'little'
+
+
+def _join_messages(messages):
+    """Join ``messages`` into one buffer, return it and the boundaries"""
+    offsets = np.zeros(len(messages) + 1, dtype=np.int64)
+    np.cumsum([len(m) for m in messages], out=offsets[1:])
+    return b''.join(messages), offsets
+
+
+def _load_index(file, kind, pos=0, endian='little', save=True):
+    """Load the ``.idx`` sidecar of ``file``, build it if it is missing or
+    stale (the size or mtime of ``file`` changed)"""
+    st = os.stat(file)
+    key = ("%s:%s:%d" % (kind, endian, pos)).encode()
+    idxfile = file + ".idx"
+    try:
+        with open(idxfile, 'rb') as f:
+            header = np.fromfile(f, dt_index_header, 1)
+            if (header.shape[0] == 1 and header['magic'][0] == b'CSIIDX1'
+                    and header['key'][0] == key
+                    and header['size'][0] == st.st_size
+                    and header['mtime'][0] == st.st_mtime_ns):
+                count = int(header['count'][0])
+                index = np.fromfile(f, dt_index, count)
+                if index.shape[0] == count:
+                    return index
+    except OSError:
+        pass
+
+    offset, length, rtype = _csiread.build_index(file, kind, pos, endian)
+    index = np.zeros(offset.shape[0], dtype=dt_index)
+    index['offset'] = offset
+    index['length'] = length
+    index['type'] = rtype
+
+    if save:
+        header = np.zeros(1, dtype=dt_index_header)
+        header['magic'] = b'CSIIDX1'
+        header['key'] = key
+        header['size'] = st.st_size
+        header['mtime'] = st.st_mtime_ns
+        header['count'] = index.shape[0]
+        tmpfile = "%s.%d.tmp" % (idxfile, os.getpid())
+        try:
+            with open(tmpfile, 'wb') as f:
+                header.tofile(f)
+                index.tofile(f)
+            os.replace(tmpfile, idxfile)
+        except OSError:
+            pass    # e.g. read-only directory, the index is still returned
+    return index
+
+
+def _packet_offsets(csidata, file, kind, pos=0, endian='little'):
+    """Offsets of all packets in ``file``, they are cached by ``csidata``
+    until ``file`` changes"""
+    st = os.stat(file)
+    key = (file, kind, pos, endian, st.st_size, st.st_mtime_ns)
+    cache = getattr(csidata, '_index_cache', None)
+    if cache is None or cache[0] != key:
+        records = _load_index(file, kind, pos, endian)
+        if kind == 'intel':
+            # start from the 0xc1 field ahead of the 0xbb field if it exists,
+            # the same as ``getPosIntel`` in ``examples/csiseek.py``
+            bb = np.flatnonzero(records['type'] == 0xbb)
+            ahead = np.maximum(bb - 1, 0)
+            ahead = np.where((bb > 0) & (records['type'][ahead] == 0xc1),
+                             ahead, bb)
+            offsets = records['offset'][ahead]
+        else:
+            offsets = records['offset'][records['type'] == 1]
+        cache = (key, offsets)
+        csidata._index_cache = cache
+    return cache[1]
+
+
+def _packet_order(csidata, file, indices, kind, pos=0, endian='little'):
+    """Ascending offsets of packets ``indices`` and the row of each of them
+    in the output, so they can be decoded in a single forward pass"""
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+    rows = np.argsort(indices, kind='stable')
+    offsets = _packet_offsets(csidata, file, kind, pos, endian)[indices[rows]]
+    return offsets.astype(np.int64), rows.astype(np.int64)
@@ -0,0 +1,466 @@
+import asyncio
+import collections
+import ctypes
+import errno
+import os
+import select
+import socket
+import struct
+import sys
+
+import numpy as np
+from .core import _join_messages
+
+
+class CSIProtocol(asyncio.DatagramProtocol):
+    """Receive CSI by udp in an asyncio event loop
+
+    Datagrams are queued as they arrive and parsed in batches by
+    ``csidata.pmsg_batch`` when the protocol is iterated, so one event loop
+    can serve many devices without a thread per socket. It supports
+    ``Intel``, ``Nexmon``, ``NexmonPull46`` and ``Picoscenes``.
+
+    Args:
+        csidata: The reader to parse datagrams, e.g. ``csiread.Intel(None)``.
+        batch (int): The maximum count of datagrams parsed at a time.
+            Default: 256
+        maxsize (int): The maximum count of datagrams queued, the oldest are
+            dropped if the consumer is too slow. Default: 65536
+
+    Attributes:
+        csidata: The reader.
+        status (ndarray): The status code of each datagram of the latest
+            batch, see ``pmsg_many``.
+        received (int): Count of datagrams received.
+        dropped (int): Count of datagrams dropped because the queue is full.
+
+    Examples:
+
+        >>> async def main():
+        >>>     csidata = csiread.Intel(None, 3, 2)
+        >>>     transport, protocol = await csiread.create_receiver(
+        >>>         csidata, ('127.0.0.1', 10010))
+        >>>     async for csidata in protocol:
+        >>>         print(csidata.csi.shape)
+        >>>
+        >>> asyncio.run(main())
+    """
+    def __init__(self, csidata, batch=256, maxsize=65536):
+        if not hasattr(csidata, 'pmsg_batch'):
+            raise TypeError("%s doesn't support pmsg_batch"
+                            % type(csidata).__name__)
+        if batch < 1:
+            raise ValueError("batch must be positive")
+        self.csidata = csidata
+        self.batch = batch
+        self.status = None
+        self.received = 0
+        self.dropped = 0
+        self.transport = None
+        self._queue = collections.deque(maxlen=maxsize)
+        self._waiter = None
+        self._exc = None
+        self._closed = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(data)
+        self.received += 1
+        self._wakeup()
+
+    def error_received(self, exc):
+        self._exc = exc
+        self._wakeup()
+
+    def connection_lost(self, exc):
+        self._exc = exc
+        self._closed = True
+        self._wakeup()
+
+    def _wakeup(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def recv(self):
+        """Parse the datagrams queued, wait for one if there is none
+
+        Returns:
+            int: Count of datagrams parsed, ``0`` if the transport is closed
+                and the queue is empty.
+        """
+        while not self._queue:
+            if self._exc is not None:
+                exc, self._exc = self._exc, None
+                raise exc
+            if self._closed:
+                return 0
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        n = min(len(self._queue), self.batch)
+        messages = [self._queue.popleft() for _ in range(n)]
+        count, self.status = self.csidata.pmsg_batch(messages)
+        return count
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        """Yield ``csidata`` with the packets of a batch, batches without any
+        packet parsed are skipped"""
+        while True:
+            if self._closed and not self._queue and self._exc is None:
+                raise StopAsyncIteration
+            if await self.recv():
+                return self.csidata
+
+
+async def create_receiver(csidata, local_addr, batch=256, maxsize=65536,
+                          **kwargs):
+    """Bind a udp socket in the running event loop and parse CSI received
+
+    Args:
+        csidata: The reader to parse datagrams, see ``CSIProtocol``.
+        local_addr (tuple): The address to bind, e.g. ``('0.0.0.0', 10010)``.
+        batch (int): The maximum count of datagrams parsed at a time.
+        maxsize (int): The maximum count of datagrams queued.
+        kwargs: Passed to ``loop.create_datagram_endpoint``.
+
+    Returns:
+        tuple: ``(transport, protocol)``, iterate ``protocol`` to get
+            ``csidata`` and close ``transport`` to stop it.
+
+    Examples:
+
+        >>> async def sniffer(port):
+        >>>     csidata = csiread.Nexmon(None, chip='4358', bw=80)
+        >>>     transport, protocol = await csiread.create_receiver(
+        >>>         csidata, ('0.0.0.0', port))
+        >>>     async for csidata in protocol:
+        >>>         print(port, csidata.csi.shape)
+        >>>
+        >>> async def main():
+        >>>     await asyncio.gather(*[sniffer(p) for p in range(10010, 10042)])
+        >>>
+        >>> asyncio.run(main())
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(
+        lambda: CSIProtocol(csidata, batch, maxsize),
+        local_addr=local_addr, **kwargs)
+
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_iovec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr), ("msg_len", ctypes.c_uint)]
+
+
+_MSG_DONTWAIT = 0x40
+_MSG_TRUNC = 0x20
+
+
+def _load_recvmmsg():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        func = ctypes.CDLL(None, use_errno=True).recvmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_mmsghdr), ctypes.c_uint,
+                     ctypes.c_int, ctypes.c_void_p]
+    func.restype = ctypes.c_int
+    return func
+
+
+class MMsgReceiver:
+    """Receive many udp messages per syscall by ``recvmmsg`` (Linux only)
+
+    Up to ``vlen`` datagrams are received into a preallocated arena of
+    ``vlen`` slots of ``slot`` bytes by one ``recvmmsg`` call, then they are
+    packed and parsed by ``csidata.pmsg_many`` in one call.
+
+    Args:
+        sock (socket): A bound udp socket.
+        csidata: The reader to parse datagrams, e.g. ``csiread.Intel(None)``.
+        vlen (int): The maximum count of datagrams per call. Default: 64
+        slot (int): The maximum size of a datagram, longer datagrams are
+            truncated and discarded. Default: 4096
+
+    Attributes:
+        status (ndarray): The status code of each datagram of the latest
+            call, see ``pmsg_many``.
+        received (int): Count of datagrams received.
+        truncated (int): Count of datagrams longer than ``slot``.
+
+    Examples:
+
+        >>> with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        >>>     s.bind(('127.0.0.1', 10010))
+        >>>     csidata = csiread.Intel(None, 3, 2)
+        >>>     receiver = csiread.MMsgReceiver(s, csidata)
+        >>>     while True:
+        >>>         count, status = receiver.recv()
+        >>>         print(csidata.csi.shape)
+    """
+    def __init__(self, sock, csidata, vlen=64, slot=4096):
+        self._recvmmsg = _load_recvmmsg()
+        if self._recvmmsg is None:
+            raise OSError("recvmmsg is only available on Linux")
+        if not hasattr(csidata, 'pmsg_many'):
+            raise TypeError("%s doesn't support pmsg_many"
+                            % type(csidata).__name__)
+        if vlen < 1 or slot < 1:
+            raise ValueError("vlen and slot must be positive")
+        self.sock = sock
+        self.csidata = csidata
+        self.vlen = vlen
+        self.slot = slot
+        self.status = None
+        self.received = 0
+        self.truncated = 0
+
+        self.arena = np.zeros([vlen, slot], dtype=np.uint8)
+        self._iov = (_iovec * vlen)()
+        self._msgs = (_mmsghdr * vlen)()
+        base = self.arena.ctypes.data
+        for i in range(vlen):
+            self._iov[i].iov_base = base + i * slot
+            self._iov[i].iov_len = slot
+            self._msgs[i].msg_hdr.msg_iov = ctypes.pointer(self._iov[i])
+            self._msgs[i].msg_hdr.msg_iovlen = 1
+        self._hdr = np.frombuffer(self._msgs, dtype=np.dtype({
+            'names': ['msg_flags', 'msg_len'],
+            'formats': [np.int32, np.uint32],
+            'offsets': [_msghdr.msg_flags.offset, _mmsghdr.msg_len.offset],
+            'itemsize': ctypes.sizeof(_mmsghdr)}))
+
+    def recv_raw(self, timeout=None):
+        """Receive datagrams into ``arena`` without parsing them
+
+        It waits for the first datagram and takes the others already queued.
+
+        Args:
+            timeout (float): Seconds to wait for the first datagram, ``None``
+                to block. Default: ``None``
+
+        Returns:
+            ndarray: The size of each datagram received, datagram ``i`` is
+                ``arena[i, :size[i]]``.
+
+        Raises:
+            TimeoutError: No datagram arrived in ``timeout`` seconds.
+        """
+        if timeout is None:
+            timeout = self.sock.gettimeout()
+        fd = self.sock.fileno()
+        while True:
+            if not select.select([fd], [], [], timeout)[0]:
+                raise TimeoutError("timed out")
+            n = self._recvmmsg(fd, self._msgs, self.vlen, _MSG_DONTWAIT, None)
+            if n >= 0:
+                break
+            err = ctypes.get_errno()
+            if err not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                raise OSError(err, os.strerror(err))
+
+        sizes = self._hdr['msg_len'][:n].astype(np.int64)
+        trunc = (self._hdr['msg_flags'][:n] & _MSG_TRUNC) != 0
+        self.received += n
+        if trunc.any():
+            self.truncated += int(trunc.sum())
+            sizes[trunc] = 0
+        return sizes
+
+    def recv(self, timeout=None):
+        """Receive datagrams by one ``recvmmsg`` call and parse them
+
+        Args:
+            timeout (float): Seconds to wait for the first datagram, ``None``
+                to block. Default: ``None``
+
+        Returns:
+            tuple: ``(count, status)``, see ``pmsg_many``.
+        """
+        sizes = self.recv_raw(timeout)
+        offsets = np.zeros(sizes.shape[0] + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        buffer = np.concatenate([self.arena[i, :s]
+                                 for i, s in enumerate(sizes)] or [b''])
+        count, self.status = self.csidata.pmsg_many(buffer, offsets)
+        return count, self.status
+
+
+# /usr/include/linux/connector.h: CN_NETLINK_USERS is 10 in the
+# linux-80211n-csitool, CN_IDX_IWLAGN = CN_NETLINK_USERS + 0xf
+CN_IDX_IWLAGN = 10 + 0xf
+_NETLINK_CONNECTOR = 11
+_SOL_NETLINK = 270
+_NETLINK_ADD_MEMBERSHIP = 1
+# sizeof(struct nlmsghdr) + sizeof(struct cn_msg)
+_NL_HDRLEN = 16
+_CN_HDRLEN = 20
+
+
+class NetlinkReader:
+    """Receive CSI of the Linux 802.11n CSI Tool from the kernel connector
+
+    It does what ``log_to_file`` does without the file: every netlink
+    datagram is parsed by ``csidata.pmsg_many`` in place, the payload isn't
+    copied if a datagram holds one message. ``csidata`` is an
+    ``csiread.Intel`` usually.
+
+    Args:
+        csidata: The reader to parse messages, e.g. ``csiread.Intel(None)``.
+        source: ``None`` to open a netlink connector socket and subscribe to
+            ``group`` (root is required), an object with ``recv`` (e.g. a
+            socket) returning netlink datagrams, or a binary file-like
+            object with ``read`` returning netlink messages one after
+            another, e.g. a capture to replay. Default: ``None``
+        tee: A path or a binary file-like object, the messages are appended
+            to it in the format of ``log_to_file``, so it can be read by
+            ``csiread.Intel`` later. Default: ``None``
+        group (int): The netlink group of the connector.
+            Default: ``CN_IDX_IWLAGN``
+        bufsize (int): The size of the receive buffer. Default: 4096
+
+    Attributes:
+        status (ndarray): The status code of each message of the latest
+            datagram, see ``pmsg_many``.
+        received (int): Count of messages received.
+
+    Examples:
+
+        >>> csidata = csiread.Intel(None, 3, 2)
+        >>> with csiread.NetlinkReader(csidata, tee='csi.dat') as reader:
+        >>>     for csidata in reader:
+        >>>         print(csidata.csi.shape)
+    """
+    def __init__(self, csidata, source=None, tee=None, group=CN_IDX_IWLAGN,
+                 bufsize=4096):
+        if not hasattr(csidata, 'pmsg_many'):
+            raise TypeError("%s doesn't support pmsg_many"
+                            % type(csidata).__name__)
+        self.csidata = csidata
+        self.bufsize = bufsize
+        self.status = None
+        self.received = 0
+        self._own_source = source is None
+        self._own_tee = isinstance(tee, (str, bytes, os.PathLike))
+
+        if source is None:
+            source = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                   _NETLINK_CONNECTOR)
+            try:
+                source.bind((os.getpid(), group))
+                source.setsockopt(_SOL_NETLINK, _NETLINK_ADD_MEMBERSHIP,
+                                  group)
+            except OSError:
+                source.close()
+                raise
+        if not hasattr(source, 'recv') and not hasattr(source, 'read'):
+            raise TypeError("source must have recv or read")
+        self.source = source
+        self.tee = open(tee, 'ab') if self._own_tee else tee
+
+    def _read_datagram(self):
+        """Get the next datagram, ``b''`` at the end of a stream"""
+        if hasattr(self.source, 'recv'):
+            return self.source.recv(self.bufsize)
+        header = self.source.read(_NL_HDRLEN)
+        if len(header) < _NL_HDRLEN:
+            return b''
+        nlmsg_len = struct.unpack_from('=L', header)[0]
+        if nlmsg_len < _NL_HDRLEN + _CN_HDRLEN:
+            raise ValueError("broken netlink message")
+        body = self.source.read(((nlmsg_len + 3) & ~3) - _NL_HDRLEN)
+        if len(body) < nlmsg_len - _NL_HDRLEN:
+            return b''
+        return header + body
+
+    def recv(self):
+        """Receive a datagram and parse the messages in it
+
+        Returns:
+            tuple: ``(count, status)``, see ``pmsg_many``, ``None`` at the end
+                of a stream.
+        """
+        data = self._read_datagram()
+        if not data:
+            return None
+
+        # struct nlmsghdr {__u32 nlmsg_len; __u16 nlmsg_type; ...}, then
+        # struct cn_msg {struct cb_id id; __u32 seq; __u32 ack; __u16 len;
+        # __u16 flags; __u8 data[0];}, messages are aligned to 4 bytes
+        spans = []
+        cur = 0
+        while cur + _NL_HDRLEN + _CN_HDRLEN <= len(data):
+            nlmsg_len = struct.unpack_from('=L', data, cur)[0]
+            if nlmsg_len < _NL_HDRLEN + _CN_HDRLEN or \
+                    cur + nlmsg_len > len(data):
+                break
+            start = cur + _NL_HDRLEN + _CN_HDRLEN
+            cn_len = struct.unpack_from('=H', data, start - 4)[0]
+            spans.append((start, min(start + cn_len, cur + nlmsg_len)))
+            cur += (nlmsg_len + 3) & ~3
+
+        if len(spans) == 1:
+            buffer = data
+            offsets = np.array(spans[0], dtype=np.int64)
+        else:
+            view = memoryview(data)
+            buffer, offsets = _join_messages([view[a:b] for a, b in spans])
+
+        if self.tee is not None:
+            view = memoryview(data)
+            for a, b in spans:
+                self.tee.write(struct.pack('>H', b - a))
+                self.tee.write(view[a:b])
+        self.received += len(spans)
+        count, self.status = self.csidata.pmsg_many(buffer, offsets)
+        return count, self.status
+
+    def __iter__(self):
+        """Yield ``csidata`` for every datagram with packets parsed, until the
+        end of a stream"""
+        while True:
+            ret = self.recv()
+            if ret is None:
+                return
+            if ret[0]:
+                yield self.csidata
+
+    def close(self):
+        """Close the tee and the socket opened by the reader"""
+        if self._own_tee and self.tee is not None:
+            self.tee.close()
+        elif self.tee is not None:
+            self.tee.flush()
+        if self._own_source:
+            self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
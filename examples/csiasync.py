@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Receive CSI from many devices in one asyncio event loop
+
+Usage:
+    1. python3 csiasync.py 10010 10011
+    2. python3 csiserver.py ../material/5300/dataset/sample_0x5_64_3000.dat 3000 500
+"""
+
+import argparse
+import asyncio
+
+import csiread
+
+
+async def sniffer(port):
+    csidata = csiread.Intel(None, 3, 2)
+    transport, protocol = await csiread.create_receiver(
+        csidata, ('127.0.0.1', port))
+    count = 0
+    try:
+        async for csidata in protocol:
+            count += csidata.count
+            if csidata.count:
+                print('port %d: %d packets, bfee_count=%d, dropped=%d'
+                      % (port, count, csidata.bfee_count[-1],
+                         protocol.dropped))
+    finally:
+        transport.close()
+
+
+async def main(ports):
+    await asyncio.gather(*[sniffer(port) for port in ports])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('ports', type=int, nargs='+', help='udp ports')
+    p = parser.parse_args()
+
+    asyncio.run(main(p.ports))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Microbenchmark: packets/s of the decoders
+
+The sample files are repeated to about 40k packets, like the table in
+README.md, and each function is timed several times, the best is reported.
+
+Usage:
+    python3 csibenchmark.py
+    python3 csibenchmark.py intel
+"""
+
+import argparse
+import os
+import tempfile
+from timeit import default_timer
+
+import csiread
+
+material = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'material')
+
+
+def repeat_file(src, count, header=0):
+    """Write ``src`` ``count`` times into a temporary file, the first
+    ``header`` bytes (e.g. the pcap header) are written once"""
+    with open(src, 'rb') as f:
+        data = f.read()
+    fd, dst = tempfile.mkstemp(suffix=os.path.splitext(src)[1])
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data[:header])
+        for _ in range(count):
+            f.write(data[header:])
+    return dst
+
+
+def timeit(func, number=5):
+    best = float('inf')
+    for _ in range(number):
+        start = default_timer()
+        func()
+        best = min(best, default_timer() - start)
+    return best
+
+
+def bench(name, csidata, func=None):
+    """Time ``func`` (``csidata.read`` by default), ``csidata`` is read"""
+    elapsed = timeit(func or csidata.read)
+    print("%-22s: %8d packets, %8.4fs, %10.0f packets/s"
+          % (name, csidata.count, elapsed, csidata.count / elapsed))
+
+
+def intel():
+    file = repeat_file(os.path.join(material, '5300', 'dataset',
+                                    'sample_0x5_64_3000.dat'), 14)
+    try:
+        bench('Intel.read', csiread.Intel(file, 3, 2, if_report=False))
+        bench('Intel.read:complex64',
+              csiread.Intel(file, 3, 2, if_report=False,
+                            csi_dtype='complex64'))
+        bench('Intel.read:int8',
+              csiread.Intel(file, 3, 2, if_report=False, csi_dtype='int8'))
+        bench('Intel.read:scaled',
+              csiread.Intel(file, 3, 2, if_report=False, output='scaled'))
+        bench('Intel.read:scaled_sm',
+              csiread.Intel(file, 3, 2, if_report=False, output='scaled_sm'))
+
+        csidata = csiread.Intel(file, 3, 2, if_report=False)
+        csidata.read()
+        bench('Intel.get_total_rss', csidata, csidata.get_total_rss)
+        bench('Intel.get_scaled_csi', csidata, csidata.get_scaled_csi)
+        bench('Intel.get_scaled_csi:c64', csidata,
+              lambda: csidata.get_scaled_csi(dtype='complex64'))
+        bench('Intel.get_scaled_csi:w4', csidata,
+              lambda: csidata.get_scaled_csi(workers=4))
+        bench('Intel.get_scaled_csi_sm', csidata, csidata.get_scaled_csi_sm)
+        bench('Intel.get_scaled_csi_sm:c64', csidata,
+              lambda: csidata.get_scaled_csi_sm(dtype='complex64'))
+    finally:
+        os.remove(file)
+
+
+def atheros():
+    file = repeat_file(os.path.join(material, 'atheros', 'dataset',
+                                    'ath_csi_1.dat'), 100)
+    try:
+        bench('Atheros.read',
+              csiread.Atheros(file, 3, 3, tones=114, if_report=False))
+        bench('Atheros.read:complex64',
+              csiread.Atheros(file, 3, 3, tones=114, if_report=False,
+                              csi_dtype='complex64'))
+        bench('Atheros.read:int16',
+              csiread.Atheros(file, 3, 3, tones=114, if_report=False,
+                              csi_dtype='int16'))
+    finally:
+        os.remove(file)
+
+
+def nexmon():
+    file = repeat_file(os.path.join(material, 'nexmon', 'dataset',
+                                    'example.pcap'), 10000, header=24)
+    try:
+        bench('Nexmon.read:bcm4339',
+              csiread.Nexmon(file, '4339', 80, if_report=False))
+        bench('Nexmon.read:bcm4358',
+              csiread.Nexmon(file, '4358', 80, if_report=False))
+        bench('Nexmon.read:bcm4358:c64',
+              csiread.Nexmon(file, '4358', 80, if_report=False,
+                             csi_dtype='complex64'))
+    finally:
+        os.remove(file)
+
+
+def esp32():
+    file = repeat_file(os.path.join(material, 'esp32', 'dataset',
+                                    'example_csi.csv'), 3200)
+    try:
+        bench('ESP32.read', csiread.ESP32(file, if_report=False))
+        bench('ESP32.read:csi_only',
+              csiread.ESP32(file, if_report=False, csi_only=True))
+    finally:
+        os.remove(file)
+
+
+benchmarks = {'intel': intel, 'atheros': atheros, 'nexmon': nexmon,
+              'esp32': esp32}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('device', type=str, nargs='*',
+                        help=', '.join(benchmarks))
+    p = parser.parse_args()
+
+    for device in p.device or benchmarks:
+        benchmarks[device]()
@@ -24,6 +24,13 @@ Note:
     (axis 0)`. 2. if packet size > 95, the more packets, the more excess memory
     allocated. Excess memory is so large that MemoryError is throwed. 
     
+    Since v1.4.1, `csiread.Intel(..., alloc='exact')` walks the length prefixes
+    of the file once and allocates exactly the count of 0xbb and 0xc1 packets.
+    `csiread.Intel(..., alloc='grow')` doubles buffers when they are full and
+    doesn't need the extra pass. If the whole file doesn't fit in memory,
+    `csidata.iter_chunks(n)` parses it n packets at a time into buffers which
+    are reused by every chunk.
+
     csiread.Atheros has the same issue. (Atheros.packet_size = 420). csiread.Nexmon
     does not have this issue, but it calculates the count of packets by the
     pre-read. It takes extra time.
@@ -75,7 +82,25 @@ def read_bf_fileB(csifile):
     return csidata
 
 
+@info
+def read_bf_fileC(csifile, alloc):
+    csidata = csiread.Intel(csifile, nrxnum=3, ntxnum=2, pl_size=0, if_report=False, alloc=alloc)
+    csidata.read()
+    return csidata
+
+
+def read_bf_fileD(csifile, pk_num):
+    csidata = csiread.Intel(csifile, nrxnum=3, ntxnum=2, pl_size=0, if_report=False, bufsize=1)
+    count = 0
+    for chunk in csidata.iter_chunks(pk_num):
+        count += chunk.count
+    print("read_bf_fileD: %d packets, csidata.Nrx.base.size=%d" % (count, csidata.Nrx.base.size))
+
+
 if __name__ == "__main__":
     csifile = "../material/5300/dataset/sample_0x1_ap.dat"
     csidataA = read_bf_fileA(csifile, pk_num=600)
     csidataB = read_bf_fileB(csifile)
+    csidataC = read_bf_fileC(csifile, 'exact')
+    csidataD = read_bf_fileC(csifile, 'grow')
+    read_bf_fileD(csifile, pk_num=100)
@@ -37,7 +37,7 @@ class GetDataThread(threading.Thread):
         self.address_src = ('127.0.0.1', 10086)
         self.address_des = ('127.0.0.1', 10010)
         if device == 'intel':
-            self.csidata = csiread.Intel(None, 3, 1)
+            self.csidata = csiread.Intel(None, 3, 1, output='scaled')
         if device == 'nexmon':
             self.csidata = csiread.Nexmon(None, chip='4358', bw=80)
         if device == 'picoscenes':
@@ -63,14 +63,14 @@ class GetDataThread(threading.Thread):
 
                 code = self.csidata.pmsg(data)
                 if code == 0xbb:    # intel
-                    scaled_csi_sm = self.csidata.get_scaled_csi()[0]
+                    scaled_csi = self.csidata.csi[0]
                     mutex.acquire()
                     cache_data1.pop(0)
-                    cache_data1.append(scaled_csi_sm[15, 0, 0])
+                    cache_data1.append(scaled_csi[15, 0, 0])
                     cache_data2.pop(0)
-                    cache_data2.append(scaled_csi_sm[15, 1, 0])
+                    cache_data2.append(scaled_csi[15, 1, 0])
                     cache_data3.pop(0)
-                    cache_data3.append(scaled_csi_sm[15, 2, 0])
+                    cache_data3.append(scaled_csi[15, 2, 0])
                     mutex.release()
                     count += 1
                 if code == 0xf100:  # nexmon
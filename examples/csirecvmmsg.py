@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Throughput of recvfrom + pmsg vs recvmmsg + pmsg_many (Linux only)
+
+A sender process replays a csi file to a local udp port as fast as it can,
+like csiserver.py without delay, and the receiver counts packets parsed.
+Run it on a host with 2 cores at least, otherwise the sender and the
+receiver share one and it measures the sender.
+
+Usage:
+    python3 csirecvmmsg.py ../material/5300/dataset/sample_0x5_64_3000.dat
+"""
+
+import argparse
+import multiprocessing
+import socket
+import time
+
+import csiread
+
+address_des = ('127.0.0.1', 10010)
+
+
+def intel_messages(csifile):
+    with open(csifile, 'rb') as f:
+        buf = f.read()
+    messages, cur = [], 0
+    while cur + 3 <= len(buf):
+        field_len = int.from_bytes(buf[cur:cur+2], byteorder='big')
+        messages.append(buf[cur+2:cur+2+field_len])
+        cur += 2 + field_len
+    return messages
+
+
+def sender(csifile, seconds):
+    messages = intel_messages(csifile)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        end = time.time() + seconds
+        while time.time() < end:
+            for data in messages:
+                s.sendto(data, address_des)
+
+
+def receive(mode, csifile, seconds):
+    csidata = csiread.Intel(None, 3, 2)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(address_des)
+        s.settimeout(0.5)
+        p = multiprocessing.Process(target=sender, args=(csifile, seconds))
+        p.start()
+        count, start = 0, time.time()
+        try:
+            if mode == 'recvfrom':
+                while True:
+                    data = s.recv(4096)
+                    if csidata.pmsg(data) == 0xbb:
+                        count += 1
+            else:
+                receiver = csiread.MMsgReceiver(s, csidata, vlen=64)
+                while True:
+                    receiver.recv()
+                    count += csidata.count
+        except TimeoutError:
+            pass
+        p.join()
+    elapsed = time.time() - start - 0.5
+    print("%-9s: %8d packets, %10.0f packets/s"
+          % (mode, count, count / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', type=str, help='Intel 5300 csi file')
+    parser.add_argument('-t', type=float, default=3, help='seconds')
+    p = parser.parse_args()
+
+    receive('recvfrom', p.file, p.t)
+    receive('recvmmsg', p.file, p.t)
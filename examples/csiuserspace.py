@@ -22,6 +22,9 @@ Note:
     dmesg
     ```
 
+    `csiread.NetlinkReader(csidata, tee='csifile.dat')` does the same in the
+    library and parses the messages without reading the file back.
+
     Don't forget to remove csikernel after playing.
 
     ```bash